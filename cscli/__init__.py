@@ -6,13 +6,33 @@ __version__ = "0.7.1"
 __description__ = "CloudSigma API command line interface"
 __timestamp__ = "2021-09-16T02:07:07-05:00"
 
-from .api_client import CloudSigmaClient
-
 MIN_CPU = 1
 MIN_MHZ = 1000
 MIN_RAM = "256M"
 MIN_DISK = "512M"
 
+# seconds an on-disk inventory listing is reused without asking the API; at
+# 0, every listing is revalidated
+CACHE_TTL = 0
+CATALOG_TTL = 24 * 60 * 60
+
+UPLOAD_CHUNK_SIZE = "5M"
+DOWNLOAD_RANGE_SIZE = "8M"
+
 PASSWORD_LEN = 24
 
-__all__ = [CloudSigmaClient]
+# API requests per second, and attempts after a transient failure, in each
+# region unless configured otherwise
+RATE_LIMIT = 20
+RETRIES = 4
+
+__all__ = ["CloudSigmaClient"]
+
+
+def __getattr__(name):
+    # defer importing the API client and its dependencies until first use
+    if name == "CloudSigmaClient":
+        from .api_client import CloudSigmaClient
+
+        return CloudSigmaClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,112 @@
 #!/usr/bin/env python3
 
+import ipaddress
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 import requests
 from importlib import import_module
 
-from .error import ParameterError, ResourceNotFound
+from . import RATE_LIMIT, RETRIES
+from .cache import InventoryCache
+from .download import DEFAULT_RANGE_SIZE, RangeDownload
+from .error import EventError, ParameterError, ResourceNotFound
+from .events import EventSource
+from .filters import parse_filters, predicate, pushdown
+from .index import ResourceIndex
+from .output import json_writer
+from .paging import DEFAULT_PAGE_SIZE, DEFAULT_PREFETCH, iter_items
+from .transport import (
+    ConditionalStore,
+    RetryPolicy,
+    Transport,
+    last_modified,
+    region_setting,
+    token_bucket,
+)
+from .upload import DEFAULT_CHUNK_SIZE, ChunkedUpload
+
+# resource types shared through the per-invocation index
+INDEXED_TYPES = ["server", "drive", "vlan", "ip", "subscription"]
+
+# resource types whose listings go stale when a resource of each type changes
+MUTATION_INVALIDATES = dict(
+    server=["server", "drive", "ip"],
+    drive=["drive", "server"],
+    vlan=["vlan"],
+    ip=["ip"],
+    subscription=["subscription", "vlan", "ip"],
+)
+
+# resource types whose expired listings are revalidated with the API
+REVALIDATED_TYPES = ["server", "drive", "vlan", "ip"]
+
+# seconds since its last download a listing is kept by revalidation before
+# it is downloaded again
+REVALIDATE_MAX_AGE = 10 * 60
+
+# resource types whose listings can be filtered by name on the server
+NAME_FILTER_TYPES = ["server", "drive"]
+
+UUID_PATTERN = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE
+)
+
+# resource types whose names are needed to format each indexed type
+FORMAT_REFERENCES = dict(
+    server=["server", "drive"],
+    drive=["drive", "server"],
+    vlan=["vlan"],
+    ip=["ip", "server"],
+    subscription=[],
+)
+
+# resource attribute of each listing name accepted by list
+LISTING_TYPES = dict(
+    servers="server",
+    drives="drive",
+    libdrives="libdrive",
+    vlans="vlan",
+    ips="ip",
+    subscriptions="subscription",
+    capabilities="capabilities",
+)
+
+# default size of the thread pool used to fetch resource types concurrently
+DEFAULT_WORKERS = 4
+
+
+def _validators(response):
+    """return the validators of a listing response, or None if it has none"""
+    etag = response.headers.get("ETag")
+    modified = last_modified(response.headers)
+    if not (etag or modified):
+        return None
+    return dict(url=urlparse(response.request.url).path, etag=etag, modified=modified)
 
 
 class CloudSigmaClient(object):
-    def __init__(self, region=None, username=None, password=None):
+    def __init__(
+        self,
+        region=None,
+        username=None,
+        password=None,
+        workers=None,
+        cache_ttl=None,
+        cache_refresh=False,
+        pool_size=None,
+        log=None,
+        endpoint=None,
+        stats=None,
+        retries=None,
+        rate_limit=None,
+    ):
 
         region = region or os.getenv("CLOUDSIGMA_REGION")
+        endpoint = endpoint or os.getenv("CLOUDSIGMA_ENDPOINT")
         username = username or os.getenv("CLOUDSIGMA_USERNAME")
         password = password or os.getenv("CLOUDSIGMA_PASSWORD")
 
@@ -29,24 +124,35 @@ class CloudSigmaClient(object):
         # import cloudsigma
         cloudsigma = import_module("cloudsigma")
 
+        if endpoint:
+            # one host, such as a local stand-in, serves the api and direct urls
+            endpoint = endpoint.rstrip("/") + "/"
+            api_endpoint = direct_endpoint = endpoint
+            url = urlparse(endpoint)
+            ws_scheme = "wss" if url.scheme == "https" else "ws"
+            ws_endpoint = f"{ws_scheme}://{url.netloc}/websocket"
+        else:
+            api_endpoint = f"https://{region}.cloudsigma.com/api/2.0/"
+            direct_endpoint = f"https://direct.{region}.cloudsigma.com/api/2.0/"
+            ws_endpoint = f"wss://direct.{region}.cloudsigma.com/websocket"
+
         # monkeypatch the config values into the module config
-        cloudsigma.conf.config.__setitem__(
-            "api_endpoint", f"https://{region}.cloudsigma.com/api/2.0/"
-        )
-        cloudsigma.conf.config.__setitem__(
-            "ws_endpoint", f"wss://direct.{region}.cloudsigma.com/websocket"
-        )
+        cloudsigma.conf.config.__setitem__("api_endpoint", api_endpoint)
+        cloudsigma.conf.config.__setitem__("ws_endpoint", ws_endpoint)
         cloudsigma.conf.config.__setitem__("username", username)
         cloudsigma.conf.config.__setitem__("password", password)
 
         # save config values for local image upload
+        self.region = region
+        # listings of another endpoint are cached apart from the region's
+        self.site = endpoint or region
         self.username = username
         self.password = password
-        self.upload_endpoint = (
-            f"https://direct.{region}.cloudsigma.com/api/2.0/drives/upload/"
-        )
+        self.direct_endpoint = direct_endpoint
+        self.upload_endpoint = f"{self.direct_endpoint}drives/upload/"
 
         self.config = cloudsigma.conf.config
+        self.errors = cloudsigma.errors
         self.server = cloudsigma.resource.Server()
         self.drive = cloudsigma.resource.Drive()
         self.vlan = cloudsigma.resource.VLAN()
@@ -54,26 +160,183 @@ class CloudSigmaClient(object):
         self.subscription = cloudsigma.resource.Subscriptions()
         self.capabilities = cloudsigma.resource.Capabilites()
         self.libdrive = cloudsigma.resource.LibDrive()
+        self.snapshot = cloudsigma.resource.Snapshot()
+        self.accounts = cloudsigma.resource.Accounts()
+        self.initupload = cloudsigma.resource.InitUpload()
 
         self.list_format = None
+        self.log = log
+        self.stats = stats
+        self.workers = workers or int(os.getenv("CSCLI_WORKERS", DEFAULT_WORKERS))
+        self.page_size = int(os.getenv("CSCLI_PAGE_SIZE", DEFAULT_PAGE_SIZE))
+        self.prefetch = DEFAULT_PREFETCH
+        self.index = ResourceIndex(self._load_resources, stats)
+        # the last listing of each type with its validators, and validators
+        # of complete listings as they arrive
+        self.listings = {}
+        self._listed = {}
+
+        # every request shares one pool of keep-alive connections, and the
+        # request rate of the region with every other client in the process
+        self.transport = Transport(
+            pool_size or int(os.getenv("CSCLI_POOL_SIZE", self.workers)),
+            (username, password),
+            stats,
+            retry=RetryPolicy(region_setting(retries, region, RETRIES, int)),
+            bucket=token_bucket(
+                self.site, region_setting(rate_limit, region, RATE_LIMIT)
+            ),
+            log=log,
+            conditional=ConditionalStore(),
+        )
+        self.transport.attach(
+            self.server,
+            self.drive,
+            self.vlan,
+            self.ip,
+            self.subscription,
+            self.capabilities,
+            self.libdrive,
+            self.snapshot,
+            self.accounts,
+            self.initupload,
+        )
+
+        # the on-disk cache is only used when a ttl is given
+        if cache_ttl is None:
+            self.cache = None
+        else:
+            self.cache = InventoryCache(self.site, username, cache_ttl, cache_refresh)
+
+        # the library drive catalog is opened when first searched
+        self.use_catalog = cache_ttl is not None
+        self.catalog_refresh = cache_refresh
+        self.catalog = None
+
+        for _type in INDEXED_TYPES:
+            getattr(self, _type).attach_response_hook(self._response_hook(_type))
+
+        if stats:
+            # waits for concurrent listing requests count as network time
+            self.index.prefetch = stats.wrap("network", "fetch", self.index.prefetch)
+            self._fan_out = stats.wrap("network", "fetch", self._fan_out)
+            self._format_resource = stats.wrap(
+                "formatting", "format", self._format_resource
+            )
+
+    def _response_hook(self, _type):
+        def hook(response, *args, **kwargs):
+            request = response.request
+            if request.method not in ["GET", "HEAD", "OPTIONS"]:
+                self.invalidate(*MUTATION_INVALIDATES[_type])
+            elif response.status_code == 200:
+                # validators of a complete listing, to revalidate it later
+                if urlparse(request.url).query == "limit=0":
+                    self._listed[_type] = _validators(response)
+
+        return hook
+
+    def invalidate(self, *types):
+        """discard indexed and cached listings of types"""
+        self.index.invalidate(*types)
+        for _type in types or list(self.listings):
+            self.listings.pop(_type, None)
+        if self.cache:
+            self.cache.invalidate(*types)
+
+    def refresh(self, *types):
+        """fetch current listings of types, replacing indexed and cached copies"""
+        listings = self._fan_out(
+            lambda _type: self._load_resources(_type, False), types
+        )
+        for _type, resources in zip(types, listings):
+            self.index.load(_type, resources)
+
+    def _resource_type(self, resource):
+        if resource == self.libdrive:
+            return "libdrive"
+        for _type in INDEXED_TYPES:
+            if resource == getattr(self, _type):
+                return _type
+        return None
+
+    def _load_resources(self, _type, cached=True):
+        entry = self.cache.entry(_type) if self.cache else None
+        if self.cache and cached:
+            hit = entry is not None and not self.cache.expired(entry)
+            if self.stats:
+                self.stats.count("inventory", hit)
+            if hit:
+                self.listings[_type] = (entry["items"], entry.get("validators"))
+                return entry["items"]
+        fetched = time.time()
+        resources, validators = self._revalidate(_type, entry)
+        if resources is None:
+            resource = getattr(self, _type)
+            self._listed.pop(_type, None)
+            if resource == self.subscription:
+                resources = resource.list()
+            else:
+                resources = resource.list_detail()
+            validators = self._listed.pop(_type, None)
+            if validators:
+                validators["complete"] = fetched
+        self.listings[_type] = (resources, validators)
+        if self.cache:
+            self.cache.put(_type, resources, fetched, validators)
+        return resources
+
+    def _revalidate(self, _type, entry=None):
+        """return the current listing of _type and its validators, or
+        (None, None) if it must be fetched in full
+
+        the detail listing is requested with the validators of the last
+        one; the API answers 304 if it is unchanged, and the complete
+        listing otherwise, so no resource is ever patched into a stale copy
+        """
+        last = self.listings.get(_type)
+        if last is None and entry is not None:
+            last = (entry["items"], entry.get("validators"))
+        if _type not in REVALIDATED_TYPES or last is None or not last[1]:
+            return None, None
+        items, validators = last
+        if time.time() - validators.get("complete", 0) > REVALIDATE_MAX_AGE:
+            return None, None
+        resource = getattr(self, _type)
+        url = f"{self.config.get('api_endpoint')}{resource.resource_name}/detail/"
+        headers = {}
+        if validators.get("etag") and validators.get("url") == urlparse(url).path:
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("modified"):
+            headers["If-Modified-Since"] = validators["modified"]
+        fetched = time.time()
+        response = self.transport.session.get(
+            url, params=dict(limit=0), headers=headers
+        )
+        if self.stats:
+            self.stats.count("listing", response.status_code == 304)
+        if response.status_code == 304:
+            if self.log:
+                saved = len(json_writer().dumps(items, compact=True))
+                self.log("%s listing unchanged; saved %d bytes", _type, saved)
+            return items, validators
+        if response.status_code != 200:
+            return None, None
+        latest = _validators(response)
+        if latest:
+            latest["complete"] = fetched
+        return response.json()["objects"], latest
 
     def _get_name(self, uuid, _type):
-        if _type == "server":
-            server = self.find_server(uuid)
-            name = server.get("name")
-        elif _type == "drive":
-            drive = self.find_drive(uuid)
-            name = drive.get("name")
-        elif _type == "vlan":
-            vlan = self.find_vlan(uuid)
-            name = vlan["meta"].get("name")
-        elif _type == "ip":
-            ip = self.find_ip(uuid)
-            name = ip["meta"].get("name")
-        elif _type == "subscription":
-            name = None
+        if _type == "subscription":
+            return f"<unnamed_{_type}>"
+        elif _type not in INDEXED_TYPES:
+            raise ParameterError(f"unknown resource type {_type}")
+        item = self.index.find(_type, uuid)
+        if _type in ["vlan", "ip"]:
+            name = item["meta"].get("name")
         else:
-            raise ParameterError("unknown resource type {_type}")
+            name = item.get("name")
         return name or f"<unnamed_{_type}>"
 
     def _format_resource(self, resource, item, list_format):
@@ -191,42 +454,170 @@ class CloudSigmaClient(object):
                             dlines[-1] += "  "
                         dlines[-1] += f"{k}={v}"
             longest = max([len(dd) for dd in dlines])
-            dlines = [d + (" " * (longest - len(d))) for d in dlines][:longest]
+            dlines = [d.ljust(longest) for d in dlines]
 
             data = dlines
 
         return {item["uuid"]: data}
 
-    def _list_resources(self, resource, list_format, _filter=None):
+    def _iter_resources(self, resource, list_format, _filter=None, paged=False):
+        """yield the resources of a listing, formatting each one as it is reached
+
+        filters the API understands are sent as query parameters, and every
+        filter is checked again on each resource; if paged, listings that need
+        no other resource types to format are read page by page instead of
+        through the index
+        """
+        filters = parse_filters(_filter)
+        _type = self._resource_type(resource)
         if resource == self.libdrive:
-            resources = self.libdrive_search(_filter)
-        elif resource not in (self.subscription, self.capabilities) and list_format:
-            resources = resource.list_detail()
+            if self.use_catalog:
+                resources = self.search_libdrives(_filter)
+            elif paged:
+                resources = self.iter_libdrives(_filter)
+            else:
+                resources = self.libdrive_search(_filter)
+            filters = []
+        elif resource != self.capabilities and list_format:
+            params = {}
+            if list_format in ["brief", "text"]:
+                self.index.prefetch(FORMAT_REFERENCES[_type], self.workers)
+                resources = self.index.list(_type)
+            elif self._indexed(_type):
+                resources = self.index.list(_type)
+            else:
+                params, _ = pushdown(_type, filters)
+                if params or paged:
+                    resources = self._iter_listing(
+                        resource, params, detail=_type != "subscription"
+                    )
+                else:
+                    resources = self.index.list(_type)
+            self._log_filters(_type, params, filters)
         else:
-            resources = resource.list()
+            params = self._pushdown(_type, filters)
+            resources = resource.list(query_params=params or None)
+
+        if filters:
+            match = predicate(filters)
+            resources = (item for item in resources if match(item))
 
         if list_format == "uuid":
-            resources = [{i["uuid"]: None} for i in resources]
+            for item in resources:
+                yield {item["uuid"]: None}
         elif list_format in ["brief", "text"]:
-            resources = [
-                self._format_resource(resource, item, list_format) for item in resources
-            ]
+            for item in resources:
+                yield self._format_resource(resource, item, list_format)
         elif list_format in ["detail", None]:
             # no post-processing
-            pass
+            yield from resources
         else:
-            raise ParameterError(f"unknown list_format {self.list_format}")
+            raise ParameterError(f"unknown list_format {list_format}")
 
-        return resources
+    def _list_resources(self, resource, list_format, _filter=None):
+        if resource == self.capabilities:
+            # capabilities are a single object, not a listing
+            return resource.list()
+        return list(self._iter_resources(resource, list_format, _filter))
+
+    def _log_filters(self, _type, params, filters):
+        if self.log and filters:
+            self.log(
+                "%s filters pushed down: %s; checked locally: %s",
+                _type,
+                " ".join(f"{key}={value}" for key, value in params.items()) or "none",
+                " ".join(str(f) for f in filters if f.key not in params) or "none",
+            )
+
+    def _pushdown(self, _type, filters):
+        """return the query parameters of filters the API applies"""
+        params, _ = pushdown(_type, filters)
+        self._log_filters(_type, params, filters)
+        return params
+
+    def _iter_listing(self, resource, query_params=None, detail=True):
+        """yield the resources of a listing, reading pages ahead in the background"""
+
+        def fetch(limit, offset):
+            params = dict(query_params or {}, limit=limit, offset=offset)
+            if detail:
+                return resource.list_detail(query_params=params)
+            return resource.list(query_params=params)
+
+        return iter_items(fetch, self.page_size, self.prefetch)
+
+    def iter_servers(self, query_params=None):
+        """yield servers one page at a time"""
+        return self._iter_listing(self.server, query_params)
+
+    def iter_drives(self, query_params=None):
+        """yield drives one page at a time"""
+        return self._iter_listing(self.drive, query_params)
+
+    def iter_vlans(self, query_params=None):
+        """yield vlans one page at a time"""
+        return self._iter_listing(self.vlan, query_params)
+
+    def iter_ips(self, query_params=None):
+        """yield ips one page at a time"""
+        return self._iter_listing(self.ip, query_params)
+
+    def iter_libdrives(self, _filter=None):
+        """yield library drives matching the list filters one page at a time"""
+        filters = parse_filters(_filter)
+        params = self._pushdown("libdrive", filters)
+        match = predicate(filters)
+        for item in self._iter_listing(self.libdrive, params, detail=False):
+            if match(item):
+                yield item
+
+    def _fan_out(self, function, items):
+        """call function on each item concurrently, returning results in order"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(function, items))
 
     def list_all(self, list_format, _filter=None):
-        resources = {}
         all_resources = dict(
             servers=self.server, drives=self.drive, vlans=self.vlan, ips=self.ip
         )
-        for label, resource in all_resources.items():
-            resources[label] = self._list_resources(resource, list_format, _filter)
-        return resources
+        if list_format:
+            # fetch every type at once, then format from the shared index
+            self.index.prefetch(
+                [self._resource_type(r) for r in all_resources.values()], self.workers
+            )
+            listings = [
+                self._list_resources(resource, list_format, _filter)
+                for resource in all_resources.values()
+            ]
+        else:
+            listings = self._fan_out(
+                lambda resource: self._list_resources(resource, list_format, _filter),
+                all_resources.values(),
+            )
+        return dict(zip(all_resources.keys(), listings))
+
+    def stream_resources(self, name, list_format, _filter=None):
+        """yield (name, resource) pairs of the named listing, or of all listings
+
+        resources are formatted one at a time, as the caller consumes them
+        """
+        if name is None:
+            names = ["servers", "drives", "vlans", "ips"]
+            if list_format in ["brief", "text"]:
+                types = [LISTING_TYPES[listing] for listing in names]
+                self.index.prefetch(types, self.workers)
+        else:
+            names = [name]
+        for name in names:
+            resource = getattr(self, LISTING_TYPES[name])
+            if resource == self.capabilities:
+                yield name, self._list_resources(resource, "detail", _filter)
+                continue
+            fmt = list_format
+            if name == "subscriptions" and fmt not in ["uuid", "detail"]:
+                fmt = "detail"
+            for item in self._iter_resources(resource, fmt, _filter, paged=True):
+                yield name, item
 
     def list_servers(self, list_format, _filter=None):
         return dict(servers=self._list_resources(self.server, list_format, _filter))
@@ -255,26 +646,98 @@ class CloudSigmaClient(object):
             capabilities=[self._list_resources(self.capabilities, "detail", _filter)]
         )
 
-    def _find_resource(self, resource_lister, _type, name):
-        for resource in list(resource_lister("detail").values())[0]:
-            if name in [resource.get("name"), resource.get("uuid")]:
+    def _is_uuid(self, _type, name):
+        if _type == "ip":
+            # ip resources use the address as uuid
+            try:
+                ipaddress.ip_address(name)
+            except ValueError:
+                return False
+            return True
+        return bool(UUID_PATTERN.match(name))
+
+    def _indexed(self, _type):
+        """return True if a listing of _type is available without a request"""
+        if _type in self.index.snapshots:
+            return True
+        if self.cache:
+            resources = self.cache.get(_type)
+            if resources is not None:
+                self.index.load(_type, resources)
+                return True
+        return False
+
+    def _fetch_resource(self, _type, name):
+        """request a single resource by uuid or server-side name filter"""
+        resource = getattr(self, _type)
+        if self._is_uuid(_type, name):
+            try:
+                return resource.get(name)
+            except self.errors.ClientError as exc:
+                if exc.status_code == 404:
+                    raise ResourceNotFound(f"unknown {_type} {name}")
+                raise
+        elif _type in NAME_FILTER_TYPES:
+            # stop reading pages at the first match
+            for item in self._iter_listing(resource, dict(name=name)):
+                if item.get("name") == name:
+                    return item
+        return None
+
+    def _find_resource(self, _type, name):
+        if _type != "subscription" and not self._indexed(_type):
+            resource = self._fetch_resource(_type, name)
+            if resource is not None:
                 return resource
-        raise ResourceNotFound(f"unknown {_type} {name}")
+        # fall back to the full listing
+        return self.index.find(_type, name)
 
     def find_server(self, name):
-        return self._find_resource(self.list_servers, "server", name)
+        return self._find_resource("server", name)
 
     def find_drive(self, name):
-        return self._find_resource(self.list_drives, "drive", name)
+        return self._find_resource("drive", name)
 
     def find_vlan(self, name):
-        return self._find_resource(self.list_vlans, "vlan", name)
+        return self._find_resource("vlan", name)
 
     def find_ip(self, name=None):
-        return self._find_resource(self.list_ips, "ip", name)
+        return self._find_resource("ip", name)
 
     def find_subscription(self, name=None):
-        return self._find_resource(self.list_subscriptions, "subscription", name)
+        return self._find_resource("subscription", name)
+
+    def _current_resource(self, _type, name):
+        """request a resource by uuid, bypassing the index and cache
+
+        updates are built from the result, so a PUT never sends back fields
+        changed since a listing was cached; the index only turns a name into
+        a uuid
+        """
+        if not self._is_uuid(_type, name):
+            name = self._find_resource(_type, name)["uuid"]
+        return self._fetch_resource(_type, name)
+
+    def current_server(self, name):
+        return self._current_resource("server", name)
+
+    def current_drive(self, name):
+        return self._current_resource("drive", name)
+
+    def current_vlan(self, name):
+        return self._current_resource("vlan", name)
+
+    def current_ip(self, name):
+        return self._current_resource("ip", name)
+
+    def open_events(self, timeout=10):
+        """subscribe to resource change notifications over the websocket"""
+        try:
+            self.accounts.authenticate_asynchronous()
+            cookie = self.accounts.c.resp.cookies["async_auth"]
+        except (self.errors.ApiClientError, requests.RequestException, KeyError) as exc:
+            raise EventError(f"websocket authentication failed: {exc}")
+        return EventSource(self.config["ws_endpoint"], cookie, timeout)
 
     def open_tty(self, name):
         return self.server.open_console(self.find_server(name)["uuid"])
@@ -356,7 +819,7 @@ class CloudSigmaClient(object):
     def modify_drive(
         self, name, rename=None, media=None, multimount=None, storage_type=None
     ):
-        drive = self.find_drive(name)
+        drive = self.current_drive(name)
         if rename:
             drive["name"] = rename
         if media:
@@ -367,6 +830,10 @@ class CloudSigmaClient(object):
             drive["storage_type"] = storage_type
         return self.drive.update(drive["uuid"], drive)
 
+    def snapshot_drive(self, drive):
+        """create a snapshot of drive"""
+        return self.snapshot.create(dict(drive=drive["uuid"]))
+
     def resize_drive(self, drive, size):
         drive["size"] = self.convert_memory_value(size)
         return self.drive.resize(drive["uuid"], drive)
@@ -457,19 +924,117 @@ class CloudSigmaClient(object):
 
     def upload_drive_image(self, input_file):
         """upload an image, creating a new drive, and return UUID"""
-        s = requests.Session()
-        s.auth = (self.config.get("username"), self.config.get("password"))
-        s.headers.update({"Content-Type": "application/octet-stream"})
-        r = s.post(self.upload_endpoint, data=input_file)
+        r = self.transport.session.post(
+            self.upload_endpoint,
+            data=input_file,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        self.invalidate("drive")
         return r.text.strip()
 
+    def upload_drive_chunked(
+        self,
+        input_file,
+        name,
+        media="disk",
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        restart=False,
+        progress=None,
+    ):
+        """upload an image in resumable parallel chunks to a new drive, return UUID"""
+        upload = ChunkedUpload(
+            self.transport.session,
+            self.direct_endpoint,
+            input_file,
+            chunk_size,
+            self.workers,
+            progress=progress,
+        )
+        if restart:
+            upload.journal.remove()
+
+        def create_drive(size):
+            drive = self.initupload.create(dict(name=name, media=media, size=size))
+            return drive["uuid"]
+
+        uuid = upload.run(create_drive)
+        self.invalidate("drive")
+        return uuid
+
+    def download_drive_image(
+        self,
+        name,
+        output,
+        range_size=DEFAULT_RANGE_SIZE,
+        checksum=None,
+        progress=None,
+    ):
+        """download a drive image to output, fetching byte ranges in parallel"""
+        drive = self.find_drive(name)
+        download = RangeDownload(
+            self.transport.session,
+            f"{self.direct_endpoint}drives/{drive['uuid']}/download/",
+            drive["size"],
+            output,
+            range_size,
+            self.workers,
+            checksum=checksum,
+            progress=progress,
+        )
+        ret = dict(uuid=drive["uuid"], name=drive.get("name"), size=drive["size"])
+        digest = download.run()
+        if checksum:
+            ret[checksum] = digest
+        return ret
+
+    def _fetch_libdrives(self, etag=None, modified=None):
+        """request the library drive listing unless it is unchanged"""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+        response = self.transport.session.get(
+            f"{self.config.get('api_endpoint')}libdrives/",
+            params=dict(limit=0),
+            headers=headers,
+        )
+        if response.status_code == 304:
+            if self.log:
+                self.log("libdrive catalog unchanged")
+            return None, etag, modified
+        response.raise_for_status()
+        return (
+            response.json()["objects"],
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+
+    def search_libdrives(self, _filter=None):
+        """return library drives matching the list filters from the local catalog"""
+        if self.catalog is None:
+            from .catalog import LibraryCatalog
+
+            self.catalog = LibraryCatalog(
+                self.site, refresh=self.catalog_refresh, log=self.log
+            )
+        if self.stats:
+            self.stats.count(
+                "catalog",
+                self.catalog.age() is not None and not self.catalog.refresh_requested,
+            )
+        self.catalog.ensure(self._fetch_libdrives)
+        return self.catalog.search(parse_filters(_filter))
+
+    def close(self):
+        """wait for background work and release connections"""
+        if self.catalog:
+            self.catalog.close()
+        self.transport.close()
+
     def libdrive_search(self, args):
-        params = {}
-        for arg in args:
-            key, _, value = arg.partition("=")
-            if key == "name_contains":
-                key == "name__icontains"
-            params[key] = value
+        filters = parse_filters(args)
+        params = self._pushdown("libdrive", filters)
         params["limit"] = 0
-        ret = self.libdrive.list(query_params=params)
-        return ret
+        match = predicate(filters)
+        return [item for item in self.libdrive.list(query_params=params) if match(item)]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import fnmatch
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .error import ParameterError
+
+# characters marking a selector as a glob pattern
+GLOB_CHARS = "*?["
+
+
+class Selector(object):
+    """a resource name or uuid, a glob pattern, or a /regex/ matched on names
+
+    a spec naming a resource exactly selects it even if it reads as a
+    pattern; parts are the selectors of a comma separated spec, used when
+    the whole spec names no resource
+    """
+
+    def __init__(self, spec, parts=None):
+        self.spec = spec
+        self.parts = parts
+        self.pattern = None
+        self._match = None
+        if parts:
+            return
+        if len(spec) > 2 and spec.startswith("/") and spec.endswith("/"):
+            try:
+                self.pattern = re.compile(spec[1:-1])
+            except re.error as exc:
+                raise ParameterError(f"invalid pattern {spec}: {exc}")
+            self._match = self.pattern.search
+        elif any(c in spec for c in GLOB_CHARS):
+            # a glob matches the whole name
+            self.pattern = re.compile(fnmatch.translate(spec))
+            self._match = self.pattern.fullmatch
+
+    @property
+    def exact(self):
+        return self.pattern is None and not self.parts
+
+    def names(self, resource):
+        return self.spec in (resource.get("uuid"), resource.get("name"))
+
+    def matches(self, resource):
+        if self.names(resource):
+            return True
+        if self.parts:
+            return any(part.matches(resource) for part in self.parts)
+        if self.pattern is None:
+            return False
+        return bool(self._match(resource.get("name") or ""))
+
+
+def parse_selectors(name, from_file=None):
+    """return the selectors of a comma separated NAME and the lines of from_file
+
+    a NAME of - selects only the targets listed in from_file
+    """
+    selectors = []
+    if name != "-":
+        parts = [_selector(spec) for spec in name.split(",")]
+        parts = [part for part in parts if part]
+        if len(parts) > 1:
+            selectors.append(Selector(name, parts))
+        else:
+            selectors.extend(parts)
+    if from_file:
+        selectors.extend(_selector(line.strip()) for line in from_file)
+    return [selector for selector in selectors if selector]
+
+
+def _selector(spec):
+    if spec and not spec.startswith("#"):
+        return Selector(spec)
+    return None
+
+
+def select_resources(resources, selectors):
+    """return the resources matching any selector, and the unmatched selectors"""
+    selected = {}
+    missing = []
+    for selector in selectors:
+        named = [resource for resource in resources if selector.names(resource)]
+        if named:
+            # like a single lookup, a uuid or the first resource named wins
+            matched, unmatched = named[:1], []
+        elif selector.parts:
+            matched, unmatched = select_resources(resources, selector.parts)
+        else:
+            matched = [r for r in resources if selector.matches(r)]
+            unmatched = [] if matched else [selector.spec]
+        missing.extend(unmatched)
+        for resource in matched:
+            selected.setdefault(resource["uuid"], resource)
+    return list(selected.values()), missing
+
+
+def run_bulk(action, resources, workers):
+    """apply action to each resource concurrently, return a result per resource"""
+
+    def run(resource):
+        ret = dict(uuid=resource["uuid"], name=resource.get("name"))
+        try:
+            ret.update(status=True, result=action(resource))
+        except Exception as exc:
+            ret.update(status=False, result=f"{type(exc).__name__}: {exc}")
+        return ret
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, resources))
+
+
+def apply(env, _type, selectors, action, confirm=None):
+    """run action on the selected resources of _type and output the results
+
+    a single name or uuid is looked up and reported as before; any other
+    selection is resolved against one listing and reported per target
+    """
+    api = env.api
+    if len(selectors) == 1 and selectors[0].exact:
+        resource = getattr(api, f"find_{_type}")(selectors[0].spec)
+        if confirm:
+            confirm([resource])
+        env.output(action(resource))
+        return
+    if not selectors:
+        env.error(f"no {_type} selected")
+    resources, missing = select_resources(api.index.list(_type), selectors)
+    if confirm and resources:
+        confirm(resources)
+    results = run_bulk(action, resources, api.workers)
+    results.extend(
+        dict(uuid=None, name=spec, status=False, result=f"unknown {_type} {spec}")
+        for spec in missing
+    )
+    env.output(results, all(ret["status"] for ret in results))
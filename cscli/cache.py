@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from . import CACHE_TTL
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def cache_root():
+    """return the base directory for cscli cache files"""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "cscli")
+
+
+class InventoryCache(object):
+    """on-disk cache of resource listings, shared by concurrent cscli processes
+
+    entries are replaced atomically; writers serialize on a lock file and
+    discard any listing requested before the last invalidation of its type
+    """
+
+    def __init__(self, region, username, ttl=CACHE_TTL, refresh=False, root=None):
+        self.path = os.path.join(
+            root or cache_root(), quote(f"{region}_{username}", safe="@._-")
+        )
+        self.ttl = ttl
+        self.refresh = refresh
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+
+    def _file(self, _type):
+        return os.path.join(self.path, f"{_type}.json")
+
+    @contextmanager
+    def _lock(self):
+        with open(os.path.join(self.path, ".lock"), "a") as lockfile:
+            if fcntl:
+                fcntl.flock(lockfile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    def _read(self, _type):
+        try:
+            with open(self._file(_type)) as ifp:
+                return json.load(ifp)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, _type, entry):
+        # mkstemp creates the file readable only by the owner
+        fd, temp = tempfile.mkstemp(dir=self.path, prefix=f".{_type}.")
+        try:
+            with os.fdopen(fd, "w") as ofp:
+                json.dump(entry, ofp)
+            os.replace(temp, self._file(_type))
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def entry(self, _type):
+        """return the cached listing of _type with the time it was fetched and
+        its validators, even if expired; None if missing, invalidated or a
+        refresh was requested"""
+        if self.refresh:
+            return None
+        entry = self._read(_type)
+        if not entry or entry.get("items") is None:
+            return None
+        return entry
+
+    def expired(self, entry):
+        return time.time() - entry["fetched"] > self.ttl
+
+    def get(self, _type):
+        """return the cached listing of _type, or None if missing or expired"""
+        entry = self.entry(_type)
+        if entry is None or self.expired(entry):
+            return None
+        return entry["items"]
+
+    def put(self, _type, items, fetched, validators=None):
+        """store a listing of _type requested at time fetched, with the
+        validators to request it again conditionally"""
+        with self._lock():
+            entry = self._read(_type)
+            if entry and entry.get("invalidated", 0) >= fetched:
+                return
+            entry = dict(fetched=fetched, items=items)
+            if validators:
+                entry["validators"] = validators
+            self._write(_type, entry)
+
+    def invalidate(self, *types):
+        """mark the cached listings of types, or of every type if none are
+        given, as stale"""
+        now = time.time()
+        with self._lock():
+            if not types:
+                types = [
+                    name[: -len(".json")]
+                    for name in os.listdir(self.path)
+                    if name.endswith(".json") and not name.startswith(".")
+                ]
+            for _type in types:
+                self._write(_type, dict(invalidated=now, items=None))
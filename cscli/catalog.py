@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from urllib.parse import quote
+
+from . import CATALOG_TTL
+from .cache import cache_root
+from .filters import SEARCH_FIELDS, SEARCH_KEY, predicate, search_terms
+
+SCHEMA = """
+create table if not exists libdrives (uuid text primary key, data text not null);
+create table if not exists meta (key text primary key, value text);
+"""
+
+FTS_SCHEMA = """
+create virtual table if not exists libdrives_fts using fts5(
+    uuid unindexed, name, os, version, description,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# least similarity of a search term to a word for a fuzzy match, where
+# similarity is 1 less the edits between them per character of the longer
+FUZZY_THRESHOLD = 0.6
+
+# seconds close() waits for a background refresh before abandoning it
+CLOSE_TIMEOUT = 5
+
+
+def fold(text):
+    """return text in lowercase without diacritics"""
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)
+    ).lower()
+
+
+def distance(a, b):
+    """return the edits turning a into b: insertions, deletions, substitutions
+    and swaps of adjacent characters (optimal string alignment distance)"""
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        before, previous = previous, current
+    return previous[len(b)]
+
+
+def resemblance(term, words):
+    """return the similarity of term to the closest of words, 1 if term
+    begins one of them"""
+    best = 0.0
+    for word in words:
+        if word.startswith(term):
+            return 1.0
+        edits = distance(term, word)
+        best = max(best, 1 - edits / max(len(term), len(word)))
+    return best
+
+
+class LibraryCatalog(object):
+    """local copy of a region's library drives with a full-text index"""
+
+    def __init__(self, region, ttl=CATALOG_TTL, refresh=False, root=None, log=None):
+        root = root or cache_root()
+        os.makedirs(root, mode=0o700, exist_ok=True)
+        self.path = os.path.join(root, f"libdrives_{quote(str(region), safe='')}.db")
+        self.ttl = ttl
+        self.refresh_requested = refresh
+        self.log = log
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # sqlite built without fts5; search falls back to LIKE
+            self.fts = False
+        self.worker = None
+
+    def _meta(self, key):
+        row = self.db.execute("select value from meta where key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        self.db.executemany(
+            "insert or replace into meta (key, value) values (?, ?)", values.items()
+        )
+
+    def age(self):
+        """return seconds since the catalog was last checked, or None if empty"""
+        checked = self._meta("checked")
+        return None if checked is None else time.time() - float(checked)
+
+    def refresh(self, fetch):
+        """update the catalog from fetch(etag, modified)
+
+        fetch returns (items, etag, modified) with items of None when the
+        catalog is unchanged; returns True if the catalog was replaced
+        """
+        with self.lock:
+            etag, modified = self._meta("etag"), self._meta("modified")
+        # searches keep reading the current copy during the request
+        items, etag, modified = fetch(etag, modified)
+        with self.lock, self.db:
+            if items is not None:
+                self._load(items)
+                self._set_meta(etag=etag, modified=modified)
+            self._set_meta(checked=str(time.time()))
+        return items is not None
+
+    def _load(self, items):
+        self.db.execute("delete from libdrives")
+        self.db.executemany(
+            "insert or replace into libdrives (uuid, data) values (?, ?)",
+            ((item["uuid"], json.dumps(item)) for item in items),
+        )
+        if self.fts:
+            self.db.execute("delete from libdrives_fts")
+            self.db.executemany(
+                "insert into libdrives_fts (uuid, name, os, version, description)"
+                " values (?, ?, ?, ?, ?)",
+                (
+                    [item["uuid"]] + [str(item.get(f) or "") for f in SEARCH_FIELDS]
+                    for item in items
+                ),
+            )
+
+    def ensure(self, fetch):
+        """refresh now if the catalog is empty or a refresh was requested,
+        or in the background if it has expired"""
+        age = self.age()
+        if age is None or self.refresh_requested:
+            self.refresh(fetch)
+            self.refresh_requested = False
+        elif age > self.ttl and self.worker is None:
+            # answer from the current copy while the update runs
+            self.worker = threading.Thread(
+                target=self._refresh_quietly, args=(fetch,), daemon=True
+            )
+            self.worker.start()
+
+    def _refresh_quietly(self, fetch):
+        try:
+            self.refresh(fetch)
+        except Exception as exc:
+            # the current copy stays; a later run tries again
+            if self.log:
+                self.log("library catalog refresh failed: %s", exc)
+
+    def _match(self, terms):
+        """return uuids of drives with every search term as a word prefix,
+        best first"""
+        if self.fts:
+            query = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+            rows = self.db.execute(
+                "select uuid from libdrives_fts where libdrives_fts match ?"
+                " order by rank",
+                (query,),
+            )
+        else:
+            text = " || ' ' || ".join(
+                f"coalesce(json_extract(data, '$.{field}'), '')"
+                for field in SEARCH_FIELDS
+            )
+            clause = " and ".join(f"lower({text}) like ?" for _ in terms)
+            rows = self.db.execute(
+                f"select uuid from libdrives where {clause}",
+                [f"%{term}%" for term in terms],
+            )
+        return [row[0] for row in rows]
+
+    def _fuzzy(self, terms):
+        """return uuids of drives with a word resembling any search term,
+        ranked by the resemblance of all terms"""
+        terms = [fold(term) for term in terms]
+        ranked = []
+        for uuid, data in self.db.execute(
+            "select uuid, data from libdrives order by rowid"
+        ):
+            item = json.loads(data)
+            words = search_terms(
+                fold(" ".join(str(item.get(f) or "") for f in SEARCH_FIELDS))
+            )
+            scores = [resemblance(term, words) for term in terms]
+            score = sum(score for score in scores if score >= FUZZY_THRESHOLD)
+            if score:
+                ranked.append((score, uuid))
+        # sorted is stable, so equal scores keep catalog order
+        return [uuid for _, uuid in sorted(ranked, key=lambda r: -r[0])]
+
+    def search(self, filters):
+        """return the library drives passing filters
+
+        a search=TERMS filter matches drives with every term as a word
+        prefix in name, os, version or description, or failing that, the
+        drives with words resembling any term, allowing for misspellings,
+        best matches first
+        """
+        searches = [f for f in filters if f.key == SEARCH_KEY]
+        match = predicate([f for f in filters if f.key != SEARCH_KEY])
+        terms = [term for f in searches for term in search_terms(f.value)]
+        with self.lock:
+            if terms:
+                uuids = self._match(terms) or self._fuzzy(terms)
+                rows = [
+                    self.db.execute(
+                        "select data from libdrives where uuid = ?", (uuid,)
+                    ).fetchone()
+                    for uuid in uuids
+                ]
+            else:
+                rows = self.db.execute("select data from libdrives order by rowid")
+            items = [json.loads(row[0]) for row in rows if row]
+        return [item for item in items if match(item)]
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        if self.worker:
+            self.worker.join(timeout)
+            if self.worker.is_alive():
+                # a slow download is abandoned at exit, leaving the database
+                # to the worker; its transaction is rolled back if cut short
+                return
+        self.db.close()
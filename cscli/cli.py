@@ -1,11 +1,13 @@
-import json
-import os
 import sys
+from contextlib import nullcontext
+from importlib import import_module
 
 import click
-import yaml
+from click.utils import make_default_short_help
 
-from cscli import CloudSigmaClient, __description__, __version__
+from cscli import CACHE_TTL, __description__, __version__
+from cscli.commands.registry import COMMANDS
+from cscli.output import YAMLDocuments, json_writer, write, write_yaml
 
 CONTEXT_SETTINGS = dict(auto_envvar_prefix="CSCLI")
 
@@ -15,7 +17,49 @@ class Environment:
         self.verbose = False
         self.compact = False
         self.fmt = "json"
-        self.api = None
+        self.documents = False
+        self.client_args = {}
+        self.stats = None
+        self.report = False
+        self.trace_file = None
+        self._api = None
+
+    @property
+    def api(self):
+        """the API client, constructed on first use"""
+        if self._api is None:
+            from cscli import CloudSigmaClient
+
+            self._api = CloudSigmaClient(**self.client_args)
+        return self._api
+
+    @api.setter
+    def api(self, api):
+        self._api = api
+
+    def close(self):
+        """release the API connections, reporting their reuse in verbose mode,
+        then write the --stats report and --trace-file"""
+        if self._api is not None:
+            stats = self._api.transport.stats()
+            self.log(
+                "http: %d requests over %d connections (%d reused)",
+                stats["requests"],
+                stats["connections"],
+                stats["reused"],
+            )
+            self._api.close()
+        if self.stats:
+            if self.report:
+                self.stats.report()
+            if self.trace_file:
+                self.stats.write_trace(self.trace_file)
+
+    def span(self, category, name):
+        """time the enclosed block for --stats, if requested"""
+        if self.stats:
+            return self.stats.span(category, name)
+        return nullcontext()
 
     def log(self, msg, *args):
         """Logs a message to stderr."""
@@ -25,21 +69,17 @@ class Environment:
             click.echo(msg, file=sys.stderr)
 
     def output(self, item, status=True):
-        if self.compact:
-            json_indent = None
-            json_separators = [",", ":"]
-        else:
-            json_indent = 2
-            json_separators = [", ", ": "]
-        if self.fmt == "yaml":
-            out = yaml.dump(item)
-        else:
-            out = json.dumps(
-                dict(status=status, result=item),
-                indent=json_indent,
-                separators=json_separators,
-            )
-        click.echo(out)
+        with self.span("serialization", "output"):
+            if self.fmt == "yaml":
+                if self.documents:
+                    with YAMLDocuments() as documents:
+                        for element in item if isinstance(item, list) else [item]:
+                            documents.write(element)
+                else:
+                    write_yaml(item)
+            else:
+                dumps = json_writer().dumps
+                write(dumps(dict(status=status, result=item), self.compact))
 
     def error(self, message):
         self.output(message, False)
@@ -53,26 +93,79 @@ class Environment:
                 self.output(f"{action} averted")
                 sys.exit()
 
+    def confirm_many(self, resources, action, label, force):
+        if len(resources) == 1:
+            return self.confirm(resources[0], action, label, force)
+        if not force:
+            names = " ".join(resource["name"] for resource in resources)
+            if not click.confirm(
+                f"Confirm {action} of {len(resources)} {label}s {names}"
+            ):
+                self.output(f"{action} averted")
+                sys.exit()
+
 
 pass_environment = click.make_pass_decorator(Environment, ensure=True)
-cmd_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "commands"))
+# entry point group for third-party commands
+PLUGIN_GROUP = "cscli.commands"
+
+
+def plugin_commands():
+    """return the entry points of installed command plugins by name"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return {}
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        group = eps.select(group=PLUGIN_GROUP)
+    else:
+        group = eps.get(PLUGIN_GROUP, [])
+    return {ep.name: ep for ep in group}
 
 
 class ComplexCLI(click.MultiCommand):
+    """commands from the static registry and plugins, imported only when run"""
+
+    _plugins = None
+
+    def plugins(self):
+        if self._plugins is None:
+            self._plugins = {
+                name: ep
+                for name, ep in plugin_commands().items()
+                if name not in COMMANDS
+            }
+        return self._plugins
+
+    def command_help(self, name):
+        if name in COMMANDS:
+            return COMMANDS[name][1]
+        ep = self.plugins()[name]
+        return f"plugin command {ep.value}"
+
     def list_commands(self, ctx):
-        rv = []
-        for filename in os.listdir(cmd_folder):
-            if filename.endswith(".py") and filename.startswith("cmd_"):
-                rv.append(filename[4:-3])
-        rv.sort()
-        return rv
+        return sorted(set(COMMANDS) | set(self.plugins()))
 
     def get_command(self, ctx, name):
-        try:
-            mod = __import__(f"cscli.commands.cmd_{name}", None, None, ["cli"])
-        except ImportError:
+        if name in COMMANDS:
+            return import_module(COMMANDS[name][0]).cli
+        ep = self.plugins().get(name)
+        if ep is None:
             return
-        return mod.cli
+        return ep.load()
+
+    def format_commands(self, ctx, formatter):
+        # list short help from the registry instead of loading each command
+        names = self.list_commands(ctx)
+        if names:
+            limit = formatter.width - 6 - max(len(name) for name in names)
+            rows = [
+                (name, make_default_short_help(self.command_help(name), limit))
+                for name in names
+            ]
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
 
 
 @click.command("cscli", cls=ComplexCLI, context_settings=CONTEXT_SETTINGS)
@@ -84,15 +177,100 @@ class ComplexCLI(click.MultiCommand):
     "-p", "--password", type=str, help="override env var CLOUDSIGMA_PASSWORD]"
 )
 @click.option("-r", "--region", type=str, help="override env var CLOUDSIGMA_REGION]")
+@click.option(
+    "--endpoint",
+    metavar="URL",
+    type=str,
+    help="API endpoint used instead of the region's; override env var"
+    " CLOUDSIGMA_ENDPOINT",
+)
 @click.option(
     "-d", "--debug", is_flag=True, help="output full stacktrace on runtime error"
 )
 @click.option("-v", "--verbose", is_flag=True, help="Enables verbose mode.")
 @click.option("-c", "--compact", is_flag=True, help="Output Compact JSON")
 @click.option("-y", "--yaml", is_flag=True, help="Output YAML")
+@click.option(
+    "-Y",
+    "--yaml-documents",
+    is_flag=True,
+    help="Output YAML, one document per resource",
+)
 @click.option("-j", "--json", is_flag=True, help="Output JSON")
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    help="concurrent API requests when fetching multiple resource types",
+)
+@click.option(
+    "--cache-ttl",
+    metavar="SECONDS",
+    type=click.IntRange(min=0),
+    default=CACHE_TTL,
+    show_default=True,
+    help="reuse on-disk inventory listings younger than SECONDS without asking"
+    " the API; changes made elsewhere meanwhile are not shown",
+)
+@click.option("--no-cache", is_flag=True, help="disable the on-disk inventory cache")
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="ignore and replace the cached inventory and library catalog",
+)
+@click.option(
+    "--pool-size",
+    type=click.IntRange(min=1),
+    help="keep-alive connections per API host [workers]",
+)
+@click.option(
+    "--retries",
+    metavar="[REGION=]N",
+    multiple=True,
+    help="resend requests failing with 429 or, if idempotent, 5xx up to N"
+    " times, in REGION or any other [4]",
+)
+@click.option(
+    "--rate-limit",
+    metavar="[REGION=]PER_SECOND",
+    multiple=True,
+    help="API requests per second across all threads, in REGION or any"
+    " other; 0 is unlimited [20]",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="report API calls, latency, cache use and timing to stderr on exit",
+)
+@click.option(
+    "--trace-file",
+    metavar="FILE",
+    type=click.Path(dir_okay=False, writable=True),
+    help="write timed API calls and processing in Chrome trace event format",
+)
 @pass_environment
-def cli(ctx, region, username, password, debug, verbose, compact, yaml, json):
+def cli(
+    ctx,
+    region,
+    endpoint,
+    username,
+    password,
+    debug,
+    verbose,
+    compact,
+    yaml,
+    yaml_documents,
+    json,
+    workers,
+    cache_ttl,
+    no_cache,
+    refresh,
+    pool_size,
+    retries,
+    rate_limit,
+    stats,
+    trace_file,
+):
     """CLI for the CloudSigma API
 
     create, modify, operate, and destroy resources on cloudsigma
@@ -110,9 +288,32 @@ def cli(ctx, region, username, password, debug, verbose, compact, yaml, json):
 
     ctx.verbose = verbose
     ctx.compact = compact
-    if yaml:
+    if yaml or yaml_documents:
         ctx.fmt = "yaml"
+        ctx.documents = yaml_documents
     if json:
         ctx.fmt = "json"
+        ctx.documents = False
+
+    if stats or trace_file:
+        from cscli.stats import Recorder
+
+        ctx.stats = Recorder()
+        ctx.report = stats
+        ctx.trace_file = trace_file
 
-    ctx.api = CloudSigmaClient(region, username, password)
+    ctx.client_args = dict(
+        region=region,
+        endpoint=endpoint,
+        username=username,
+        password=password,
+        workers=workers,
+        cache_ttl=None if no_cache else cache_ttl,
+        cache_refresh=refresh,
+        pool_size=pool_size,
+        log=ctx.log,
+        stats=ctx.stats,
+        retries=retries or None,
+        rate_limit=rate_limit or None,
+    )
+    click.get_current_context().call_on_close(ctx.close)
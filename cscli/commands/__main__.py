@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""regenerate cscli/commands/registry.py from the cmd_* modules
+
+usage: python -m cscli.commands
+"""
+
+import json
+import os
+from importlib import import_module
+
+HEADER = """#!/usr/bin/env python3
+
+# generated by `python -m cscli.commands`; do not edit
+#
+# maps each built-in command name to its module and short help, so the
+# command line can list commands without importing them
+
+"""
+
+
+def scan_commands():
+    """import every cmd_* module, returning the registry they describe"""
+    folder = os.path.dirname(os.path.abspath(__file__))
+    commands = {}
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith(".py") and filename.startswith("cmd_"):
+            module = f"cscli.commands.{filename[:-3]}"
+            cli = import_module(module).cli
+            commands[filename[4:-3]] = (module, cli.get_short_help_str(limit=1000))
+    return commands
+
+
+def render(commands):
+    """format the registry source as black would"""
+    lines = ["COMMANDS = {"]
+    for name, (module, short_help) in commands.items():
+        line = (
+            f"    {json.dumps(name)}: ({json.dumps(module)}, {json.dumps(short_help)}),"
+        )
+        if len(line) > 88:
+            lines.append(f"    {json.dumps(name)}: (")
+            lines.append(f"        {json.dumps(module)},")
+            lines.append(f"        {json.dumps(short_help)},")
+            lines.append("    ),")
+        else:
+            lines.append(line)
+    lines.append("}")
+    return HEADER + "\n".join(lines) + "\n"
+
+
+def main():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry.py")
+    # import every command before the current registry is truncated
+    source = render(scan_commands())
+    with open(path, "w") as ofp:
+        ofp.write(source)
+    print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
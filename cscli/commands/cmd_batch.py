@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import json
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from cscli.cli import Environment, pass_environment
+from cscli.output import json_writer, write
+
+# commands whose first argument names the resource they act on
+RESOURCE_COMMANDS = ["server", "drive", "ip", "vlan"]
+
+# options writing directly to stdout instead of returning a result
+STREAMING_OPTIONS = ["--text", "--columns", "--ndjson"]
+
+
+class BatchEnvironment(Environment):
+    """environment of one batch line, sharing the api client and capturing output"""
+
+    def __init__(self, parent):
+        super().__init__()
+        self.verbose = parent.verbose
+        self.compact = parent.compact
+        self.fmt = parent.fmt
+        self.client_args = parent.client_args
+        self.stats = parent.stats
+        self.api = parent.api
+        self.status = True
+        self.result = None
+
+    def output(self, item, status=True):
+        self.status = status
+        self.result = item
+
+    def confirm(self, resource, action, label, force):
+        # the batch input is not a terminal, so prompts cannot be answered
+        if not force:
+            self.error(f"{action} of {label} {resource['name']} requires --force")
+
+    def confirm_many(self, resources, action, label, force):
+        if not force:
+            self.error(f"{action} of {len(resources)} {label}s requires --force")
+
+
+def parse_line(line):
+    """return the id and argument list of a batch line
+
+    a line is a JSON array of arguments, a JSON string split like a shell
+    command, or an object with "args" and an optional "id"
+    """
+    spec = json.loads(line)
+    _id = None
+    if isinstance(spec, dict):
+        _id = spec.get("id")
+        spec = spec["args"]
+    if isinstance(spec, str):
+        spec = shlex.split(spec)
+    if not spec or not all(isinstance(arg, str) for arg in spec):
+        raise ValueError("expected a list of string arguments")
+    return _id, spec
+
+
+def run_line(root, env, number, line):
+    """run one batch line, returning its result record"""
+    ret = dict(line=number)
+    try:
+        _id, args = parse_line(line)
+    except (ValueError, KeyError, TypeError) as exc:
+        ret.update(status=False, result=f"invalid batch line: {exc}")
+        return ret
+    if _id is not None:
+        ret["id"] = _id
+    ret["args"] = args
+    local = BatchEnvironment(env)
+    try:
+        # as --opt or --opt=value
+        streaming = [
+            arg.split("=", 1)[0]
+            for arg in args
+            if arg.split("=", 1)[0] in STREAMING_OPTIONS
+        ]
+        if streaming:
+            raise click.UsageError(f"{streaming[0]} is not available in batch")
+        command = root.command.get_command(root, args[0])
+        if command is None:
+            raise click.UsageError(f"no such command '{args[0]}'")
+        with command.make_context(args[0], args[1:], parent=root, obj=local) as ctx:
+            command.invoke(ctx)
+    except SystemExit:
+        # Environment.error has already recorded the failure
+        pass
+    except click.exceptions.Exit:
+        pass
+    except click.ClickException as exc:
+        local.output(exc.format_message(), False)
+    except Exception as exc:
+        local.output(f"{type(exc).__name__}: {exc}", False)
+    ret.update(status=local.status, result=local.result)
+    return ret
+
+
+def resource_key(number, line):
+    """return the key serializing lines that act on the same resource"""
+    try:
+        _, args = parse_line(line)
+    except (ValueError, KeyError, TypeError):
+        return number
+    if len(args) > 1 and args[0] in RESOURCE_COMMANDS:
+        return tuple(args[:2])
+    return number
+
+
+def run_lines(root, env, lines, jobs):
+    """run lines concurrently, in order within each resource, return results"""
+    if not lines:
+        return []
+    groups = {}
+    for number, line in lines:
+        groups.setdefault(resource_key(number, line), []).append((number, line))
+
+    def run_group(group):
+        return [run_line(root, env, number, line) for number, line in group]
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = [ret for rets in pool.map(run_group, groups.values()) for ret in rets]
+    return sorted(results, key=lambda ret: ret["line"])
+
+
+@click.command("batch", short_help="run commands read from a JSON lines stream")
+@click.argument("input_file", metavar="FILE", type=click.File("r"), default="-")
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="lines to run at once; lines naming the same resource run in order",
+)
+@pass_environment
+def cli(ctx, input_file, jobs):
+    """run cscli commands from FILE (default stdin) with one shared client
+
+    each line is a JSON array of command arguments, such as
+    ["server", "web1", "start"], or an object {"id": ID, "args": [...]}.
+    One JSON result is written per line.  With --jobs, an empty line waits
+    for all earlier lines to finish.
+    """
+    root = click.get_current_context().find_root()
+
+    # construct the client once, before any worker thread needs it
+    ctx.api
+
+    def emit(ret):
+        with ctx.span("serialization", "emit"):
+            write(json_writer().dumps(ret, compact=True))
+
+    pending = []
+    for number, line in enumerate(input_file, 1):
+        if line.lstrip().startswith("#"):
+            continue
+        if not line.strip():
+            for ret in run_lines(root, ctx, pending, jobs):
+                emit(ret)
+            pending = []
+        elif jobs == 1:
+            emit(run_line(root, ctx, number, line))
+        else:
+            pending.append((number, line))
+    for ret in run_lines(root, ctx, pending, jobs):
+        emit(ret)
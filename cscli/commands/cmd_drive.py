@@ -1,17 +1,48 @@
 #!/usr/bin/env python3
 
+import sys
+
 import click
 
-from cscli import MIN_DISK
+from cscli import DOWNLOAD_RANGE_SIZE, MIN_DISK, UPLOAD_CHUNK_SIZE
+from cscli.bulk import apply, parse_selectors
 from cscli.cli import pass_environment
 
 
+def _progress(ctx):
+    """return a callback reporting transfer progress on stderr"""
+
+    def report(done, total):
+        percent = 100 * done // total if total else 100
+        click.echo(
+            f"\r{ctx.api.format_memory_value(done)}"
+            f" of {ctx.api.format_memory_value(total)} ({percent}%)",
+            file=sys.stderr,
+            nl=done >= total,
+        )
+
+    return report
+
+
 @click.group("drive", short_help="manage drives")
 @click.argument("drive", metavar="NAME_OR_UUID", type=str)
+@click.option(
+    "-F",
+    "--from-file",
+    metavar="FILE",
+    type=click.File("r"),
+    help="also select the drives named on each line of FILE",
+)
 @pass_environment
-def cli(ctx, drive):
-    """actions: create destroy list show modify snapshot upload download"""
+def cli(ctx, drive, from_file):
+    """actions: create destroy list show modify snapshot upload download
+
+    destroy, snapshot and modify accept several comma separated names, glob
+    patterns or /regex/ patterns, and report a result per drive
+    """
     ctx.drive_name = drive
+    # a NAME of - selects only the drives listed in FILE
+    ctx.drive_selectors = parse_selectors(drive, from_file)
 
 
 @cli.command()
@@ -65,12 +96,19 @@ def show(ctx):
 @pass_environment
 def destroy(ctx, force):
     """delete drive by name or uuid"""
-    drive = ctx.api.find_drive(ctx.drive_name)
-    uuid = drive["uuid"]
-    ctx.confirm(drive, "destruction", "drive", force)
-    ctx.output(
-        ctx.api.drive.delete(drive["uuid"])
-        or f"drive {uuid} '{ctx.drive_name}' destroyed"
+
+    def destroy_drive(drive):
+        return (
+            ctx.api.drive.delete(drive["uuid"])
+            or f"drive {drive['uuid']} '{drive['name']}' destroyed"
+        )
+
+    apply(
+        ctx,
+        "drive",
+        ctx.drive_selectors,
+        destroy_drive,
+        lambda drives: ctx.confirm_many(drives, "destruction", "drive", force),
     )
 
 
@@ -78,7 +116,7 @@ def destroy(ctx, force):
 @pass_environment
 def snapshot(ctx):
     """create drive snapshot"""
-    ctx.output(ctx.api.server.snapshot(ctx.api.find_drive(ctx.drive_name)))
+    apply(ctx, "drive", ctx.drive_selectors, ctx.api.snapshot_drive)
 
 
 @cli.command()
@@ -89,8 +127,16 @@ def snapshot(ctx):
 @pass_environment
 def modify(ctx, rename, media, multimount, storage_type):
     """change drive characteristics"""
-    ctx.output(
-        ctx.api.modify_drive(ctx.drive_name, rename, media, multimount, storage_type)
+    selectors = ctx.drive_selectors
+    if rename and not (len(selectors) == 1 and selectors[0].exact):
+        ctx.error("--rename requires a single drive")
+    apply(
+        ctx,
+        "drive",
+        selectors,
+        lambda drive: ctx.api.modify_drive(
+            drive["uuid"], rename, media, multimount, storage_type
+        ),
     )
 
 
@@ -111,10 +157,29 @@ def resize(ctx, size, force):
 @click.option(
     "-M", "--multimount", type=click.Choice(["enable", "disable"]), default="disable"
 )
+@click.option(
+    "-c",
+    "--chunk-size",
+    type=str,
+    default=UPLOAD_CHUNK_SIZE,
+    help="upload chunk size (supports M or G suffix)",
+)
+@click.option("--restart", is_flag=True, help="discard progress of an earlier upload")
 @pass_environment
-def upload(ctx, input, media, multimount):
+def upload(ctx, input, media, multimount, chunk_size, restart):
     """upload a binary disk image or ISO file"""
-    uuid = ctx.api.upload_drive_image(input)
+    if input.seekable():
+        uuid = ctx.api.upload_drive_chunked(
+            input,
+            ctx.drive_name,
+            media,
+            ctx.api.convert_memory_value(chunk_size),
+            restart,
+            progress=_progress(ctx) if sys.stderr.isatty() else None,
+        )
+    else:
+        # a pipe can only be sent as a single stream
+        uuid = ctx.api.upload_drive_image(input)
     drive = ctx.api.find_drive(uuid)
     ctx.output(
         ctx.api.modify_drive(drive["uuid"], ctx.drive_name, media, multimount, None)
@@ -123,7 +188,28 @@ def upload(ctx, input, media, multimount):
 
 @cli.command()
 @click.argument("image-file", type=click.File("wb"))
+@click.option(
+    "-r",
+    "--range-size",
+    type=str,
+    default=DOWNLOAD_RANGE_SIZE,
+    help="bytes fetched per parallel request (supports M or G suffix)",
+)
+@click.option(
+    "-C",
+    "--checksum",
+    type=click.Choice(["md5", "sha1", "sha256"]),
+    help="compute a checksum of the image during the download",
+)
 @pass_environment
-def download(ctx, image_file):
+def download(ctx, image_file, range_size, checksum):
     """download drive image to local file"""
-    ctx.output(ctx.api.download(ctx.drive_name, image_file))
+    ctx.output(
+        ctx.api.download_drive_image(
+            ctx.drive_name,
+            image_file,
+            ctx.api.convert_memory_value(range_size),
+            checksum,
+            progress=_progress(ctx) if sys.stderr.isatty() else None,
+        )
+    )
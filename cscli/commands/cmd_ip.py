@@ -43,7 +43,7 @@ def show(ctx):
 @pass_environment
 def modify(ctx, rename, description):
     """modify IP attributes"""
-    ip = ctx.api.find_ip(ctx.ip_name)
+    ip = ctx.api.current_ip(ctx.ip_name)
     if rename:
         ip["meta"]["name"] = rename
     if description:
@@ -4,6 +4,32 @@ import click
 
 from cscli.cli import pass_environment
 from cscli.error import ParameterError
+from cscli.output import YAMLDocuments, json_writer, write
+from cscli.table import parse_columns, write_tables
+
+
+def _items(resources, fmt, keyed):
+    """yield each resource, keyed by listing name if keyed"""
+    for name, item in resources:
+        if fmt == "uuid":
+            item = next(iter(item))
+        if keyed:
+            item = {name: item}
+        yield item
+
+
+def _stream(resources, fmt, keyed):
+    """write each resource as a line of JSON"""
+    dumps = json_writer().dumps
+    for item in _items(resources, fmt, keyed):
+        write(dumps(item, compact=True))
+
+
+def _stream_yaml(resources, fmt, keyed):
+    """write each resource as a YAML document"""
+    with YAMLDocuments() as documents:
+        for item in _items(resources, fmt, keyed):
+            documents.write(item)
 
 
 @click.command("list", short_help="list resources by type")
@@ -48,11 +74,30 @@ from cscli.error import ParameterError
     "fmt",
     "--text",
     flag_value="text",
-    help="text output",
+    help="text output, a table of each resource type",
+)
+@click.option(
+    "--columns",
+    metavar="NAME[,NAME...]",
+    help="table columns to show; implies --text",
+)
+@click.option(
+    "-f",
+    "--filter",
+    "_filter",
+    metavar="FIELD[__OP]=VALUE",
+    type=str,
+    multiple=True,
+    help="select resources by field; OP is one of exact iexact contains icontains"
+    " startswith endswith regex in gt gte lt lte",
+)
+@click.option(
+    "--ndjson",
+    is_flag=True,
+    help="stream one JSON resource per line as each is formatted",
 )
-@click.option("-f", "--filter", "_filter", type=str, multiple=True)
 @pass_environment
-def cli(ctx, resource, fmt, _filter):
+def cli(ctx, resource, fmt, _filter, ndjson, columns):
     """list resources: servers drives libdrives ips venvs capabilities subscriptions"""
     list_map = {
         "servers": ctx.api.list_servers,
@@ -65,6 +110,11 @@ def cli(ctx, resource, fmt, _filter):
         None: ctx.api.list_all,
     }
 
+    if columns:
+        if fmt not in [None, "text"]:
+            raise ParameterError("--columns selects the columns of --text output")
+        fmt = "text"
+
     if resource == "capabilities" and fmt not in [None, "detail"]:
         raise ParameterError(f"{resource} cannot be formatted as {fmt}")
 
@@ -73,22 +123,27 @@ def cli(ctx, resource, fmt, _filter):
 
     _filter = list(_filter)
 
-    ret = list_map[resource](fmt, _filter)
     if fmt == "text":
-        click.echo("=" * 79)
-        for name, data in ret.items():
-            first = True
-            for result in data:
-                for uuid, lines in result.items():
-                    if first:
-                        first = False
-                    else:
-                        click.echo("-" * 79)
-                    click.echo(f"{name[:-1]} {uuid}")
-                    for line in lines:
-                        click.echo("   " + line)
-            click.echo("=" * 79)
-    elif fmt == "uuid":
+        if ndjson:
+            raise ParameterError("text output cannot be streamed as ndjson")
+        with ctx.span("serialization", "table"):
+            write_tables(
+                ctx.api.stream_resources(resource, "brief", _filter),
+                parse_columns(columns),
+                keyed=resource is None,
+            )
+        return
+
+    if ndjson or ctx.documents:
+        stream = _stream if ndjson else _stream_yaml
+        with ctx.span("serialization", "stream"):
+            stream(
+                ctx.api.stream_resources(resource, fmt, _filter), fmt, resource is None
+            )
+        return
+
+    ret = list_map[resource](fmt, _filter)
+    if fmt == "uuid":
         uuids = {}
         for name, data in ret.items():
             uuids[name] = [u for u in [list(d.keys())[0] for d in data] if u]
@@ -1,12 +1,13 @@
 import secrets
 import string
 import subprocess
-import time
 
 import click
 
 from cscli import MIN_CPU, MIN_DISK, MIN_MHZ, MIN_RAM, PASSWORD_LEN
+from cscli.bulk import apply, parse_selectors
 from cscli.cli import pass_environment
+from cscli.wait import DEFAULT_STATUS, WaitTarget, wait_for
 
 
 def mkpasswd(length):
@@ -21,10 +22,23 @@ def mkpasswd(length):
 
 @click.group(name="server")
 @click.argument("name", type=str, metavar="SERVER_NAME_OR_UUID")
+@click.option(
+    "-F",
+    "--from-file",
+    metavar="FILE",
+    type=click.File("r"),
+    help="also select the servers named on each line of FILE",
+)
 @pass_environment
-def cli(ctx, name):
-    """server actions: create list show destroy attach detach start stop ttyopen, ttyclose, shutdown"""
+def cli(ctx, name, from_file):
+    """server actions: create list show destroy attach detach start stop ttyopen, ttyclose, shutdown
+
+    start, stop, shutdown, destroy and modify accept several comma separated
+    names, glob patterns or /regex/ patterns, and report a result per server
+    """
     ctx.server_name = name
+    # a NAME of - selects only the servers listed in FILE
+    ctx.server_selectors = parse_selectors(name, from_file)
 
 
 @cli.command()
@@ -94,16 +108,23 @@ def create(
 @pass_environment
 def destroy(ctx, keep_drives, force):
     """delete server, optionally preserve drives, always preserve cdroms"""
-    server = ctx.api.find_server(ctx.server_name)
-    uuid = server["uuid"]
-    ctx.confirm(server, "destruction", "server", force)
     if keep_drives:
         drives = None
     else:
         drives = "disks"
-    ctx.output(
-        ctx.api.server.delete(server["uuid"], drives)
-        or f"server {uuid} '{ctx.server_name}' destroyed"
+
+    def destroy_server(server):
+        return (
+            ctx.api.server.delete(server["uuid"], drives)
+            or f"server {server['uuid']} '{server['name']}' destroyed"
+        )
+
+    apply(
+        ctx,
+        "server",
+        ctx.server_selectors,
+        destroy_server,
+        lambda servers: ctx.confirm_many(servers, "destruction", "server", force),
     )
 
 
@@ -111,21 +132,36 @@ def destroy(ctx, keep_drives, force):
 @pass_environment
 def start(ctx):
     """power on"""
-    ctx.output(ctx.api.server.start(ctx.api.find_server(ctx.server_name)["uuid"]))
+    apply(
+        ctx,
+        "server",
+        ctx.server_selectors,
+        lambda server: ctx.api.server.start(server["uuid"]),
+    )
 
 
 @cli.command()
 @pass_environment
 def stop(ctx):
     """power off"""
-    ctx.output(ctx.api.server.stop(ctx.api.find_server(ctx.server_name)["uuid"]))
+    apply(
+        ctx,
+        "server",
+        ctx.server_selectors,
+        lambda server: ctx.api.server.stop(server["uuid"]),
+    )
 
 
 @cli.command()
 @pass_environment
 def shutdown(ctx):
     """ACPI shutdown (soft power switch)"""
-    ctx.output(ctx.api.server.shutdown(ctx.api.find_server(ctx.server_name)["uuid"]))
+    apply(
+        ctx,
+        "server",
+        ctx.server_selectors,
+        lambda server: ctx.api.server.shutdown(server["uuid"]),
+    )
 
 
 @cli.command()
@@ -193,22 +229,30 @@ def vnc(ctx, close):
 
 @cli.command()
 @click.option(
-    "-s", "--status", type=str, default="started", help="desired server status"
+    "-s",
+    "--status",
+    type=str,
+    default=DEFAULT_STATUS["server"],
+    help="desired server status [running]",
 )
 @click.option(
     "-t", "--timeout", type=int, default=15, help="timeout in seconds, 0=infinite"
 )
+@click.option(
+    "--events/--poll",
+    default=True,
+    help="watch websocket notifications, or only poll [events]",
+)
 @pass_environment
-def wait(ctx, status, timeout):
+def wait(ctx, status, timeout, events):
     """wait for server status"""
-    server = ctx.api.find_server(ctx.server_name)
-    if timeout:
-        timeout = time.time() + timeout
-    while server["status"] != status:
-        server = ctx.api.find_server(ctx.server_name)
-        if timeout and time.time() > timeout:
-            ctx.error(f"Timeout waiting for server {ctx.server_name} status {status}")
-    ctx.output({"uuid": server["uuid"], "status": server["status"]})
+    target = WaitTarget("server", ctx.server_name, status)
+    if not wait_for(ctx.api, [target], timeout, log=ctx.log, subscribe=events):
+        ctx.error(
+            target.error
+            or f"Timeout waiting for server {ctx.server_name} status {status}"
+        )
+    ctx.output({"uuid": target.uuid, "status": target.current})
 
 
 @cli.command()
@@ -218,7 +262,7 @@ def wait(ctx, status, timeout):
 @pass_environment
 def attach(ctx, drive, dev_channel, device):
     """attach drive to server"""
-    server = ctx.api.find_server(ctx.server_name)
+    server = ctx.api.current_server(ctx.server_name)
     attachment = dict(
         drive=ctx.api.find_drive(drive),
         dev_channel=dev_channel,
@@ -234,7 +278,7 @@ def attach(ctx, drive, dev_channel, device):
 @pass_environment
 def detach(ctx, drive):
     """detach drive from server"""
-    server = ctx.api.find_server(ctx.server_name)
+    server = ctx.api.current_server(ctx.server_name)
     drive_uuid = ctx.api.find_drive(drive)["uuid"]
     found = False
     for index, attached_drive in enumerate(server["drives"]):
@@ -263,7 +307,7 @@ def detach(ctx, drive):
 @pass_environment
 def nic(ctx, action, config, model, ip, mac, vlan):
     """add, delete, or modify network interfaces"""
-    server = ctx.api.find_server(ctx.server_name)
+    server = ctx.api.current_server(ctx.server_name)
     server.setdefault("nics", [])
 
     new_nic = {}
@@ -329,16 +373,23 @@ def nic(ctx, action, config, model, ip, mac, vlan):
 def modify(ctx, rename, cpu, speed, memory, password, smp):
     """modify server attributes"""
 
-    server = ctx.api.find_server(ctx.server_name)
-    if rename:
-        server["name"] = rename
-    if cpu or speed:
-        server["cpu"] = cpu * speed
-        server["smp"] = cpu
-    if memory:
-        server["mem"] = ctx.api.convert_memory_value(memory)
-    if password:
-        server["vnc_password"] = password
-    if smp:
-        server["cpus_instead_of_cores"] = bool(smp == "cpu")
-    ctx.output(ctx.api.server.update(server["uuid"], server))
+    selectors = ctx.server_selectors
+    if rename and not (len(selectors) == 1 and selectors[0].exact):
+        ctx.error("--rename requires a single server")
+
+    def modify_server(server):
+        server = ctx.api.current_server(server["uuid"])
+        if rename:
+            server["name"] = rename
+        if cpu or speed:
+            server["cpu"] = cpu * speed
+            server["smp"] = cpu
+        if memory:
+            server["mem"] = ctx.api.convert_memory_value(memory)
+        if password:
+            server["vnc_password"] = password
+        if smp:
+            server["cpus_instead_of_cores"] = bool(smp == "cpu")
+        return ctx.api.server.update(server["uuid"], server)
+
+    apply(ctx, "server", selectors, modify_server)
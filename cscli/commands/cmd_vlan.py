@@ -41,7 +41,7 @@ def show(ctx):
 @pass_environment
 def modify(ctx, rename, description):
     """modify VLAN attributes"""
-    vlan = ctx.api.find_vlan(ctx.vlan_name)
+    vlan = ctx.api.current_vlan(ctx.vlan_name)
     if rename:
         vlan["meta"]["name"] = rename
     if description:
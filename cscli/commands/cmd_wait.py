@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import click
+
+from cscli.cli import pass_environment
+from cscli.wait import MIN_INTERVAL, WaitTarget, wait_for
+
+
+@click.command("wait", short_help="wait for server and drive status")
+@click.argument("targets", metavar="TARGET...", nargs=-1, required=True)
+@click.option(
+    "-s",
+    "--status",
+    type=str,
+    help="status for targets without =STATUS [server: running, drive: unmounted]",
+)
+@click.option(
+    "-t", "--timeout", type=int, default=60, help="timeout in seconds, 0=infinite"
+)
+@click.option(
+    "-i",
+    "--interval",
+    type=float,
+    default=MIN_INTERVAL,
+    help="initial seconds between polls",
+)
+@click.option(
+    "--events/--poll",
+    default=True,
+    help="watch websocket notifications, or only poll [events]",
+)
+@pass_environment
+def cli(ctx, targets, status, timeout, interval, events):
+    """wait for multiple servers and drives to reach a status
+
+    TARGET is [server:|drive:]NAME_OR_UUID[=STATUS], the type defaults to server;
+    a STATUS of deleted waits for the resource to be destroyed
+    """
+    targets = [WaitTarget.parse(target, status) for target in targets]
+    done = wait_for(ctx.api, targets, timeout, interval, log=ctx.log, subscribe=events)
+    ctx.output([target.report() for target in targets], done)
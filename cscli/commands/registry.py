@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+# generated by `python -m cscli.commands`; do not edit
+#
+# maps each built-in command name to its module and short help, so the
+# command line can list commands without importing them
+
+COMMANDS = {
+    "batch": ("cscli.commands.cmd_batch", "run commands read from a JSON lines stream"),
+    "drive": ("cscli.commands.cmd_drive", "manage drives"),
+    "ip": ("cscli.commands.cmd_ip", "manage ip addresses"),
+    "list": ("cscli.commands.cmd_list", "list resources by type"),
+    "server": (
+        "cscli.commands.cmd_server",
+        "server actions: create list show destroy attach detach start stop ttyopen, ttyclose, shutdown",
+    ),
+    "vlan": (
+        "cscli.commands.cmd_vlan",
+        "VLAN actions: create list show modify destroy",
+    ),
+    "wait": ("cscli.commands.cmd_wait", "wait for server and drive status"),
+}
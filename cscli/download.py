@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .error import DownloadError
+
+DEFAULT_RANGE_SIZE = 8 * 1024 ** 2
+
+# bytes read from the network and written to the output at a time
+BUFFER_SIZE = 64 * 1024
+
+# attempts per range after the first failure
+RETRIES = 3
+
+
+class RangeDownload(object):
+    """streaming download of a drive image, fetching byte ranges in parallel
+
+    ranges are written at their offsets as they arrive; all-zero buffers are
+    skipped when the output is a new regular file, leaving holes in it
+    """
+
+    def __init__(
+        self,
+        session,
+        url,
+        size,
+        output,
+        range_size=DEFAULT_RANGE_SIZE,
+        buffer_size=BUFFER_SIZE,
+        workers=4,
+        retries=RETRIES,
+        retry_delay=1.0,
+        checksum=None,
+        progress=None,
+    ):
+        self.session = session
+        self.url = url
+        self.size = size
+        self.output = output
+        self.range_size = range_size
+        self.buffer_size = buffer_size
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.hash = hashlib.new(checksum) if checksum else None
+        self.progress = progress
+        self.lock = threading.Lock()
+        self.failed = threading.Event()
+        self.received = 0
+        self.written = 0
+        self.ranges = [
+            (offset, min(range_size, size - offset))
+            for offset in range(0, size, range_size)
+        ]
+        self.finished = set()
+        self.hashed = 0
+        self.sparse = False
+        try:
+            output.flush()
+            self.fd = output.fileno()
+            mode = os.fstat(self.fd)
+        except (AttributeError, OSError):
+            self.fd = None
+        else:
+            if not output.seekable():
+                self.fd = None
+            # never punch holes into existing data or devices
+            self.sparse = stat.S_ISREG(mode.st_mode) and mode.st_size == 0
+        self.read_fd = None
+        if self.fd is not None and self.hash:
+            # the checksum reads back completed ranges in order
+            try:
+                self.read_fd = os.open(output.name, os.O_RDONLY)
+            except (AttributeError, TypeError, OSError):
+                self.fd = None
+
+    def _report(self, length):
+        with self.lock:
+            self.received += length
+            if self.progress:
+                self.progress(self.received, self.size)
+
+    def _write(self, buf, offset):
+        if self.sparse and buf.count(0) == len(buf):
+            return
+        os.pwrite(self.fd, buf, offset)
+        with self.lock:
+            self.written += len(buf)
+
+    def _complete(self, index):
+        """hash the contiguous completed ranges, reading back what was written"""
+        with self.lock:
+            self.finished.add(index)
+            if not self.hash:
+                return
+            while self.hashed in self.finished:
+                offset, length = self.ranges[self.hashed]
+                end = offset + length
+                while offset < end:
+                    buf = os.pread(
+                        self.read_fd, min(self.buffer_size, end - offset), offset
+                    )
+                    self.hash.update(buf)
+                    offset += len(buf)
+                self.hashed += 1
+
+    def _get(self, start, end):
+        headers = {}
+        if start or end < self.size:
+            headers["Range"] = f"bytes={start}-{end - 1}"
+        response = self.session.get(self.url, headers=headers, stream=True)
+        if response.status_code == 206 or (response.status_code == 200 and not headers):
+            return response
+        response.close()
+        raise DownloadError(
+            f"unexpected status {response.status_code} for bytes {start}-{end - 1}"
+        )
+
+    def _fetch(self, index):
+        offset, length = self.ranges[index]
+        position, end = offset, offset + length
+        for attempt in range(self.retries + 1):
+            if self.failed.is_set():
+                return
+            if attempt:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                with self._get(position, end) as response:
+                    for buf in response.iter_content(self.buffer_size):
+                        buf = buf[: end - position]
+                        self._write(buf, position)
+                        position += len(buf)
+                        self._report(len(buf))
+                if position >= end:
+                    self._complete(index)
+                    return
+                error = f"short read at byte {position}"
+            except (requests.RequestException, DownloadError) as exc:
+                # resume the range from the last byte received
+                error = str(exc)
+        self.failed.set()
+        raise DownloadError(
+            f"bytes {offset}-{end - 1} failed after {attempt + 1} attempts; {error}"
+        )
+
+    def _stream(self):
+        """download sequentially into a non-seekable output"""
+        with self._get(0, self.size) as response:
+            for buf in response.iter_content(self.buffer_size):
+                self.output.write(buf)
+                if self.hash:
+                    self.hash.update(buf)
+                self._report(len(buf))
+        if self.received != self.size:
+            raise DownloadError(f"short read at byte {self.received}")
+
+    def run(self):
+        """download the image, returning the checksum hexdigest if requested"""
+        if self.fd is None:
+            self._stream()
+        else:
+            os.ftruncate(self.fd, self.size)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(self._fetch, index) for index in range(len(self.ranges))
+                ]
+            if self.read_fd is not None:
+                os.close(self.read_fd)
+            for future in futures:
+                future.result()
+        return self.hash.hexdigest() if self.hash else None
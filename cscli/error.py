@@ -12,3 +12,15 @@ class ParameterError(CloudSigmaClientError):
 
 class ResourceNotFound(CloudSigmaClientError):
     pass
+
+
+class EventError(CloudSigmaClientError):
+    pass
+
+
+class UploadError(CloudSigmaClientError):
+    pass
+
+
+class DownloadError(CloudSigmaClientError):
+    pass
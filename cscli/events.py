@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import json
+import socket
+import time
+
+import websocket
+
+from .error import EventError
+
+
+class EventSource(object):
+    """resource change notifications from the CloudSigma websocket"""
+
+    def __init__(self, endpoint, cookie, timeout=10):
+        try:
+            self.conn = websocket.create_connection(
+                endpoint, timeout=timeout, header=[f"Cookie: async_auth={cookie}"]
+            )
+        except (OSError, websocket.WebSocketException) as exc:
+            raise EventError(f"websocket connect failed: {exc}")
+
+    def recv(self, timeout):
+        """return the next notification, or None if none arrives within timeout"""
+        self.conn.settimeout(timeout)
+        try:
+            frame = self.conn.recv()
+        except (socket.timeout, websocket.WebSocketTimeoutException):
+            return None
+        except (OSError, websocket.WebSocketException) as exc:
+            raise EventError(f"websocket receive failed: {exc}")
+        if not frame:
+            raise EventError("websocket closed")
+        try:
+            return json.loads(frame)
+        except ValueError:
+            raise EventError(f"invalid websocket frame: {frame!r}")
+
+    def wait(self, targets, timeout):
+        """return the targets named by notifications received within timeout"""
+        end = time.monotonic() + timeout
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return []
+            frame = self.recv(remaining)
+            if frame is None:
+                return []
+            touched = [target for target in targets if notifies(frame, target)]
+            if touched:
+                return touched
+
+    def close(self):
+        # notifications are one-way, so skip the closing handshake
+        self.conn.shutdown()
+
+
+def notifies(frame, target):
+    """return True if a notification frame concerns target"""
+    if not target.uuid or not isinstance(frame, dict):
+        return False
+    return frame.get("uuid") == target.uuid or target.uuid in str(
+        frame.get("resource_uri", "")
+    )
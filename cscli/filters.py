@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import re
+
+from .error import ParameterError
+
+# filter keys accepted as query parameters by each resource type's listing
+PUSHDOWN_KEYS = dict(
+    server=["name", "status", "uuid"],
+    drive=["name", "status", "media", "storage_type", "uuid"],
+    libdrive=[
+        "name",
+        "name__icontains",
+        "os",
+        "arch",
+        "distribution",
+        "version",
+        "media",
+        "image_type",
+    ],
+    vlan=[],
+    ip=[],
+    subscription=["resource", "status"],
+)
+
+# filter keys kept for compatibility, and the keys they stand for
+ALIASES = dict(name_contains="name__icontains")
+
+# filter key matching words of the descriptive fields of a resource
+SEARCH_KEY = "search"
+SEARCH_FIELDS = ["name", "os", "version", "description"]
+
+
+def search_terms(text):
+    """return the lowercase words of text"""
+    return re.findall(r"\w+", text.lower())
+
+
+def _text(value):
+    """return a resource value as it would be written in a filter"""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if value is None:
+        return "null"
+    if isinstance(value, dict) and "uuid" in value:
+        return value["uuid"]
+    return str(value)
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(compare):
+    def match(value, expected):
+        a, b = _number(value), _number(expected)
+        if a is None or b is None:
+            return compare(value, expected)
+        return compare(a, b)
+
+    return match
+
+
+OPERATORS = dict(
+    exact=lambda value, expected: value == expected,
+    iexact=lambda value, expected: value.lower() == expected.lower(),
+    contains=lambda value, expected: expected in value,
+    icontains=lambda value, expected: expected.lower() in value.lower(),
+    startswith=lambda value, expected: value.startswith(expected),
+    endswith=lambda value, expected: value.endswith(expected),
+    regex=lambda value, expected: re.search(expected, value) is not None,
+    gt=_compare(lambda value, expected: value > expected),
+    gte=_compare(lambda value, expected: value >= expected),
+    lt=_compare(lambda value, expected: value < expected),
+    lte=_compare(lambda value, expected: value <= expected),
+)
+
+
+class Filter(object):
+    """a list filter: FIELD[__OPERATOR]=VALUE, with dotted FIELD for nested values
+
+    a value given for a list, such as the drives of a server, matches when
+    any element matches; the in operator takes a comma separated VALUE, and
+    search=TERMS matches resources with each term starting a word of their
+    name, os, version or description
+    """
+
+    def __init__(self, spec):
+        key, sep, value = spec.partition("=")
+        if not sep or not key:
+            raise ParameterError(f"filter '{spec}' is not KEY=VALUE")
+        key = ALIASES.get(key, key)
+        self.key = key
+        self.value = value
+        self.field, _, operator = key.partition("__")
+        operator = operator or "exact"
+        if operator == "in":
+            choices = set(value.split(","))
+            self.compare = lambda value, expected: value in choices
+        elif operator in OPERATORS:
+            self.compare = OPERATORS[operator]
+        else:
+            raise ParameterError(f"unknown filter operator '{operator}' in '{spec}'")
+        if operator == "regex":
+            try:
+                re.compile(value)
+            except re.error as exc:
+                raise ParameterError(f"bad filter regex '{value}': {exc}")
+        self.path = self.field.split(".")
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+    def _values(self, resource):
+        """return the values at the filter's field, flattening lists"""
+        values = [resource]
+        for part in self.path:
+            found = []
+            for value in values:
+                if not isinstance(value, dict) or part not in value:
+                    continue
+                value = value[part]
+                if isinstance(value, list):
+                    found.extend(value)
+                else:
+                    found.append(value)
+            values = found
+        return values
+
+    def matches(self, resource):
+        if self.key == SEARCH_KEY:
+            # every term must begin a word of one of the searched fields
+            words = search_terms(
+                " ".join(_text(resource.get(field) or "") for field in SEARCH_FIELDS)
+            )
+            return all(
+                any(word.startswith(term) for word in words)
+                for term in search_terms(self.value)
+            )
+        return any(
+            self.compare(_text(value), self.value) for value in self._values(resource)
+        )
+
+
+def parse_filters(args):
+    """return the Filters of list --filter arguments"""
+    return [Filter(arg) for arg in args or []]
+
+
+def pushdown(_type, filters):
+    """split filters into query parameters for the API and the filters left over"""
+    keys = PUSHDOWN_KEYS.get(_type, [])
+    params = {}
+    remaining = []
+    for _filter in filters:
+        if _filter.key in keys and _filter.key not in params:
+            params[_filter.key] = _filter.value
+        else:
+            remaining.append(_filter)
+    return params, remaining
+
+
+def predicate(filters):
+    """return a function matching resources that pass every filter"""
+    if not filters:
+        return lambda resource: True
+    return lambda resource: all(_filter.matches(resource) for _filter in filters)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .error import ResourceNotFound
+
+
+class ResourceIndex(object):
+    """snapshot of resource listings, fetched at most once per resource type"""
+
+    def __init__(self, loader, stats=None):
+        self.loader = loader
+        self.stats = stats
+        self.snapshots = {}
+
+    def _snapshot(self, _type):
+        snapshot = self.snapshots.get(_type)
+        if self.stats:
+            self.stats.count("index", snapshot is not None)
+        if snapshot is None:
+            snapshot = self.load(_type, self.loader(_type))
+        return snapshot
+
+    def load(self, _type, items):
+        """install a listing of _type, replacing any existing snapshot"""
+        by_uuid = {}
+        by_name = {}
+        for item in items:
+            by_uuid.setdefault(item.get("uuid"), item)
+            name = item.get("name")
+            if name is not None:
+                by_name.setdefault(name, item)
+        snapshot = dict(items=items, uuid=by_uuid, name=by_name)
+        self.snapshots[_type] = snapshot
+        return snapshot
+
+    def prefetch(self, types, workers=None):
+        """load any missing snapshots of types concurrently"""
+        missing = [
+            _type for _type in dict.fromkeys(types) if _type not in self.snapshots
+        ]
+        if self.stats:
+            for _type in dict.fromkeys(types):
+                self.stats.count("index", _type not in missing)
+        if len(missing) > 1 and workers != 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                listings = list(pool.map(self.loader, missing))
+        else:
+            listings = [self.loader(_type) for _type in missing]
+        for _type, items in zip(missing, listings):
+            self.load(_type, items)
+
+    def list(self, _type):
+        return self._snapshot(_type)["items"]
+
+    def get(self, _type, uuid):
+        """return the resource of _type with uuid, or None"""
+        return self._snapshot(_type)["uuid"].get(uuid)
+
+    def find(self, _type, name):
+        """return the resource of _type matching name or uuid"""
+        snapshot = self._snapshot(_type)
+        resource = snapshot["uuid"].get(name) or snapshot["name"].get(name)
+        if resource is None:
+            raise ResourceNotFound(f"unknown {_type} {name}")
+        return resource
+
+    def invalidate(self, *types):
+        """discard snapshots of types, or all snapshots if none are given"""
+        if types:
+            for _type in types:
+                self.snapshots.pop(_type, None)
+        else:
+            self.snapshots.clear()
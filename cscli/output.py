@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import re
+import sys
+
+# JSON serializers in order of preference when CSCLI_JSON_BACKEND is unset
+BACKEND_PREFERENCE = ["orjson", "msgspec", "json"]
+
+# the end of a float written with an exponent; json writes these, and
+# floats under 0.0001 that the C serializers write in full, as repr does
+EXPONENT = re.compile(rb"e-?[0-9]+(?:[,}\]\s]|$)")
+SMALL_FLOAT = b"0.0000"
+
+
+def _json(item, compact):
+    if compact:
+        return json.dumps(item, separators=(",", ":")).encode()
+    return json.dumps(item, indent=2, separators=(", ", ": ")).encode()
+
+
+def _orjson():
+    import orjson
+
+    def dumps(item, compact):
+        return orjson.dumps(item, option=0 if compact else orjson.OPT_INDENT_2)
+
+    return dumps, (TypeError, orjson.JSONEncodeError)
+
+
+def _msgspec():
+    import msgspec
+
+    def dumps(item, compact):
+        out = msgspec.json.encode(item)
+        return out if compact else msgspec.json.format(out, indent=2)
+
+    return dumps, (TypeError, msgspec.EncodeError)
+
+
+BACKENDS = dict(orjson=_orjson, msgspec=_msgspec)
+
+
+class JSONWriter(object):
+    """serialize results with the fastest available JSON backend
+
+    compact output is byte-for-byte what the json module writes; output
+    the C backends would write differently, such as non-ASCII text or
+    floats with exponents, is serialized by the json module instead
+    """
+
+    def __init__(self, backend=None):
+        names = [backend] if backend else BACKEND_PREFERENCE
+        self.name = "json"
+        self._dumps, self._errors = None, ()
+        for name in names:
+            if name not in BACKENDS:
+                break
+            try:
+                self._dumps, self._errors = BACKENDS[name]()
+            except ImportError:
+                continue
+            self.name = name
+            break
+
+    def dumps(self, item, compact=False):
+        """return item serialized as JSON bytes"""
+        if self._dumps:
+            try:
+                out = self._dumps(item, compact)
+            except self._errors:
+                out = None
+            if (
+                out is not None
+                and out.isascii()
+                and SMALL_FLOAT not in out
+                and not EXPONENT.search(out)
+            ):
+                return out
+        return _json(item, compact)
+
+
+_writer = None
+
+
+def json_writer():
+    """return the JSON writer selected by CSCLI_JSON_BACKEND or availability"""
+    global _writer
+    if _writer is None:
+        _writer = JSONWriter(os.getenv("CSCLI_JSON_BACKEND"))
+    return _writer
+
+
+def write(data, stream=None):
+    """write bytes and a newline to the binary layer of stream, or stdout"""
+    stream = stream or sys.stdout
+    buffer = getattr(stream, "buffer", None)
+    if buffer is None:
+        stream.write(data.decode() + "\n")
+        stream.flush()
+        return
+    stream.flush()
+    buffer.write(data)
+    buffer.write(b"\n")
+    buffer.flush()
+
+
+def yaml_dumper():
+    """return the libyaml dumper if PyYAML was built with it"""
+    import yaml
+
+    return getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def write_yaml(item, stream=None):
+    """emit item as a YAML document directly to stream, or stdout"""
+    import yaml
+
+    yaml.dump(item, stream or sys.stdout, Dumper=yaml_dumper())
+
+
+class YAMLDocuments(object):
+    """write each item as its own YAML document as soon as it is given"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.dumper = yaml_dumper()(self.stream, explicit_start=True)
+        self.dumper.open()
+
+    def write(self, item):
+        self.dumper.represent(item)
+        self.stream.flush()
+
+    def close(self):
+        self.dumper.close()
+        self.dumper.dispose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PAGE_SIZE = 100
+
+# pages requested ahead of the one being consumed
+DEFAULT_PREFETCH = 2
+
+
+def iter_pages(fetch, page_size=DEFAULT_PAGE_SIZE, prefetch=DEFAULT_PREFETCH):
+    """yield pages returned by fetch(limit, offset), fetching ahead in the background
+
+    a short page ends the listing; when the caller stops early, pages that
+    have not been requested yet never are
+    """
+    prefetch = max(prefetch, 1)
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+    offset = 0
+
+    def request():
+        nonlocal offset
+        pending.append(pool.submit(fetch, page_size, offset))
+        offset += page_size
+
+    try:
+        request()
+        while pending:
+            page = pending.popleft().result()
+            last = len(page) < page_size
+            if not last:
+                while len(pending) < prefetch:
+                    request()
+            yield page
+            if last:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def iter_items(fetch, page_size=DEFAULT_PAGE_SIZE, prefetch=DEFAULT_PREFETCH):
+    """yield the items of each page returned by fetch(limit, offset)"""
+    for page in iter_pages(fetch, page_size, prefetch):
+        yield from page
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from .table import write_table
+
+# span categories split out of the wall time in the report
+CATEGORIES = ["network", "formatting", "serialization"]
+
+PERCENTILES = [50, 90, 99]
+
+# path segments naming one resource, reported as a single endpoint
+RESOURCE_ID = re.compile(
+    r"^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+    r"|[0-9]+(?:\.[0-9]+){3}|[0-9]+)$",
+    re.IGNORECASE,
+)
+
+
+def endpoint(method, path):
+    """return the endpoint of a request, with resource ids replaced by {id}"""
+    segments = ["{id}" if RESOURCE_ID.match(s) else s for s in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+def percentile(values, p):
+    """return the nearest-rank percentile p of sorted values"""
+    if not values:
+        return 0
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class Span(object):
+    """one timed operation of a category, with trace arguments"""
+
+    __slots__ = ("category", "name", "thread", "start", "duration", "own", "args")
+
+    def __init__(self, category, name, thread, start, args):
+        self.category = category
+        self.name = name
+        self.thread = thread
+        self.start = start
+        self.duration = 0.0
+        # time not spent in spans nested within this one
+        self.own = 0.0
+        self.args = args
+
+
+class Recorder(object):
+    """timed spans and cache counts of one invocation, for --stats and --trace-file
+
+    spans nest per thread, so the network time of a request made while a
+    listing is serialized is not also counted as serialization
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock()
+        self.main = threading.get_ident()
+        self.spans = []
+        self.caches = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, category, name, **args):
+        """time the enclosed block; args may be updated until it ends"""
+        stack = self._local.__dict__.setdefault("stack", [])
+        span = Span(category, name, threading.get_ident(), self.clock(), args)
+        stack.append(span)
+        try:
+            yield span.args
+        finally:
+            stack.pop()
+            span.duration = self.clock() - span.start
+            span.own += span.duration
+            if stack:
+                stack[-1].own -= span.duration
+            with self._lock:
+                self.spans.append(span)
+
+    def wrap(self, category, name, function):
+        """return function timed as a span on each call"""
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            with self.span(category, name):
+                return function(*args, **kwargs)
+
+        return timed
+
+    def count(self, cache, hit):
+        """count a lookup in cache as a hit or a miss"""
+        with self._lock:
+            self.caches[(cache, bool(hit))] += 1
+
+    def requests(self):
+        return [span for span in self.spans if span.name == "request"]
+
+    def endpoints(self):
+        """return a table row of call counts, latency and bytes of each endpoint"""
+        calls = {}
+        for span in self.requests():
+            calls.setdefault(span.args["endpoint"], []).append(span)
+        calls["all"] = self.requests()
+        rows = []
+        for name, spans in calls.items():
+            latency = sorted(span.duration * 1000 for span in spans)
+            row = dict(endpoint=name, calls=str(len(spans)))
+            retried = sum(span.args.get("attempt", 1) > 1 for span in spans)
+            row["retries"] = str(retried)
+            for p in PERCENTILES:
+                row[f"p{p}_ms"] = f"{percentile(latency, p):.1f}"
+            row["max_ms"] = f"{latency[-1]:.1f}" if latency else "0.0"
+            row["sent"] = str(sum(span.args.get("sent", 0) for span in spans))
+            row["received"] = str(sum(span.args.get("received", 0) for span in spans))
+            rows.append(row)
+        return rows
+
+    def times(self, end=None):
+        """return the wall time and its part spent in each category, in seconds
+
+        only spans of the main thread are split out; requests made on worker
+        threads count through the spans waiting for them
+        """
+        wall = (end or self.clock()) - self.start
+        ret = dict(wall=wall)
+        ret.update({category: 0.0 for category in CATEGORIES})
+        for span in self.spans:
+            if span.thread == self.main and span.category in ret:
+                ret[span.category] += span.own
+        ret["other"] = max(wall - sum(ret[c] for c in CATEGORIES), 0.0)
+        return ret
+
+    def report(self, stream=None):
+        """write call counts, latency, cache use and the wall time split"""
+        stream = stream or sys.stderr
+        write_table(self.endpoints(), stream=stream)
+        caches = sorted({cache for cache, _ in self.caches})
+        counts = ", ".join(
+            f"{cache} {self.caches[(cache, True)]} hit"
+            f" {self.caches[(cache, False)]} miss"
+            for cache in caches
+        )
+        stream.write(f"cache: {counts or 'unused'}\n")
+        times = self.times()
+        split = ", ".join(
+            f"{name} {times[name]:.3f}s" for name in CATEGORIES + ["other"]
+        )
+        stream.write(f"time: wall {times['wall']:.3f}s; {split}\n")
+        stream.flush()
+
+    def trace(self):
+        """return the spans as Chrome trace events"""
+        pid = os.getpid()
+        events = [
+            dict(
+                name=span.name,
+                cat=span.category,
+                ph="X",
+                ts=round((span.start - self.start) * 1e6, 3),
+                dur=round(span.duration * 1e6, 3),
+                pid=pid,
+                tid=span.thread,
+                args=span.args,
+            )
+            for span in sorted(self.spans, key=lambda span: span.start)
+        ]
+        events.append(
+            dict(
+                name="thread_name",
+                ph="M",
+                pid=pid,
+                tid=self.main,
+                args=dict(name="main"),
+            )
+        )
+        return dict(traceEvents=events, displayTimeUnit="ms")
+
+    def write_trace(self, path):
+        """write the spans to path in Chrome trace event format"""
+        with open(path, "w") as ofp:
+            json.dump(self.trace(), ofp)
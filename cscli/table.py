@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import sys
+from itertools import chain, groupby, islice
+
+from .error import ParameterError
+
+# rows read ahead to size the columns of a streamed table
+TABLE_SAMPLE = 1000
+
+# rows written to the output stream at once
+WRITE_ROWS = 512
+
+COLUMN_GAP = "  "
+
+
+def cell(value):
+    """return a formatted resource value as table cell text"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ",".join(cell(v) for v in value)
+    if isinstance(value, dict):
+        return ",".join(
+            f"{k}({cell(v)})" if isinstance(v, dict) else f"{k}={cell(v)}"
+            for k, v in value.items()
+        )
+    return str(value)
+
+
+def row(item):
+    """return the table row of a brief formatted resource {uuid: [{key: value}]}"""
+    ((uuid, data),) = item.items()
+    ret = dict(uuid=uuid)
+    for field in data:
+        for key, value in field.items():
+            ret[key] = cell(value)
+    return ret
+
+
+def parse_columns(columns):
+    """return the column names of a comma separated --columns value"""
+    return [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+
+def write_table(
+    rows, columns=None, stream=None, sample=TABLE_SAMPLE, strict=True, title=None
+):
+    """write rows of {column: text} as a table sized to the first sample rows
+
+    a cell wider than its column in a later row extends its line instead
+    of being cut; requested columns no sampled row has are an error if
+    strict, and left out otherwise; returns True if the table was written
+    """
+    stream = stream or sys.stdout
+    rows = iter(rows)
+    head = list(islice(rows, sample))
+    if not head:
+        return False
+    present = list(dict.fromkeys(key for r in head for key in r))
+    if columns is None:
+        columns = present
+    elif strict:
+        unknown = [c for c in columns if c not in present]
+        if unknown:
+            raise ParameterError(
+                f"unknown column {','.join(unknown)}; choose from {','.join(present)}"
+            )
+    else:
+        columns = [c for c in columns if c in present]
+        if not columns:
+            return False
+    widths = [len(c) for c in columns]
+    for r in head:
+        for i, c in enumerate(columns):
+            widths[i] = max(widths[i], len(r.get(c, "")))
+    # the last column is not padded
+    widths[-1] = 0
+    line = COLUMN_GAP.join(f"{{:<{w}}}" for w in widths)
+
+    def lines():
+        if title:
+            yield title
+        yield line.format(*(c.upper() for c in columns)).rstrip()
+        for r in chain(head, rows):
+            yield line.format(*(r.get(c, "") for c in columns)).rstrip()
+
+    lines = lines()
+    while True:
+        chunk = list(islice(lines, WRITE_ROWS))
+        if not chunk:
+            break
+        stream.write("\n".join(chunk) + "\n")
+    stream.flush()
+    return True
+
+
+def write_tables(resources, columns=None, keyed=False, stream=None):
+    """write a table of each listing in (listing name, brief resource) pairs
+
+    if keyed, each table is headed by its listing name and shows only the
+    requested columns its resources have
+    """
+    written = False
+    for name, items in groupby(resources, key=lambda pair: pair[0]):
+        rows = (row(item) for _, item in items)
+        title = None
+        if keyed:
+            title = f"\n{name}" if written else name
+        written |= write_table(rows, columns, stream, strict=not keyed, title=title)
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .error import ParameterError
+from .stats import endpoint
+
+# distinct hosts kept in the pool: the api and direct endpoints of a region
+POOL_HOSTS = 4
+
+# statuses of transient failures; 429 means the request was not processed,
+# so it is retried for any method, the others only for idempotent ones
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# errors of a host that cannot be resolved or refuses connections, which
+# fail at once instead of being retried
+UNREACHABLE_ERRORS = (socket.gaierror, ConnectionRefusedError)
+
+# methods sent again after a server error or a broken connection; POST
+# creates resources and runs actions, and a DELETE that succeeded would
+# answer its retry with 404
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT"])
+
+# seconds before the first retry, doubling with each one, with full jitter
+BACKOFF = 0.5
+BACKOFF_MAX = 30
+
+# a longer Retry-After gives up instead of waiting
+RETRY_AFTER_MAX = 120
+
+# GET responses kept to revalidate later requests of the same url, and the
+# largest body kept
+CONDITIONAL_ENTRIES = 1024
+CONDITIONAL_MAX = 1024 ** 2
+
+CONDITIONAL_HEADERS = ["If-None-Match", "If-Modified-Since", "Range"]
+
+# headers of a kept response that describe its encoded body
+ENCODING_HEADERS = ["Content-Encoding", "Content-Length", "Transfer-Encoding"]
+
+
+def region_setting(specs, region, default, convert=float):
+    """return the value for region of [REGION=]VALUE specs
+
+    a spec without a region applies to regions not named by another
+    """
+    if specs is None:
+        return default
+    if not isinstance(specs, (list, tuple)):
+        specs = [specs]
+    values = {}
+    for spec in specs:
+        name, _, value = str(spec).rpartition("=")
+        try:
+            value = convert(value)
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise ParameterError(f"expected [REGION=]VALUE of at least 0, not {spec}")
+        values[name.lower() or None] = value
+    region = region.lower() if region else None
+    return values.get(region, values.get(None, default))
+
+
+def unreachable(error):
+    """return True if error, or an error it wraps, shows the host cannot be
+    resolved or refused the connection"""
+    pending, seen = [error], set()
+    while pending:
+        error = pending.pop()
+        if not isinstance(error, BaseException) or id(error) in seen:
+            continue
+        if isinstance(error, UNREACHABLE_ERRORS):
+            return True
+        seen.add(id(error))
+        # requests and urllib3 wrap the socket error in args, reason or cause
+        pending.extend(error.args)
+        pending.extend(
+            [getattr(error, "reason", None), error.__cause__, error.__context__]
+        )
+    return False
+
+
+def last_modified(headers):
+    """return the Last-Modified of response headers if it can validate a later
+    request, or None
+
+    it has one second resolution, so a change made in the second the
+    response was sent would be answered 304; it is only used when the
+    response was sent in a later second than the last change
+    """
+    modified = headers.get("Last-Modified")
+    try:
+        changed = parsedate_to_datetime(modified).timestamp()
+        sent = parsedate_to_datetime(headers.get("Date")).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return modified if sent - changed >= 1 else None
+
+
+def retry_after(value):
+    """return the seconds to wait of a Retry-After header, or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy(object):
+    """whether and when a failed request is sent again"""
+
+    def __init__(self, retries, backoff=None, backoff_max=None):
+        self.retries = retries
+        self.backoff = BACKOFF if backoff is None else backoff
+        self.backoff_max = BACKOFF_MAX if backoff_max is None else backoff_max
+
+    def delay(self, request, response, retries, error=None):
+        """return the seconds to wait before resending request after retries
+        attempts, or None to give up; response is None if the connection
+        failed with error
+        """
+        if retries >= self.retries:
+            return None
+        # a streamed body cannot be sent twice
+        if not isinstance(request.body, (bytes, str, type(None))):
+            return None
+        idempotent = request.method in IDEMPOTENT_METHODS
+        if response is None:
+            if not idempotent or unreachable(error):
+                return None
+        elif response.status_code not in RETRY_STATUSES:
+            return None
+        elif response.status_code != 429 and not idempotent:
+            return None
+        else:
+            after = retry_after(response.headers.get("Retry-After"))
+            if after is not None:
+                return after if after <= RETRY_AFTER_MAX else None
+        return random.uniform(0, min(self.backoff * 2 ** retries, self.backoff_max))
+
+
+class TokenBucket(object):
+    """limit of requests per second shared by threads, in bursts of up to
+    one second's worth; a rate of 0 is unlimited"""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.capacity = max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = clock()
+        # no request is sent before this time
+        self.resume = self.updated
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """wait until a request may be sent"""
+        with self._lock:
+            now = self.clock()
+            start = max(now, self.resume)
+            if self.rate:
+                elapsed = start - self.updated
+                self.tokens = min(self.tokens + elapsed * self.rate, self.capacity)
+                self.updated = start
+                # take the token now and wait for it to be earned
+                self.tokens -= 1
+                if self.tokens < 0:
+                    start += -self.tokens / self.rate
+            wait = start - now
+        if wait > 0:
+            self.sleep(wait)
+
+    def defer(self, delay):
+        """hold every request for delay seconds"""
+        with self._lock:
+            self.resume = max(self.resume, self.clock() + delay)
+
+
+class ConditionalStore(object):
+    """validators and bodies of recent GET responses, so a repeated GET asks
+    whether its url changed and is answered from the kept body if not"""
+
+    def __init__(self, entries=CONDITIONAL_ENTRIES, size=CONDITIONAL_MAX):
+        self.entries = entries
+        self.size = size
+        self.saved = 0
+        self._kept = OrderedDict()
+        self._lock = threading.Lock()
+
+    def applies(self, request, stream):
+        """return True for a GET that does not make its own conditions"""
+        return (
+            request.method == "GET"
+            and not stream
+            and not any(header in request.headers for header in CONDITIONAL_HEADERS)
+        )
+
+    def prepare(self, request):
+        """add the validators of a kept response to request, returning it"""
+        with self._lock:
+            kept = self._kept.get(request.url)
+            if kept is not None:
+                self._kept.move_to_end(request.url)
+        if kept is not None:
+            request.headers.update(kept["validators"])
+        return kept
+
+    def update(self, request, response, kept):
+        """answer a 304 from the kept response, or keep a new response"""
+        if kept is not None and response.status_code == 304:
+            # read the empty body to release the connection
+            response.content
+            response.status_code = 200
+            response.headers.update(kept["headers"])
+            for header in ENCODING_HEADERS:
+                response.headers.pop(header, None)
+            response._content = kept["content"]
+            with self._lock:
+                self.saved += len(kept["content"])
+            return response
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if last_modified(response.headers):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        if response.status_code != 200 or not validators:
+            return response
+        content = response.content
+        if len(content) > self.size:
+            return response
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            if key not in ENCODING_HEADERS
+        }
+        with self._lock:
+            self._kept[request.url] = dict(
+                validators=validators, headers=headers, content=content
+            )
+            self._kept.move_to_end(request.url)
+            while len(self._kept) > self.entries:
+                self._kept.popitem(last=False)
+        return response
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def token_bucket(site, rate):
+    """return the rate limit shared by every client of site in the process"""
+    with _buckets_lock:
+        key = (site, rate)
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(rate)
+        return _buckets[key]
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTP adapter counting requests sent over its pooled connections
+
+    each attempt waits for the token bucket, if any, and transient failures
+    are sent again as the retry policy allows; with a conditional store, a
+    GET of a url already answered asks only whether it changed; with a
+    stats recorder, each attempt is timed as a network span with its
+    endpoint, status and body bytes sent and received
+    """
+
+    def __init__(
+        self,
+        pool_size,
+        stats=None,
+        retry=None,
+        bucket=None,
+        log=None,
+        conditional=None,
+    ):
+        self.requests = 0
+        self.retired = 0
+        self.stats = stats
+        self.retry = retry
+        self.bucket = bucket
+        self.log = log
+        self.conditional = conditional
+        self._lock = threading.Lock()
+        super().__init__(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+
+    def send(self, request, *args, **kwargs):
+        conditional = self.conditional
+        if conditional is None or not conditional.applies(
+            request, kwargs.get("stream")
+        ):
+            return self._send_retrying(request, args, kwargs)
+        kept = conditional.prepare(request)
+        response = self._send_retrying(request, args, kwargs)
+        return conditional.update(request, response, kept)
+
+    def _send_retrying(self, request, args, kwargs):
+        retries = 0
+        while True:
+            if self.bucket:
+                self.bucket.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self._send(request, retries, args, kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                delay = self._delay(request, None, retries, exc)
+                if delay is None:
+                    raise
+                response, failure = None, exc
+            else:
+                delay = self._delay(request, response, retries)
+                if delay is None:
+                    return response
+                failure = f"status {response.status_code}"
+            if response is not None:
+                if response.status_code == 429 and self.bucket:
+                    # the limit is the account's, so every thread waits
+                    self.bucket.defer(delay)
+                response.close()
+            if self.log:
+                self.log(
+                    "%s %s: %s; retry %d in %.1fs",
+                    request.method,
+                    request.url,
+                    failure,
+                    retries + 1,
+                    delay,
+                )
+            if self.stats:
+                with self.stats.span("network", "backoff"):
+                    time.sleep(delay)
+            else:
+                time.sleep(delay)
+            retries += 1
+
+    def _delay(self, request, response, retries, error=None):
+        if self.retry is None:
+            return None
+        return self.retry.delay(request, response, retries, error)
+
+    def _send(self, request, retries, args, kwargs):
+        if self.stats is None:
+            return super().send(request, *args, **kwargs)
+        path = urlparse(request.url).path
+        with self.stats.span(
+            "network", "request", endpoint=endpoint(request.method, path)
+        ) as span:
+            span["attempt"] = retries + 1
+            span["sent"] = _body_length(request)
+            response = super().send(request, *args, **kwargs)
+            span["status"] = response.status_code
+            span["received"] = _received(response, kwargs.get("stream"))
+        return response
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        # keep the connection count of host pools evicted from the manager
+        def retire(pool):
+            with self._lock:
+                self.retired += pool.num_connections
+            if dispose:
+                dispose(pool)
+
+        pools.dispose_func = retire
+
+    def connections(self):
+        """return the number of connections opened by this adapter"""
+        pools = self.poolmanager.pools
+        opened = sum(
+            pool.num_connections
+            for pool in (pools.get(key) for key in pools.keys())
+            if pool is not None
+        )
+        return self.retired + opened
+
+
+def _body_length(request):
+    body = request.body
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return int(request.headers.get("Content-Length") or 0)
+
+
+def _received(response, stream):
+    """return the body bytes of response as sent, reading it unless streamed"""
+    if not stream:
+        # requests reads the body next anyway; read it within the span
+        response.content
+        return response.raw.tell()
+    return int(response.headers.get("Content-Length") or 0)
+
+
+class ThreadResponse(object):
+    """mixin keeping the last response of a pycloudsigma client per thread"""
+
+    @property
+    def resp(self):
+        return getattr(self._responses, "resp", None)
+
+    @resp.setter
+    def resp(self, value):
+        self._responses.resp = value
+
+
+class Transport(object):
+    """one keep-alive session shared by every request to the CloudSigma API"""
+
+    def __init__(
+        self,
+        pool_size,
+        auth=None,
+        stats=None,
+        retry=None,
+        bucket=None,
+        log=None,
+        conditional=None,
+    ):
+        self.adapter = PooledAdapter(pool_size, stats, retry, bucket, log, conditional)
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def attach(self, *resources):
+        """route the requests of pycloudsigma resources through the session
+
+        a client keeps the response it is processing in its resp attribute;
+        each thread is given its own, so concurrent requests through one
+        resource do not read each other's responses
+        """
+        for resource in resources:
+            client = resource.c
+            client._session = self.session
+            if not isinstance(client, ThreadResponse):
+                client.__class__ = type(
+                    client.__class__.__name__, (ThreadResponse, client.__class__), {}
+                )
+                client._responses = threading.local()
+
+    def stats(self):
+        """return request and connection counts"""
+        sent = self.adapter.requests
+        opened = self.adapter.connections()
+        return dict(requests=sent, connections=opened, reused=max(sent - opened, 0))
+
+    def close(self):
+        self.session.close()
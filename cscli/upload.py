@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .cache import cache_root
+from .error import UploadError
+
+DEFAULT_CHUNK_SIZE = 5 * 1024 ** 2
+
+# attempts per chunk after the first failure
+RETRIES = 3
+
+
+def file_chunks(size, chunk_size):
+    """yield (number, offset, length) for each chunk of a file
+
+    numbering starts at 1 and the last chunk absorbs the remainder, as the
+    CloudSigma resumable upload endpoint expects
+    """
+    count = size // chunk_size
+    if count == 0:
+        yield 1, 0, size
+        return
+    for index in range(count - 1):
+        yield index + 1, index * chunk_size, chunk_size
+    offset = (count - 1) * chunk_size
+    yield count, offset, size - offset
+
+
+class UploadJournal(object):
+    """record of the chunks of an image already uploaded to a drive"""
+
+    def __init__(self, key, root=None):
+        self.key = key
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        directory = os.path.join(root or cache_root(), "uploads")
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(directory, f"{digest}.journal")
+        self.lock = threading.Lock()
+        self.uuid = None
+        self.done = set()
+        self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as ifp:
+                header = json.loads(ifp.readline())
+                if header.get("key") == self.key:
+                    self.uuid = header["uuid"]
+                    self.done = set(int(line) for line in ifp if line.strip())
+        except (OSError, ValueError, KeyError):
+            self.uuid = None
+            self.done = set()
+
+    def start(self, uuid):
+        self.uuid = uuid
+        self.done = set()
+        with open(self.path, "w") as ofp:
+            ofp.write(json.dumps(dict(key=self.key, uuid=uuid)) + "\n")
+
+    def record(self, number):
+        with self.lock:
+            self.done.add(number)
+            with open(self.path, "a") as ofp:
+                ofp.write(f"{number}\n")
+
+    def remove(self):
+        self.uuid = None
+        self.done = set()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class ChunkedUpload(object):
+    """parallel, resumable upload of an image file using the resumable.js protocol"""
+
+    def __init__(
+        self,
+        session,
+        endpoint,
+        image_file,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        workers=4,
+        retries=RETRIES,
+        retry_delay=1.0,
+        progress=None,
+        journal_root=None,
+    ):
+        self.session = session
+        self.endpoint = endpoint
+        self.fd = image_file.fileno()
+        self.filename = os.path.basename(image_file.name)
+        stat = os.fstat(self.fd)
+        self.size = stat.st_size
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.progress = progress
+        self.uploaded = 0
+        self.failed = threading.Event()
+        self.journal = UploadJournal(
+            dict(
+                path=os.path.realpath(image_file.name),
+                size=self.size,
+                mtime=stat.st_mtime_ns,
+                chunk_size=chunk_size,
+                endpoint=endpoint,
+            ),
+            journal_root,
+        )
+
+    def _report(self, length):
+        with self.journal.lock:
+            self.uploaded += length
+            if self.progress:
+                self.progress(self.uploaded, self.size)
+
+    def _send(self, url, number, offset, length):
+        params = {
+            "resumableChunkNumber": str(number),
+            "resumableChunkSize": str(self.chunk_size),
+            "resumableCurrentChunkSize": str(length),
+            "resumableTotalSize": str(self.size),
+            "resumableIdentifier": self.filename,
+            "resumableFilename": self.filename,
+        }
+        # a GET answers 200 if the server already has the chunk
+        response = self.session.get(url, params=params)
+        if response.status_code == 200:
+            return None
+        data = os.pread(self.fd, length, offset)
+        response = self.session.post(
+            url,
+            files=list(params.items())
+            + [("file", (self.filename, data, "application/octet-stream"))],
+        )
+        if 200 <= response.status_code < 300:
+            return None
+        return f"status {response.status_code}: {response.text.strip()}"
+
+    def _upload_chunk(self, url, number, offset, length):
+        for attempt in range(self.retries + 1):
+            if self.failed.is_set():
+                return
+            if attempt:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                error = self._send(url, number, offset, length)
+            except requests.RequestException as exc:
+                error = str(exc)
+            if error is None:
+                self.journal.record(number)
+                self._report(length)
+                return
+        self.failed.set()
+        raise UploadError(
+            f"chunk {number} failed after {attempt + 1} attempts; {error}"
+        )
+
+    def run(self, create_drive):
+        """upload missing chunks, calling create_drive(size) for a new drive uuid"""
+        if self.journal.uuid is None:
+            self.journal.start(create_drive(self.size))
+        url = f"{self.endpoint}drives/{self.journal.uuid}/upload/"
+        chunks = []
+        for number, offset, length in file_chunks(self.size, self.chunk_size):
+            if number in self.journal.done:
+                self._report(length)
+            else:
+                chunks.append((number, offset, length))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._upload_chunk, url, *chunk) for chunk in chunks]
+        for future in futures:
+            # re-raise the first chunk failure; the journal keeps the rest
+            future.result()
+        uuid = self.journal.uuid
+        self.journal.remove()
+        return uuid
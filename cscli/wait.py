@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import random
+import time
+
+from .error import EventError, ParameterError, ResourceNotFound
+
+# seconds between polls, growing by BACKOFF up to MAX_INTERVAL
+MIN_INTERVAL = 1.0
+MAX_INTERVAL = 15.0
+BACKOFF = 1.5
+
+# status awaited when a target does not name one
+DEFAULT_STATUS = dict(server="running", drive="unmounted")
+
+# status of a target that no longer exists
+DELETED = "deleted"
+
+
+class WaitTarget(object):
+    """a server or drive awaited until it reports status"""
+
+    def __init__(self, _type, name, status=None):
+        if _type not in DEFAULT_STATUS:
+            raise ParameterError(f"cannot wait for resource type {_type}")
+        self._type = _type
+        self.name = name
+        self.status = status or DEFAULT_STATUS[_type]
+        self.uuid = None
+        self.current = None
+        self.elapsed = None
+        # why the target cannot be awaited, such as an unknown name
+        self.error = None
+
+    @classmethod
+    def parse(cls, spec, status=None):
+        """parse a target spec of the form [TYPE:]NAME_OR_UUID[=STATUS]"""
+        _type, sep, name = spec.partition(":")
+        if not sep or _type not in DEFAULT_STATUS:
+            # no type prefix, or a colon within the name
+            _type, name = "server", spec
+        name, _, target_status = name.partition("=")
+        if not name:
+            raise ParameterError(f"missing name in wait target {spec}")
+        return cls(_type, name, target_status or status)
+
+    @property
+    def done(self):
+        return self.current == self.status
+
+    def update(self, resource, elapsed, log=None):
+        """record the status of resource, which is None once deleted,
+        returning True if target is done"""
+        self.current = resource["status"] if resource else DELETED
+        self.elapsed = elapsed
+        if not self.done and log:
+            log(
+                "waiting for %s %s: %s != %s",
+                self._type,
+                self.name,
+                self.current,
+                self.status,
+            )
+        return self.done
+
+    def report(self):
+        return dict(
+            type=self._type,
+            name=self.name,
+            uuid=self.uuid,
+            status=self.current,
+            wanted=self.status,
+            done=self.done,
+            elapsed=None if self.elapsed is None else round(self.elapsed, 1),
+            error=self.error,
+        )
+
+
+def wait_for(
+    api,
+    targets,
+    timeout=0,
+    interval=MIN_INTERVAL,
+    log=None,
+    subscribe=False,
+    sleep=time.sleep,
+    clock=time.monotonic,
+):
+    """poll until every target reaches its status or timeout seconds pass
+
+    each poll makes one listing request per resource type still awaited,
+    pausing between polls with exponential backoff and jitter; a timeout
+    of 0 waits indefinitely.  With subscribe, the pauses listen for websocket
+    notifications and re-read only the targets they name, falling back to
+    polling if the websocket fails.  A target that cannot be found is
+    reported with an error and no longer awaited.  Returns True if all
+    targets are done.
+    """
+    start = clock()
+    deadline = start + timeout if timeout else None
+    pending = list(targets)
+    events = _subscribe(api, log) if subscribe else None
+    poll = True
+    try:
+        while pending:
+            now = clock()
+            if poll:
+                api.refresh(*sorted(set(target._type for target in pending)))
+                now = clock()
+                for target in list(pending):
+                    if target.uuid is None:
+                        try:
+                            found = api.index.find(target._type, target.name)
+                        except ResourceNotFound as exc:
+                            target.error = exc.message
+                            pending.remove(target)
+                            continue
+                        target.uuid = found["uuid"]
+                    resource = api.index.get(target._type, target.uuid)
+                    if target.update(resource, now - start, log):
+                        pending.remove(target)
+            if not pending or (deadline and now >= deadline):
+                break
+            delay = random.uniform(interval / 2, interval)
+            if deadline:
+                delay = min(delay, deadline - now)
+            interval = min(interval * BACKOFF, MAX_INTERVAL)
+            poll = True
+            if events:
+                try:
+                    touched = events.wait(pending, delay)
+                except EventError as exc:
+                    if log:
+                        log("%s; falling back to polling", exc.message)
+                    events.close()
+                    events = None
+                    continue
+                for target in touched:
+                    resource = _get(api, target)
+                    if target.update(resource, clock() - start, log):
+                        pending.remove(target)
+                # poll again only when no notification arrived in time
+                poll = not touched
+            else:
+                sleep(delay)
+    finally:
+        if events:
+            events.close()
+    return all(target.done for target in targets)
+
+
+def _get(api, target):
+    """return the current resource of target, or None if it was deleted"""
+    try:
+        return getattr(api, target._type).get(target.uuid)
+    except api.errors.ClientError as exc:
+        if exc.status_code == 404:
+            return None
+        raise
+
+
+def _subscribe(api, log=None):
+    try:
+        return api.open_events()
+    except EventError as exc:
+        if log:
+            log("%s; polling instead", exc.message)
+        return None
@@ -30,6 +30,21 @@ coverage: ## check code coverage quickly with the default Python
 	coverage html
 	@$(browser) htmlcov/index.html
 
+benchmarks ?= $(wildcard tests/bench_*.py)
+bench_options ?= -p no:logging -o addopts= $(if $(sizes),--inventory-sizes=$(sizes))
+bench_baseline ?= .benchmarks/baseline
+bench_fail ?= median:10%
+
+bench: ## run benchmarks, saving the results;  example: make sizes=1000,10000 bench
+	pytest $(bench_options) --benchmark-autosave $(benchmarks)
+
+bench-baseline: ## save benchmark results as the baseline for bench-compare
+	pytest $(bench_options) --benchmark-storage=$(bench_baseline) --benchmark-save=baseline $(benchmarks)
+
+bench-compare: ## run benchmarks, failing on regressions past bench_fail
+	pytest $(bench_options) --benchmark-storage=$(bench_baseline) --benchmark-compare \
+	  --benchmark-compare-fail=$(bench_fail) $(benchmarks)
+
 testls: ## show available test cases 
 	@echo $$($(foreach test,$(testfiles),grep '^def test_' $(test);)) |\
 	  tr ' ' '\n' | grep -v def | awk -F\( 'BEGIN{xi=0} {printf("%s",$$1);\
@@ -10,21 +10,23 @@ with open('README.rst') as readme_file:
 with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
-requirements = ['Click>=7.0', 'cloudsigma>=1.0', 'PyYAML>=5.4.1' ]
+requirements = ['Click>=7.0', 'cloudsigma>=1.0', 'PyYAML>=5.4.1', 'websocket-client>=0.57' ]
 
 test_requirements = ['pytest>=3', ]
 
+# faster JSON output, used when installed
+fast_requirements = ['orjson>=3.0']
+
 setup(
     author="Matt Krueger",
     author_email='mkrueger@rstms.net',
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
     ],
@@ -35,6 +37,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require={'fast': fast_requirements},
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
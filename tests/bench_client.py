@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Benchmarks of client listing, formatting and lookup
+
+run with make bench; see make.include/test.mk
+"""
+
+import pytest
+
+from tests.inventory import inventory_api
+
+TYPES = ["server", "drive", "vlan", "ip"]
+
+
+@pytest.fixture
+def api(inventory_size):
+    return inventory_api(inventory_size)
+
+
+@pytest.fixture
+def indexed_api(api):
+    api.index.prefetch(TYPES)
+    return api
+
+
+@pytest.mark.parametrize("list_format", ["detail", "brief", "text", "uuid"])
+def test_list_resources(benchmark, indexed_api, inventory_size, list_format):
+    api = indexed_api
+    ret = benchmark(api._list_resources, api.server, list_format)
+    assert len(ret) == inventory_size
+
+
+@pytest.mark.parametrize("list_format", ["brief", "text"])
+@pytest.mark.parametrize("_type", TYPES)
+def test_format_resource(benchmark, indexed_api, _type, list_format):
+    api = indexed_api
+    resource = getattr(api, _type)
+    items = api.index.list(_type)
+
+    def format_all():
+        return [api._format_resource(resource, item, list_format) for item in items]
+
+    assert len(benchmark(format_all)) == len(items)
+
+
+@pytest.mark.parametrize("key", ["name", "uuid"])
+def test_find_resource_indexed(benchmark, indexed_api, inventory_size, key):
+    server = indexed_api.index.list("server")[inventory_size // 2]
+    assert benchmark(indexed_api._find_resource, "server", server[key]) == server
+
+
+def test_find_resource_by_name_filter(benchmark, api, inventory_size):
+    server = api.server.items[-1]
+    # nothing is indexed, so each lookup pages through the name filtered listing
+    assert benchmark(api._find_resource, "server", server["name"]) == server
+
+
+def test_list_all_from_api(benchmark, api, inventory_size):
+    ret = benchmark.pedantic(
+        api.list_all, args=("brief",), setup=api.index.invalidate, rounds=5
+    )
+    assert len(ret["drives"]) == inventory_size
+
+
+def test_list_all_indexed(benchmark, indexed_api, inventory_size):
+    ret = benchmark(indexed_api.list_all, "brief")
+    assert len(ret["ips"]) == inventory_size
+
+
+def test_convert_memory_value(benchmark, api, inventory_size):
+    values = ["512M", "4G", "2048K", "1.5G", "1073741824"] * (inventory_size // 5)
+    ret = benchmark(lambda: [api.convert_memory_value(value) for value in values])
+    assert ret[:2] == [512 * 1024 ** 2, 4 * 1024 ** 3]
+
+
+def test_format_memory_value(benchmark, api):
+    values = [item["size"] for item in api.drive.items]
+    ret = benchmark(lambda: [api.format_memory_value(value) for value in values])
+    assert ret[0] == "10G"
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+"""Benchmarks of JSON and YAML result output
+
+run with make bench; see make.include/test.mk
+"""
+
+import io
+import os
+import sys
+
+import pytest
+
+from cscli import output
+from cscli.cli import Environment
+from cscli.output import BACKEND_PREFERENCE, JSONWriter
+from tests.inventory import inventory_api
+
+
+@pytest.fixture
+def listing(inventory_size):
+    return inventory_api(inventory_size).list_all("brief")
+
+
+@pytest.fixture
+def devnull(monkeypatch):
+    with open(os.devnull, "wb") as sink:
+        stream = io.TextIOWrapper(sink, encoding="utf-8")
+        monkeypatch.setattr(sys, "stdout", stream)
+        yield stream
+        stream.flush()
+
+
+@pytest.mark.parametrize("compact", [True, False])
+@pytest.mark.parametrize("backend", BACKEND_PREFERENCE)
+def test_output_json(benchmark, listing, devnull, monkeypatch, backend, compact):
+    writer = JSONWriter(backend)
+    if writer.name != backend:
+        pytest.skip(f"{backend} is not installed")
+    monkeypatch.setattr(output, "_writer", writer)
+    env = Environment()
+    env.compact = compact
+    benchmark(env.output, listing)
+
+
+@pytest.mark.parametrize("documents", [False, True])
+def test_output_yaml(benchmark, listing, devnull, documents):
+    env = Environment()
+    env.fmt = "yaml"
+    env.documents = documents
+    item = listing["servers"] if documents else listing
+    benchmark.pedantic(env.output, args=(item,), rounds=3)
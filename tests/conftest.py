@@ -4,9 +4,11 @@
 
 import os
 from pprint import pprint
+from urllib.parse import urlencode
 
 import pytest
 from click.testing import CliRunner
+from cloudsigma.errors import ClientError
 
 from cscli import cli
 
@@ -29,6 +31,30 @@ def api_config_vars():
             os.environ[var] = value
 
 
+# keep the on-disk inventory cache out of the user's home directory
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    os.environ["XDG_CACHE_HOME"] = str(tmp_path_factory.mktemp("cache"))
+
+
+# benchmarks run once for each synthetic inventory size
+BENCHMARK_SIZES = "1000,10000,50000"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--inventory-sizes",
+        default=BENCHMARK_SIZES,
+        help=f"comma separated synthetic inventory sizes to benchmark [{BENCHMARK_SIZES}]",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "inventory_size" in metafunc.fixturenames:
+        sizes = metafunc.config.getoption("inventory_sizes").split(",")
+        metafunc.parametrize("inventory_size", [int(size) for size in sizes])
+
+
 # don't save password in pytest-vcr recordings
 @pytest.fixture(scope="module")
 def vcr_config():
@@ -73,3 +99,119 @@ class FixtureRunner:
 def runner():
     with FixtureRunner() as _runner:
         yield _runner
+
+
+class FakeResource:
+    """offline stand-in for a pycloudsigma resource, counting API calls"""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+        self.failures = set()
+
+    def _filter(self, call, query_params):
+        if query_params:
+            self.calls.append(f"{call}?{urlencode(query_params)}")
+            query_params = dict(query_params)
+            limit = query_params.pop("limit", 0)
+            offset = query_params.pop("offset", 0)
+            # lookups with an operator are left to the client-side check
+            items = [
+                item
+                for item in self.items
+                if all(
+                    item.get(k) == v for k, v in query_params.items() if "__" not in k
+                )
+            ]
+            return items[offset : offset + limit] if limit else items[offset:]
+        self.calls.append(call)
+        return list(self.items)
+
+    def get(self, uuid=None):
+        self.calls.append(f"get {uuid}")
+        for item in self.items:
+            if item["uuid"] == uuid:
+                return item
+        raise ClientError("not found", status_code=404)
+
+    def _action(self, action, uuid):
+        self.calls.append(f"{action} {uuid}")
+        if uuid in self.failures:
+            raise ClientError("conflict", status_code=409)
+        return dict(uuid=uuid, result="success")
+
+    def start(self, uuid):
+        return self._action("start", uuid)
+
+    def stop(self, uuid):
+        return self._action("stop", uuid)
+
+    def shutdown(self, uuid):
+        return self._action("shutdown", uuid)
+
+    def delete(self, uuid, *args):
+        self._action("delete", uuid)
+
+    def list(self, query_params=None):
+        return self._filter("list", query_params)
+
+    def list_detail(self, query_params=None):
+        return self._filter("list_detail", query_params)
+
+
+def fake_inventory(count=3):
+    servers, drives, vlans, ips = [], [], [], []
+    for i in range(count):
+        server_uuid = f"server-{i}"
+        drive_uuid = f"drive-{i}"
+        ip_uuid = f"10.0.0.{i}"
+        drives.append(
+            dict(
+                uuid=drive_uuid,
+                name=f"drive{i}",
+                size=1024 ** 3,
+                media="disk",
+                storage_type="dssd",
+                status="mounted",
+                mounted_on=[dict(uuid=server_uuid)],
+            )
+        )
+        servers.append(
+            dict(
+                uuid=server_uuid,
+                name=f"server{i}",
+                status="running",
+                smp=2,
+                cpu=4000,
+                mem=2 * 1024 ** 3,
+                cpus_instead_of_cores=False,
+                drives=[dict(drive=dict(uuid=drive_uuid))],
+                nics=[
+                    dict(
+                        mac=f"00:00:00:00:00:{i:02x}",
+                        vlan=None,
+                        ip_v4_conf=dict(conf="static", ip=dict(uuid=ip_uuid)),
+                        runtime=None,
+                    )
+                ],
+            )
+        )
+        ips.append(
+            dict(
+                uuid=ip_uuid,
+                server=dict(uuid=server_uuid),
+                meta=dict(name=f"ip{i}", description=""),
+            )
+        )
+        vlans.append(dict(uuid=f"vlan-{i}", meta=dict(name=f"vlan{i}", description="")))
+    return dict(server=servers, drive=drives, vlan=vlans, ip=ips, subscription=[])
+
+
+@pytest.fixture
+def fake_api():
+    from cscli.api_client import CloudSigmaClient
+
+    api = CloudSigmaClient()
+    for _type, items in fake_inventory().items():
+        setattr(api, _type, FakeResource(items))
+    return api
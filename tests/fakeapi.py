@@ -0,0 +1,585 @@
+#!/usr/bin/env python
+
+"""In-memory CloudSigma API stand-in for measuring cscli at scale
+
+    python -m tests.fakeapi --seed 10000 --latency 0.05 --error 429=0.02
+
+serves a synthetic account until interrupted; point cscli at it with
+--endpoint or CLOUDSIGMA_ENDPOINT
+"""
+
+import copy
+import email.parser
+import email.policy
+import email.utils
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid as uuidlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import click
+
+from tests.inventory import synthetic_inventory
+
+API_PATH = "/api/2.0/"
+
+# listing fields of each collection; None lists whole resources
+COLLECTIONS = dict(
+    servers=["uuid", "name", "status", "runtime", "owner", "resource_uri"],
+    drives=["uuid", "name", "status", "owner", "resource_uri"],
+    vlans=["uuid", "owner", "resource_uri"],
+    ips=["uuid", "owner", "resource_uri"],
+    subscriptions=None,
+    libdrives=None,
+    snapshots=None,
+)
+
+# listing query parameters that are not filters
+LISTING_PARAMS = ["limit", "offset", "fields", "format"]
+
+DEFAULT_LIMIT = 20
+
+OWNER_UUID = "00000000-0000-4000-8000-000000000001"
+
+CAPABILITIES = dict(
+    servers=dict(
+        cpu=dict(min=250, max=80000),
+        cpu_per_smp=dict(min=1000, max=2500),
+        mem=dict(min=268435456, max=137438953472),
+        smp=dict(min=1, max=40),
+    ),
+    drives=dict(
+        dssd=dict(min_size=536870912, max_size=109951162777600),
+        magnetic=dict(min_size=536870912, max_size=109951162777600),
+    ),
+)
+
+LIBRARY_OSES = [
+    ("linux", "Ubuntu", ["20.04", "22.04", "24.04"]),
+    ("linux", "Debian", ["11", "12"]),
+    ("linux", "Rocky Linux", ["8", "9"]),
+    ("bsd", "OpenBSD", ["7.4", "7.5"]),
+    ("windows", "Windows Server", ["2019", "2022"]),
+]
+
+
+def _text(value):
+    """return a resource value as the API compares it with a filter"""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, dict):
+        return value.get("uuid", "")
+    return "" if value is None else str(value)
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _compare(op, value, expected):
+    if op in ["gt", "gte", "lt", "lte"]:
+        a, b = _number(value), _number(expected)
+        if a is None or b is None:
+            a, b = value, expected
+        return dict(gt=a > b, gte=a >= b, lt=a < b, lte=a <= b)[op]
+    compare = dict(
+        exact=lambda: value == expected,
+        iexact=lambda: value.lower() == expected.lower(),
+        contains=lambda: expected in value,
+        icontains=lambda: expected.lower() in value.lower(),
+        startswith=lambda: value.startswith(expected),
+        endswith=lambda: value.endswith(expected),
+        isnull=lambda: (value == "") == (expected.lower() == "true"),
+        **{"in": lambda: value in expected.split(",")},
+    )
+    if op not in compare:
+        raise ValueError(f"unknown filter operator {op}")
+    return compare[op]()
+
+
+def _matches(item, key, expected):
+    field, _, op = key.partition("__")
+    return _compare(op or "exact", _text(item.get(field)), expected)
+
+
+def _libdrive(i):
+    family, os_name, versions = LIBRARY_OSES[i % len(LIBRARY_OSES)]
+    version = versions[i // len(LIBRARY_OSES) % len(versions)]
+    arch = ["64", "32"][i % 7 == 6]
+    image_type = ["install", "preinst"][i % 2]
+    return dict(
+        uuid=str(uuidlib.UUID(int=5 << 64 | i)),
+        name=f"{os_name} {version} {arch}bit {image_type} {i}",
+        os=family,
+        distribution=os_name,
+        version=version,
+        arch=arch,
+        image_type=image_type,
+        media="cdrom" if image_type == "install" else "disk",
+        size=(2 + i % 30) * 1024 ** 3,
+        status="unmounted",
+        paid=False,
+        licenses=[],
+        description=f"{os_name} {version} {arch}bit {image_type} image",
+    )
+
+
+def _subscription(i):
+    resource = ["dssd", "mem", "cpu", "ip", "vlan"][i % 5]
+    return dict(
+        id=str(i + 1),
+        uuid=str(uuidlib.UUID(int=6 << 64 | i)),
+        resource=resource,
+        amount=str(1 + i % 10),
+        period="1 month",
+        status="active",
+        auto_renew=True,
+        start_time="2026-01-01T00:00:00+00:00",
+        end_time="2026-12-01T00:00:00+00:00",
+        price="10.00",
+        subscribed_object=None,
+    )
+
+
+class FakeCloudSigma(object):
+    """CloudSigma API endpoints served from memory on a local port
+
+    latency delays every response by that many seconds, bandwidth limits
+    response bodies to bytes per second, and errors maps a status code, 429
+    or 5xx, to the fraction of requests answered with it; fail() queues
+    errors for the next requests instead
+    """
+
+    def __init__(
+        self, latency=0, bandwidth=None, errors=None, retry_after=1, seed=0, port=0
+    ):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.errors = dict(errors or {})
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.collections = {name: {} for name in COLLECTIONS}
+        self.versions = dict.fromkeys(COLLECTIONS, 0)
+        self.modified = dict.fromkeys(COLLECTIONS, time.time())
+        self.images = {}
+        self.chunks = {}
+        self.requests = []
+        self.failures = []
+        self.lock = threading.RLock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake._handle(self, "GET")
+
+            def do_POST(self):
+                fake._handle(self, "POST")
+
+            def do_PUT(self):
+                fake._handle(self, "PUT")
+
+            def do_DELETE(self):
+                fake._handle(self, "DELETE")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}{API_PATH}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _resource_uri(self, collection, uuid):
+        return f"{API_PATH}{collection}/{uuid}/"
+
+    def _touch(self, collection):
+        self.versions[collection] += 1
+        self.modified[collection] = time.time()
+
+    def add(self, collection, item):
+        """store item in collection, completing the fields the API sets"""
+        item = copy.deepcopy(item)
+        item.setdefault("uuid", str(uuidlib.uuid4()))
+        item.setdefault("resource_uri", self._resource_uri(collection, item["uuid"]))
+        item.setdefault("owner", dict(uuid=OWNER_UUID, resource_uri=None))
+        if collection == "servers":
+            item.setdefault("status", "stopped")
+            for key, value in dict(
+                cpu=2000,
+                mem=1024 ** 3,
+                smp=1,
+                cpus_instead_of_cores=False,
+                drives=[],
+                nics=[],
+                meta={},
+                tags=[],
+                runtime=None,
+                vnc_password="fakevnc",
+            ).items():
+                item.setdefault(key, value)
+        elif collection == "drives":
+            for key, value in dict(
+                status="unmounted",
+                media="disk",
+                storage_type="dssd",
+                mounted_on=[],
+                meta={},
+                tags=[],
+            ).items():
+                item.setdefault(key, value)
+        elif collection in ["vlans", "ips"]:
+            item.setdefault("meta", {})
+        with self.lock:
+            self.collections[collection][item["uuid"]] = item
+            self._touch(collection)
+        return item
+
+    def seed(self, count, libdrives=None, subscriptions=10):
+        """add count each of cross referenced servers, drives, vlans and ips"""
+        inventory = synthetic_inventory(count)
+        with self.lock:
+            for _type, items in inventory.items():
+                collection = f"{_type}s"
+                for item in items:
+                    self.add(collection, item)
+            for i in range(count // 10 if libdrives is None else libdrives):
+                self.add("libdrives", _libdrive(i))
+            for i in range(subscriptions):
+                self.add("subscriptions", _subscription(i))
+
+    def fail(self, status, count=1):
+        """answer the next count requests with status"""
+        with self.lock:
+            self.failures.extend([status] * count)
+
+    def _remount(self):
+        """set the mounted_on list of every drive from the server definitions"""
+        mounts = {}
+        for server in self.collections["servers"].values():
+            for attached in server["drives"]:
+                drive = attached["drive"]
+                drive_uuid = drive["uuid"] if isinstance(drive, dict) else drive
+                mounts.setdefault(drive_uuid, []).append(server["uuid"])
+        for drive in self.collections["drives"].values():
+            servers = mounts.get(drive["uuid"], [])
+            drive["mounted_on"] = [
+                dict(uuid=s, resource_uri=self._resource_uri("servers", s))
+                for s in servers
+            ]
+            drive["status"] = "mounted" if servers else "unmounted"
+        self._touch("drives")
+
+    def _injected(self):
+        with self.lock:
+            if self.failures:
+                return self.failures.pop(0)
+            for status, rate in self.errors.items():
+                if self.random.random() < rate:
+                    return status
+        return None
+
+    def _send(self, handler, status, body=None, content_type=None, headers=None):
+        if content_type is None:
+            content_type = "application/json"
+            body = json.dumps(body).encode() if body is not None else b""
+        headers = dict(headers or {})
+        if body and "gzip" in handler.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        handler.send_response(status)
+        if body:
+            handler.send_header("Content-Type", content_type)
+        for key, value in headers.items():
+            handler.send_header(key, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if not self.bandwidth:
+            handler.wfile.write(body)
+            return
+        # write in slices timed to the bandwidth limit
+        step = max(1, int(self.bandwidth / 20))
+        for start in range(0, len(body), step):
+            handler.wfile.write(body[start : start + step])
+            time.sleep(min(step, len(body) - start) / self.bandwidth)
+
+    def _error(self, handler, status, message, headers=None):
+        body = [dict(error_type="fake", error_point=None, error_message=message)]
+        self._send(handler, status, body, headers=headers)
+
+    def _handle(self, handler, method):
+        url = urlparse(handler.path)
+        query = dict(parse_qsl(url.query))
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        with self.lock:
+            self.requests.append(f"{method} {url.path}")
+        if self.latency:
+            time.sleep(self.latency)
+        status = self._injected()
+        if status is not None:
+            headers = {"Retry-After": str(self.retry_after)} if status == 429 else {}
+            return self._error(handler, status, "injected failure", headers)
+        if "Authorization" not in handler.headers:
+            return self._error(handler, 401, "authentication required")
+        if not url.path.startswith(API_PATH):
+            return self._error(handler, 404, f"no endpoint {url.path}")
+        parts = url.path[len(API_PATH) :].strip("/").split("/")
+        try:
+            with self.lock:
+                return self._route(handler, method, parts, query, body)
+        except KeyError as exc:
+            return self._error(handler, 404, f"not found: {exc}")
+        except ValueError as exc:
+            return self._error(handler, 400, str(exc))
+
+    def _route(self, handler, method, parts, query, body):
+        name, rest = parts[0], parts[1:]
+        if name == "capabilities" and method == "GET":
+            return self._send(handler, 200, CAPABILITIES)
+        if name == "accounts" and rest == ["action"]:
+            return self._authenticate(handler)
+        if name == "initupload" and method == "POST":
+            return self._create(handler, "drives", json.loads(body))
+        if name == "drives" and rest == ["upload"] and method == "POST":
+            return self._upload(handler, body)
+        if name == "drives" and len(rest) == 2 and rest[1] == "upload":
+            return self._upload_chunk(handler, method, rest[0], query, body)
+        if name == "drives" and len(rest) == 2 and rest[1] == "download":
+            return self._download(handler, rest[0])
+        if name not in COLLECTIONS:
+            raise KeyError(name)
+        collection = self.collections[name]
+        if method == "GET" and rest in [[], ["detail"]]:
+            return self._list(handler, name, query, detail=rest == ["detail"])
+        if method == "POST" and not rest:
+            return self._create(handler, name, json.loads(body))
+        uuid = rest[0]
+        item = collection[uuid]
+        if method == "GET" and len(rest) == 1:
+            return self._get(handler, item)
+        if method == "PUT" and len(rest) == 1:
+            item.update(json.loads(body))
+            item["uuid"] = uuid
+            self._touch(name)
+            if name == "servers":
+                self._remount()
+            return self._send(handler, 200, item)
+        if method == "DELETE" and len(rest) == 1:
+            return self._delete(handler, name, item, query)
+        if method == "POST" and rest[1:] == ["action"]:
+            return self._action(handler, name, item, query.get("do"), body)
+        raise KeyError("/".join(parts))
+
+    def _not_modified(self, handler, name, etag):
+        """return True if the client's copy of a listing is current"""
+        if handler.headers.get("If-None-Match") == etag:
+            return True
+        since = handler.headers.get("If-Modified-Since")
+        if since and not handler.headers.get("If-None-Match"):
+            try:
+                since = email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.modified[name]) <= since
+        return False
+
+    def _get(self, handler, item):
+        data = json.dumps(item, sort_keys=True).encode()
+        headers = {"ETag": '"%s"' % hashlib.sha1(data).hexdigest()}
+        if handler.headers.get("If-None-Match") == headers["ETag"]:
+            return self._send(handler, 304, None, headers=headers)
+        return self._send(handler, 200, item, headers=headers)
+
+    def _list(self, handler, name, query, detail):
+        limit = int(query.get("limit", DEFAULT_LIMIT))
+        offset = int(query.get("offset", 0))
+        filters = {k: v for k, v in query.items() if k not in LISTING_PARAMS}
+        tag = f"{name}:{self.versions[name]}:{handler.path}"
+        etag = '"%s"' % hashlib.sha1(tag.encode()).hexdigest()
+        modified = email.utils.formatdate(self.modified[name], usegmt=True)
+        headers = {"ETag": etag, "Last-Modified": modified}
+        if self._not_modified(handler, name, etag):
+            return self._send(handler, 304, None, headers=headers)
+        items = [
+            item
+            for item in self.collections[name].values()
+            if all(_matches(item, key, value) for key, value in filters.items())
+        ]
+        total = len(items)
+        items = items[offset : offset + limit] if limit else items[offset:]
+        fields = None if detail else COLLECTIONS[name]
+        if fields:
+            items = [{key: item.get(key) for key in fields} for item in items]
+        meta = dict(limit=limit, offset=offset, total_count=total)
+        return self._send(handler, 200, dict(meta=meta, objects=items), None, headers)
+
+    def _create(self, handler, name, data):
+        objects = data.get("objects", [data]) if isinstance(data, dict) else data
+        created = []
+        for item in objects:
+            if name == "snapshots":
+                drive = self.collections["drives"][item["drive"]]
+                item = dict(
+                    drive=dict(uuid=drive["uuid"], resource_uri=drive["resource_uri"]),
+                    name=item.get("name") or f"{drive['name']} snapshot",
+                    status="available",
+                    timestamp=email.utils.formatdate(usegmt=True),
+                )
+            item.pop("uuid", None)
+            created.append(self.add(name, item))
+        if name == "servers":
+            self._remount()
+        return self._send(handler, 201, dict(objects=created))
+
+    def _delete(self, handler, name, item, query):
+        if name == "drives" and item["mounted_on"]:
+            return self._error(handler, 409, "drive is mounted on a server")
+        del self.collections[name][item["uuid"]]
+        self._touch(name)
+        if name == "servers":
+            recurse = query.get("recurse")
+            media = dict(disks=["disk"], cdroms=["cdrom"], all_drives=["disk", "cdrom"])
+            for attached in item["drives"] if recurse else []:
+                drive = self.collections["drives"].get(attached["drive"]["uuid"])
+                if drive and drive["media"] in media.get(recurse, []):
+                    del self.collections["drives"][drive["uuid"]]
+            self._remount()
+        return self._send(handler, 204, None)
+
+    def _action(self, handler, name, item, action, body):
+        result = dict(action=action, result="success", uuid=item["uuid"])
+        if name == "servers" and action in ["start", "stop", "shutdown", "restart"]:
+            running = item["status"] == "running"
+            if running == (action in ["start"]):
+                return self._error(handler, 409, f"server is {item['status']}")
+            item["status"] = "stopped" if action in ["stop", "shutdown"] else "running"
+            self._touch(name)
+        elif name == "servers" and action in ["open_vnc", "open_console"]:
+            kind = action.partition("_")[2]
+            result[f"{kind}_url"] = f"vnc://127.0.0.1:5900/{item['uuid']}"
+        elif name == "servers" and action in ["close_vnc", "close_console"]:
+            pass
+        elif name == "drives" and action == "clone":
+            data = json.loads(body or b"{}") or {}
+            clone = dict(item, name=data.get("name") or f"{item['name']} clone")
+            for key in ["uuid", "resource_uri", "mounted_on", "status"]:
+                clone.pop(key)
+            clone = self.add(name, clone)
+            self.images[clone["uuid"]] = bytearray(self.images.get(item["uuid"], b""))
+            return self._send(handler, 202, dict(objects=[clone]))
+        elif name == "drives" and action == "resize":
+            item.update(size=int(json.loads(body)["size"]))
+            self._touch(name)
+            return self._send(handler, 202, dict(objects=[item]))
+        else:
+            raise ValueError(f"unknown {name} action {action}")
+        return self._send(handler, 202, result)
+
+    def _authenticate(self, handler):
+        self._send(
+            handler,
+            200,
+            dict(result="success"),
+            headers={"Set-Cookie": "async_auth=fake; Path=/"},
+        )
+
+    def _upload(self, handler, body):
+        drive = self.add("drives", dict(name="upload", size=len(body)))
+        self.images[drive["uuid"]] = bytearray(body)
+        self._send(handler, 200, drive["uuid"].encode(), "text/plain")
+
+    def _upload_chunk(self, handler, method, uuid, query, body):
+        drive = self.collections["drives"][uuid]
+        if method == "GET":
+            number = int(query["resumableChunkNumber"])
+            return self._send(handler, 200 if (uuid, number) in self.chunks else 204)
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b"Content-Type: "
+            + handler.headers["Content-Type"].encode()
+            + b"\r\n\r\n"
+            + body
+        )
+        fields = {
+            part.get_param("name", header="content-disposition"): (
+                part.get_payload(decode=True)
+            )
+            for part in message.iter_parts()
+        }
+        number = int(fields["resumableChunkNumber"])
+        offset = (number - 1) * int(fields["resumableChunkSize"])
+        image = self.images.setdefault(uuid, bytearray(drive["size"]))
+        image[offset : offset + len(fields["file"])] = fields["file"]
+        self.chunks[(uuid, number)] = True
+        self._send(handler, 201)
+
+    def _download(self, handler, uuid):
+        drive = self.collections["drives"][uuid]
+        image = bytes(self.images.get(uuid, b"")).ljust(drive["size"], b"\0")
+        spec = handler.headers.get("Range")
+        start, end = 0, len(image) - 1
+        if spec:
+            first, _, last = spec.partition("=")[2].partition("-")
+            start, end = int(first), int(last or end)
+        handler.send_response(206 if spec else 200)
+        handler.send_header("Content-Type", "application/octet-stream")
+        handler.send_header("Content-Length", str(end + 1 - start))
+        handler.end_headers()
+        handler.wfile.write(image[start : end + 1])
+
+    def image(self, uuid):
+        """return the uploaded image of drive uuid"""
+        return bytes(self.images.get(uuid, b""))
+
+
+def _parse_error(ctx, param, values):
+    errors = {}
+    for value in values:
+        status, sep, rate = value.partition("=")
+        try:
+            errors[int(status)] = float(rate)
+        except ValueError:
+            raise click.BadParameter(f"'{value}' is not STATUS=RATE")
+    return errors
+
+
+@click.command()
+@click.option("--port", type=int, default=8000, show_default=True)
+@click.option("--seed", "count", type=int, default=1000, show_default=True)
+@click.option("--latency", type=float, default=0, help="seconds added to requests")
+@click.option("--bandwidth", type=int, help="response bytes per second")
+@click.option(
+    "--error",
+    "errors",
+    metavar="STATUS=RATE",
+    multiple=True,
+    callback=_parse_error,
+    help="answer a fraction of requests with an error status",
+)
+def main(port, count, latency, bandwidth, errors):
+    """serve a synthetic CloudSigma account"""
+    fake = FakeCloudSigma(latency, bandwidth, errors, port=port)
+    fake.seed(count)
+    click.echo(f"CLOUDSIGMA_ENDPOINT={fake.endpoint}")
+    try:
+        fake.thread.join()
+    except KeyboardInterrupt:
+        fake.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""Synthetic CloudSigma inventories for benchmarks"""
+
+import ipaddress
+import uuid
+from functools import lru_cache
+
+from tests.conftest import FakeResource
+
+# uuid namespaces of the generated resource types
+TYPES = ["server", "drive", "vlan", "ip"]
+
+GB = 1024 ** 3
+
+
+def _uuid(_type, i):
+    return str(uuid.UUID(int=(TYPES.index(_type) + 1) << 64 | i))
+
+
+def _ip(i):
+    return str(ipaddress.ip_address(0x0A000000 + i))
+
+
+def _nic(i, n, count):
+    """return nic n of server i: static, dhcp, vlan or manual in turn"""
+    mac = ":".join(f"{b:02x}" for b in bytes([0x22, n]) + i.to_bytes(4, "big"))
+    conf = ["static", "dhcp", "vlan", "manual"][(i + n) % 4]
+    nic = dict(mac=mac, model="virtio", vlan=None, ip_v4_conf=None, runtime=None)
+    if conf == "vlan":
+        nic.update(vlan=dict(uuid=_uuid("vlan", i % count)))
+    else:
+        nic.update(ip_v4_conf=dict(conf=conf, ip=None))
+        if conf == "static":
+            nic["ip_v4_conf"]["ip"] = dict(uuid=_ip(i))
+        if conf in ["static", "dhcp"] and i % 3:
+            nic["runtime"] = dict(ip_v4=dict(uuid=_ip(i)), interface_type="public")
+    return nic
+
+
+@lru_cache(maxsize=None)
+def synthetic_inventory(count):
+    """return count each of servers, drives, vlans and ips, cross referenced
+
+    all but every tenth server mount their own drive, leaving that drive
+    unmounted, and every fifth also mounts the next server's drive; servers
+    have one or two nics with static, dhcp, vlan or manual addressing, so
+    some ips are unassigned
+    """
+    servers, drives, vlans, ips = [], [], [], []
+    mounts = {}
+    for i in range(count):
+        server_drives = [] if i % 10 == 9 else [i]
+        if i % 5 == 0 and count > 1:
+            server_drives.append((i + 1) % count)
+        for d in server_drives:
+            mounts.setdefault(d, []).append(i)
+        nics = [_nic(i, n, count) for n in range(1 + i % 2)]
+        servers.append(
+            dict(
+                uuid=_uuid("server", i),
+                name=f"app-{i:06d}",
+                status=["running", "stopped"][i % 7 == 0],
+                smp=1 + i % 8,
+                cpu=2000 * (1 + i % 8),
+                mem=(1 + i % 16) * GB,
+                cpus_instead_of_cores=bool(i % 2),
+                drives=[
+                    dict(drive=dict(uuid=_uuid("drive", d)), dev_channel=f"0:{n}")
+                    for n, d in enumerate(server_drives)
+                ],
+                nics=nics,
+                meta=dict(description=f"synthetic server {i}"),
+                tags=[],
+            )
+        )
+        assigned = any(
+            (nic["ip_v4_conf"] or {}).get("ip") or nic["runtime"] for nic in nics
+        )
+        ips.append(
+            dict(
+                uuid=_ip(i),
+                server=dict(uuid=_uuid("server", i)) if assigned else None,
+                netmask=24,
+                gateway=_ip(1),
+                meta=dict(name=f"ip-{i:06d}", description=""),
+            )
+        )
+        vlans.append(
+            dict(
+                uuid=_uuid("vlan", i),
+                servers=[dict(uuid=_uuid("server", i))] if i % 4 == 2 else [],
+                meta=dict(name=f"vlan-{i:06d}", description=f"segment {i}"),
+            )
+        )
+    for i in range(count):
+        mounted = mounts.get(i, [])
+        drives.append(
+            dict(
+                uuid=_uuid("drive", i),
+                name=f"app-{i:06d}-disk",
+                size=(10 + i % 90) * GB,
+                media="disk" if i % 20 else "cdrom",
+                storage_type=["dssd", "magnetic"][i % 3 == 0],
+                status="mounted" if mounted else "unmounted",
+                mounted_on=[dict(uuid=_uuid("server", s)) for s in mounted],
+                meta=dict(description=""),
+            )
+        )
+    return dict(server=servers, drive=drives, vlan=vlans, ip=ips, subscription=[])
+
+
+def inventory_api(count):
+    """return a client answering listings from a synthetic inventory of count"""
+    from cscli.api_client import CloudSigmaClient
+
+    api = CloudSigmaClient()
+    for _type, items in synthetic_inventory(count).items():
+        setattr(api, _type, FakeResource(items))
+    return api
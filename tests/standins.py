@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+"""local stand-ins for CloudSigma network endpoints"""
+
+import base64
+import email.parser
+import email.policy
+import gzip
+import hashlib
+import json
+import queue
+import socket
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebsocketStandin:
+    """minimal websocket server sending queued JSON frames to one client"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.url = "ws://127.0.0.1:%d/websocket" % self.listener.getsockname()[1]
+        self.frames = queue.Queue()
+        self.headers = {}
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _handshake(self, conn):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        for line in request.decode().split("\r\n")[1:]:
+            key, _, value = line.partition(":")
+            if key:
+                self.headers[key.strip().lower()] = value.strip()
+        digest = hashlib.sha1(
+            (self.headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()
+        ).digest()
+        conn.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + base64.b64encode(digest) + b"\r\n\r\n"
+        )
+
+    def _encode(self, frame):
+        payload = json.dumps(frame).encode()
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x81, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x81, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, length)
+        return header + payload
+
+    def _serve(self):
+        try:
+            conn, _ = self.listener.accept()
+        except OSError:
+            return
+        with conn:
+            self._handshake(conn)
+            while True:
+                frame = self.frames.get()
+                if frame is None:
+                    break
+                conn.sendall(self._encode(frame))
+
+    def send(self, frame):
+        self.frames.put(frame)
+
+    def close(self):
+        """drop the client connection"""
+        self.frames.put(None)
+        # wake the accepting thread so the port stops accepting connections
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
+
+
+class UploadStandin:
+    """resumable.js chunk upload endpoint storing chunks in memory"""
+
+    def __init__(self):
+        self.chunks = {}
+        self.posts = []
+        self.failures = {}
+        self.lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code):
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                number = int(parse_qs(url.query)["resumableChunkNumber"][0])
+                with standin.lock:
+                    present = (url.path, number) in standin.chunks
+                self._reply(200 if present else 204)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                    b"Content-Type: "
+                    + self.headers["Content-Type"].encode()
+                    + b"\r\n\r\n"
+                    + body
+                )
+                fields = {
+                    part.get_param("name", header="content-disposition"): (
+                        part.get_payload(decode=True)
+                    )
+                    for part in message.iter_parts()
+                }
+                number = int(fields["resumableChunkNumber"])
+                with standin.lock:
+                    standin.posts.append(number)
+                    if standin.failures.get(number):
+                        standin.failures[number] -= 1
+                        return self._reply(500)
+                    standin.chunks[(urlparse(self.path).path, number)] = fields["file"]
+                self._reply(201)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = "http://127.0.0.1:%d/api/2.0/" % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def image(self, uuid):
+        """return the uploaded image of drive uuid"""
+        path = urlparse(f"{self.endpoint}drives/{uuid}/upload/").path
+        numbers = sorted(n for p, n in self.chunks if p == path)
+        return b"".join(self.chunks[(path, n)] for n in numbers)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class DownloadStandin:
+    """drive download endpoint serving an image with byte range support"""
+
+    def __init__(self, image):
+        self.image = image
+        self.requests = []
+        self.truncate = 0
+        self.lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                start, end = 0, len(standin.image) - 1
+                spec = self.headers.get("Range")
+                if spec:
+                    first, _, last = spec.partition("=")[2].partition("-")
+                    start, end = int(first), int(last)
+                with standin.lock:
+                    standin.requests.append(spec)
+                    truncate = standin.truncate > 0
+                    standin.truncate -= 1
+                body = standin.image[start : end + 1]
+                self.send_response(206 if spec else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if truncate:
+                    # drop the connection halfway through the body
+                    self.wfile.write(body[: len(body) // 2])
+                    self.close_connection = True
+                else:
+                    self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d/api/2.0/drives/drive-0/download/" % (
+            self.server.server_port
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ApiStandin:
+    """keep-alive JSON endpoint answering gzip-encoded when the client accepts it
+
+    when etag is set, requests naming it in If-None-Match get 304 Not Modified
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.etag = None
+        self.encodings = []
+        self.peers = set()
+        self.lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = json.dumps(standin.payload).encode()
+                accept = self.headers.get("Accept-Encoding", "")
+                with standin.lock:
+                    standin.encodings.append(accept)
+                    standin.peers.add(self.client_address)
+                if standin.etag and self.headers.get("If-None-Match") == standin.etag:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if standin.etag:
+                    self.send_header("ETag", standin.etag)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in accept:
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = "http://127.0.0.1:%d/api/2.0/" % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Tests for running a stream of commands with one shared client"""
+
+import json
+
+from click.testing import CliRunner
+
+from cscli import cli
+from cscli.cli import Environment
+
+
+def _batch(fake_api, lines, *args):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(
+        cli.cli, ["batch", *args], input="\n".join(lines) + "\n", obj=env
+    )
+    assert ret.exit_code == 0, ret.output
+    return [json.loads(line) for line in ret.output.splitlines()]
+
+
+def test_batch_shares_inventory(fake_api):
+    results = _batch(
+        fake_api,
+        [
+            '["list", "servers", "--brief"]',
+            '{"id": "a", "args": ["server", "server1", "show"]}',
+            '"server server2 show"',
+            '["drive", "drive0", "show"]',
+        ],
+    )
+    assert [ret["line"] for ret in results] == [1, 2, 3, 4]
+    assert all(ret["status"] for ret in results)
+    assert results[1]["id"] == "a"
+    assert results[1]["result"]["uuid"] == "server-1"
+    assert results[2]["result"]["uuid"] == "server-2"
+    assert results[3]["result"]["uuid"] == "drive-0"
+    # the names resolve against the listings fetched by the first line
+    assert fake_api.server.calls == ["list_detail"]
+    assert fake_api.drive.calls == ["list_detail"]
+
+
+def test_batch_failures_continue(fake_api):
+    results = _batch(
+        fake_api,
+        [
+            "not json",
+            '["bogus"]',
+            '["server", "missing", "show"]',
+            '["server", "server0", "show"]',
+        ],
+    )
+    assert [ret["status"] for ret in results] == [False, False, False, True]
+    assert results[0]["result"].startswith("invalid batch line")
+    assert "bogus" in results[1]["result"]
+    assert "missing" in results[2]["result"]
+
+
+def test_batch_jobs(fake_api):
+    lines = [f'["server", "server{i % 3}", "show"]' for i in range(9)]
+    lines.insert(5, "")
+    results = _batch(fake_api, lines, "--jobs", "4")
+    assert [ret["line"] for ret in results] == [1, 2, 3, 4, 5, 7, 8, 9, 10]
+    assert [ret["result"]["name"] for ret in results] == [
+        f"server{i % 3}" for i in range(9)
+    ]
+
+
+def test_batch_rejects_streaming_options(fake_api):
+    results = _batch(
+        fake_api,
+        [
+            '["list", "servers", "--text"]',
+            '["list", "servers", "--columns", "name"]',
+            '["list", "servers", "--columns=name"]',
+            '["list", "servers", "--ndjson"]',
+        ],
+    )
+    assert [ret["status"] for ret in results] == [False] * 4
+    assert [ret["result"].split()[0] for ret in results] == [
+        "--text",
+        "--columns",
+        "--columns",
+        "--ndjson",
+    ]
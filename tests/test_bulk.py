@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Tests for selecting many servers and drives in one command"""
+
+import io
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from cscli import cli
+from cscli.bulk import Selector, parse_selectors, select_resources
+from cscli.cli import Environment
+from cscli.error import ParameterError
+from tests.conftest import fake_inventory
+
+
+def _invoke(fake_api, *args, input=None):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, ["--compact", *args], input=input, obj=env)
+    assert ret.exit_code == 0, ret.output
+    return json.loads(ret.output.splitlines()[-1])
+
+
+def test_bulk_selectors():
+    servers = fake_inventory(12)["server"]
+    selectors = parse_selectors(
+        "server1,server-2,server1?", io.StringIO("/^server[34]$/\n# comment\n\n")
+    )
+    assert [s.spec for s in selectors] == [
+        "server1,server-2,server1?",
+        "/^server[34]$/",
+    ]
+    assert [s.spec for s in selectors[0].parts] == ["server1", "server-2", "server1?"]
+    selected, missing = select_resources(servers, selectors)
+    assert [s["name"] for s in selected] == [
+        "server1",
+        "server2",
+        "server10",
+        "server11",
+        "server3",
+        "server4",
+    ]
+    assert missing == []
+    assert parse_selectors("-") == []
+
+
+def test_bulk_selector_patterns():
+    assert Selector("web*").matches(dict(name="web1"))
+    # a glob matches the whole name, a /regex/ any part of it
+    assert not Selector("web*").matches(dict(name="oldweb1"))
+    assert not Selector("web?").matches(dict(name="legacy-web2"))
+    assert Selector("/web/").matches(dict(name="oldweb1"))
+    with pytest.raises(ParameterError):
+        parse_selectors("/[/")
+
+
+def test_bulk_selector_exact_names_first():
+    servers = [
+        dict(uuid="s-0", name="web[1]"),
+        dict(uuid="s-1", name="web1"),
+        dict(uuid="s-2", name="a,b"),
+        dict(uuid="s-3", name="a"),
+        dict(uuid="s-4", name="b"),
+    ]
+    selected, missing = select_resources(servers, parse_selectors("web[1]"))
+    assert [s["uuid"] for s in selected] == ["s-0"]
+    selected, missing = select_resources(servers, parse_selectors("a,b"))
+    assert [s["uuid"] for s in selected] == ["s-2"]
+    selected, missing = select_resources(servers, parse_selectors("a,web1,nosuch"))
+    assert [s["uuid"] for s in selected] == ["s-3", "s-1"]
+    assert missing == ["nosuch"]
+
+
+def test_bulk_single_target_unchanged(fake_api):
+    ret = _invoke(fake_api, "server", "server1", "start")
+    assert ret == dict(status=True, result=dict(uuid="server-1", result="success"))
+    assert fake_api.server.calls == [
+        "list_detail?name=server1&limit=100&offset=0",
+        "start server-1",
+    ]
+
+
+def test_bulk_start_pattern(fake_api):
+    fake_api.server.failures.add("server-1")
+    ret = _invoke(fake_api, "server", "server*,nosuch", "stop")
+    assert ret["status"] is False
+    assert [(r["name"], r["status"]) for r in ret["result"]] == [
+        ("server0", True),
+        ("server1", False),
+        ("server2", True),
+        ("nosuch", False),
+    ]
+    assert ret["result"][1]["result"].startswith("ClientError")
+    assert ret["result"][3]["result"] == "unknown server nosuch"
+    # all targets resolve against one listing
+    assert fake_api.server.calls.count("list_detail") == 1
+    assert sorted(c for c in fake_api.server.calls if c.startswith("stop")) == [
+        "stop server-0",
+        "stop server-1",
+        "stop server-2",
+    ]
+
+
+def test_bulk_destroy_from_file(fake_api, tmp_path):
+    targets = tmp_path / "targets"
+    targets.write_text("drive0\ndrive-2\n")
+    ret = _invoke(fake_api, "drive", "-F", str(targets), "-", "destroy", "--force")
+    assert ret["status"] is True
+    assert [r["uuid"] for r in ret["result"]] == ["drive-0", "drive-2"]
+
+
+def test_bulk_destroy_confirms_once(fake_api):
+    ret = _invoke(fake_api, "server", "/./", "destroy", input="n\n")
+    assert ret == dict(status=True, result="destruction averted")
+    assert not [c for c in fake_api.server.calls if c.startswith("delete")]
+
+
+def test_bulk_rename_requires_single_target(fake_api):
+    ret = _invoke(fake_api, "drive", "drive*", "modify", "--rename", "x")
+    assert ret == dict(status=False, result="--rename requires a single drive")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""Tests for the on-disk inventory cache"""
+
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from cscli import CACHE_TTL, cli
+from cscli.api_client import CloudSigmaClient
+from cscli.cache import InventoryCache
+from cscli.cli import Environment
+from tests.conftest import FakeResource
+from tests.fakeapi import FakeCloudSigma
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return InventoryCache("sjc", "user@example.org", ttl=60, root=str(tmp_path))
+
+
+def test_cache_put_get(cache):
+    assert cache.get("server") is None
+    cache.put("server", [dict(uuid="a")], time.time())
+    assert cache.get("server") == [dict(uuid="a")]
+
+
+def test_cache_expired(cache):
+    cache.put("server", [dict(uuid="a")], time.time() - 120)
+    assert cache.get("server") is None
+
+
+def test_cache_refresh(tmp_path, cache):
+    cache.put("server", [dict(uuid="a")], time.time())
+    fresh = InventoryCache("sjc", "user@example.org", refresh=True, root=str(tmp_path))
+    assert fresh.get("server") is None
+
+
+def test_cache_invalidate_discards_older_fetch(cache):
+    fetched = time.time()
+    cache.put("drive", [dict(uuid="a")], fetched)
+    cache.invalidate("drive")
+    assert cache.get("drive") is None
+    # a listing requested before the invalidation must not be stored
+    cache.put("drive", [dict(uuid="b")], fetched)
+    assert cache.get("drive") is None
+    cache.put("drive", [dict(uuid="c")], time.time())
+    assert cache.get("drive") == [dict(uuid="c")]
+
+
+def test_cache_invalidate_all(cache):
+    cache.put("drive", [dict(uuid="a")], time.time())
+    cache.put("server", [dict(uuid="b")], time.time())
+    cache.invalidate()
+    assert cache.get("drive") is None
+    assert cache.get("server") is None
+
+
+def test_cache_shared_between_clients():
+    first = CloudSigmaClient(cache_ttl=60, cache_refresh=True)
+    first.server = FakeResource([dict(uuid="server-0", name="server0")])
+    first.list_servers("detail")
+
+    second = CloudSigmaClient(cache_ttl=60)
+    second.server = FakeResource([])
+    assert second.find_server("server0")["uuid"] == "server-0"
+    assert second.server.calls == []
+
+    second.invalidate("server")
+    third = CloudSigmaClient(cache_ttl=60)
+    third.server = FakeResource([dict(uuid="server-1", name="server0")])
+    assert third.find_server("server0")["uuid"] == "server-1"
+    assert third.server.calls == ["list_detail?name=server0&limit=100&offset=0"]
+
+
+@pytest.fixture
+def fake():
+    fake = FakeCloudSigma()
+    fake.seed(40)
+    # listings last changed well before they are first fetched
+    fake.modified["servers"] -= 10
+    yield fake
+    fake.close()
+
+
+def _client(fake, logged=None):
+    log = None if logged is None else lambda msg, *args: logged.append(msg % args)
+    return CloudSigmaClient(endpoint=fake.endpoint, cache_ttl=0, log=log)
+
+
+def _servers(fake):
+    api = _client(fake)
+    ret = api.list_servers("detail")["servers"]
+    api.close()
+    return ret
+
+
+def test_revalidate_unchanged(fake):
+    _servers(fake)
+    start = len(fake.requests)
+    logged = []
+    api = _client(fake, logged)
+    assert len(api.list_servers("detail")["servers"]) == 40
+    api.close()
+    assert fake.requests[start:] == ["GET /api/2.0/servers/detail/"]
+    assert logged[0].startswith("server listing unchanged; saved ")
+
+
+def test_revalidate_changed(fake):
+    _servers(fake)
+    servers = fake.collections["servers"]
+    first, second, third = list(servers)[:3]
+    servers[first].update(status="running", mem=7)
+    del servers[second]
+    # only fields the brief listing leaves out
+    servers[third]["nics"] = []
+    fake.add("servers", dict(name="added"))
+    start = len(fake.requests)
+    ret = _servers(fake)
+    # one request answers with the whole current listing
+    assert fake.requests[start:] == ["GET /api/2.0/servers/detail/"]
+    assert ret == list(servers.values())
+    # its etag answers the next refresh
+    start = len(fake.requests)
+    assert _servers(fake) == ret
+    assert fake.requests[start:] == ["GET /api/2.0/servers/detail/"]
+
+
+def test_refresh_revalidates_index(fake):
+    api = _client(fake)
+    api.index.list("server")
+    uuid = next(iter(fake.collections["servers"]))
+    fake.collections["servers"][uuid]["drives"] = []
+    fake._touch("servers")
+    start = len(fake.requests)
+    api.refresh("server")
+    assert api.index.get("server", uuid)["drives"] == []
+    assert fake.requests[start:] == ["GET /api/2.0/servers/detail/"]
+    api.close()
+
+
+def _cli(fake, *args):
+    ret = CliRunner().invoke(
+        cli.cli,
+        ["--endpoint", fake.endpoint, "--cache-ttl", "60", *args],
+        obj=Environment(),
+    )
+    assert ret.exit_code == 0, ret.output
+
+
+def test_updates_do_not_revert_changes_since_cached(fake):
+    api = CloudSigmaClient(endpoint=fake.endpoint, cache_ttl=60)
+    api.refresh("server", "drive")
+    api.close()
+    servers = fake.collections["servers"]
+    drives = fake.collections["drives"]
+    # changed elsewhere while the listings are cached
+    for server in servers.values():
+        server["mem"] = 7
+    for drive in drives.values():
+        drive["meta"] = dict(changed="elsewhere")
+    _cli(fake, "server", "app-000001", "modify", "--rename", "renamed")
+    _cli(fake, "server", "app-00002*", "modify", "--password", "secret")
+    _cli(fake, "drive", "app-000001-disk", "modify", "--media", "cdrom")
+    renamed = [s for s in servers.values() if s["name"] == "renamed"]
+    assert renamed and renamed[0]["mem"] == 7
+    assert all(server["mem"] == 7 for server in servers.values())
+    assert all(d["meta"] == dict(changed="elsewhere") for d in drives.values())
+
+
+def test_default_cache_shows_changes_made_elsewhere(fake):
+    def mem(uuid):
+        api = CloudSigmaClient(endpoint=fake.endpoint, cache_ttl=CACHE_TTL)
+        ret = api.index.get("server", uuid)["mem"]
+        api.close()
+        return ret
+
+    uuid = next(iter(fake.collections["servers"]))
+    mem(uuid)
+    fake.collections["servers"][uuid]["mem"] = 12345
+    fake._touch("servers")
+    assert mem(uuid) == 12345
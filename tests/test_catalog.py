@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+
+"""Tests for the local library drive catalog"""
+
+import threading
+import time
+
+import pytest
+
+from cscli.catalog import LibraryCatalog, distance, fold, resemblance
+from cscli.filters import parse_filters
+from tests.standins import ApiStandin
+
+LIBDRIVES = [
+    dict(
+        uuid="lib-0",
+        name="Ubuntu 22.04 LTS",
+        os="linux",
+        version="22.04",
+        description="Ubuntu server image",
+        media="cdrom",
+    ),
+    dict(
+        uuid="lib-1",
+        name="Debian 12",
+        os="linux",
+        version="12",
+        description="Debian netinst",
+        media="cdrom",
+    ),
+    dict(
+        uuid="lib-2",
+        name="Windows Server 2022",
+        os="windows",
+        version="2022",
+        description="Évaluation edition",
+        media="disk",
+    ),
+]
+
+
+class Fetch:
+    """catalog fetch function recording the conditional request values"""
+
+    def __init__(self, items=LIBDRIVES, etag='"v1"'):
+        self.items = items
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, etag, modified):
+        self.requests.append(etag)
+        if etag == self.etag:
+            return None, etag, modified
+        return self.items, self.etag, None
+
+
+def _search(catalog, *filters):
+    return [item["uuid"] for item in catalog.search(parse_filters(filters))]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = LibraryCatalog("sjc", root=str(tmp_path))
+    catalog.ensure(Fetch())
+    yield catalog
+    catalog.close()
+
+
+def test_catalog_search(catalog):
+    assert _search(catalog) == ["lib-0", "lib-1", "lib-2"]
+    assert _search(catalog, "search=ubuntu 22") == ["lib-0"]
+    assert _search(catalog, "search=deb net") == ["lib-1"]
+    # diacritics are ignored
+    assert _search(catalog, "search=evaluation") == ["lib-2"]
+    # with no drive matching every term, drives matching any term are listed
+    assert set(_search(catalog, "search=ubuntu debian")) == {"lib-0", "lib-1"}
+    # misspelt terms match the closest words, best first
+    assert _search(catalog, "search=ubunto") == ["lib-0"]
+    assert _search(catalog, "search=windos server") == ["lib-2", "lib-0"]
+    assert _search(catalog, "search=evalutaion") == ["lib-2"]
+    # swapped letters count as one edit
+    assert _search(catalog, "search=ubnutu") == ["lib-0"]
+    assert _search(catalog, "search=debain") == ["lib-1"]
+    assert _search(catalog, "search=xyzzy") == []
+    assert _search(catalog, "search=linux", "media=cdrom", "version__gt=20") == [
+        "lib-0"
+    ]
+
+
+def test_resemblance():
+    assert distance("debain", "debian") == 1
+    assert distance("ubnutu", "ubuntu") == 1
+    assert distance("kitten", "sitting") == 3
+    assert distance("", "abc") == 3
+    assert resemblance("deb", ["debian"]) == 1.0
+    assert resemblance("ubunto", ["ubuntu", "server"]) == pytest.approx(5 / 6)
+    assert resemblance("abc", []) == 0.0
+    assert fold("Évaluation") == "evaluation"
+
+
+def test_catalog_conditional_refresh(catalog):
+    fetch = Fetch()
+    assert catalog.refresh(fetch) is False
+    assert fetch.requests == ['"v1"']
+    assert len(_search(catalog)) == 3
+    assert catalog.refresh(Fetch(LIBDRIVES[:1], '"v2"')) is True
+    assert _search(catalog) == ["lib-0"]
+
+
+def test_catalog_expired_refreshes_in_background(tmp_path):
+    catalog = LibraryCatalog("sjc", ttl=0, root=str(tmp_path))
+    catalog.ensure(Fetch())
+    fetch = Fetch(LIBDRIVES[1:], '"v2"')
+    catalog.ensure(fetch)
+    catalog.worker.join()
+    assert fetch.requests == ['"v1"']
+    assert _search(catalog) == ["lib-1", "lib-2"]
+    catalog.close()
+
+
+def test_catalog_background_refresh_failure(tmp_path):
+    logged = []
+    catalog = LibraryCatalog(
+        "sjc",
+        ttl=0,
+        root=str(tmp_path),
+        log=lambda msg, *args: logged.append(msg % args),
+    )
+    catalog.ensure(Fetch())
+
+    def fail(etag, modified):
+        raise OSError("connection reset")
+
+    catalog.ensure(fail)
+    catalog.worker.join()
+    assert logged == ["library catalog refresh failed: connection reset"]
+    assert len(_search(catalog)) == 3
+    catalog.close()
+
+
+def test_catalog_close_does_not_wait_for_slow_refresh(tmp_path):
+    catalog = LibraryCatalog("sjc", ttl=0, root=str(tmp_path))
+    catalog.ensure(Fetch())
+    release = threading.Event()
+
+    def slow(etag, modified):
+        release.wait(10)
+        return None, etag, modified
+
+    catalog.ensure(slow)
+    assert catalog.worker.daemon
+    start = time.monotonic()
+    catalog.close(timeout=0.1)
+    assert time.monotonic() - start < 5
+    release.set()
+    catalog.worker.join()
+
+
+def test_client_catalog(fake_api, monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    standin = ApiStandin(dict(objects=LIBDRIVES))
+    standin.etag = '"v1"'
+    monkeypatch.setitem(fake_api.config, "api_endpoint", standin.endpoint)
+    fake_api.use_catalog = True
+    try:
+        ret = fake_api.list_libdrives("detail", ["search=windows"])
+        assert [d["uuid"] for d in ret["libdrives"]] == ["lib-2"]
+        assert fake_api.catalog.refresh(fake_api._fetch_libdrives) is False
+        assert len(standin.encodings) == 2
+        ret = fake_api.list_libdrives("uuid", ["os=linux"])
+        assert ret == dict(libdrives=[{"lib-0": None}, {"lib-1": None}])
+        assert len(standin.encodings) == 2
+    finally:
+        fake_api.close()
+        standin.close()
@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 
+import click
 import pytest
 
+from cscli import cli
+from cscli.commands import registry
+
 """Tests for `cscli` package."""
 
 
@@ -17,3 +21,33 @@ def test_cli_help(runner):
     """Test top-level --help"""
     help_result = runner("--help")
     assert "Usage: cscli [OPTIONS] COMMAND [ARGS]..." in help_result.output
+
+
+def test_cli_registry_current():
+    """Test the generated command registry matches the command modules"""
+    from cscli.commands.__main__ import render, scan_commands
+
+    commands = scan_commands()
+    assert commands == registry.COMMANDS
+    with open(registry.__file__) as ifp:
+        assert ifp.read() == render(commands)
+
+
+def test_cli_plugin(runner, monkeypatch):
+    """Test a command plugin registered as an entry point"""
+
+    @click.command("hello", short_help="say hello")
+    def hello():
+        click.echo("hello from plugin")
+
+    class EntryPoint:
+        name = "hello"
+        value = "example.plugin:hello"
+
+        def load(self):
+            return hello
+
+    monkeypatch.setattr(cli, "plugin_commands", lambda: {"hello": EntryPoint()})
+    monkeypatch.setattr(cli.cli, "_plugins", None)
+    assert "plugin command example.plugin:hello" in runner("--help").output
+    assert runner("hello").output == "hello from plugin\n"
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""Tests for websocket notification waiting"""
+
+import pytest
+
+from cscli.error import EventError
+from cscli.events import EventSource
+from cscli.wait import WaitTarget, wait_for
+from tests.standins import WebsocketStandin
+
+
+@pytest.fixture
+def standin():
+    standin = WebsocketStandin()
+    yield standin
+    standin.close()
+
+
+def test_event_source_recv(standin):
+    events = EventSource(standin.url, "secret-cookie")
+    standin.send(dict(resource_uri="/api/2.0/servers/server-0/"))
+    assert events.recv(5) == dict(resource_uri="/api/2.0/servers/server-0/")
+    assert events.recv(0.05) is None
+    assert standin.headers["cookie"] == "async_auth=secret-cookie"
+    events.close()
+
+
+def test_event_source_connect_failure(standin):
+    standin.close()
+    with pytest.raises(EventError):
+        EventSource(standin.url, "cookie", timeout=1)
+
+
+def test_wait_for_events(fake_api, standin):
+    fake_api.open_events = lambda: EventSource(standin.url, "cookie")
+    target = WaitTarget("server", "server1", "stopped")
+
+    def log(msg, *args):
+        # the first poll has run; change the server and notify
+        fake_api.server.items[1]["status"] = "stopped"
+        standin.send(dict(resource_type="servers", uuid="server-9"))
+        standin.send(dict(resource_uri="/api/2.0/servers/server-1/"))
+
+    assert wait_for(fake_api, [target], 10, interval=30, log=log, subscribe=True)
+    # one poll, then a single GET for the notified server
+    assert fake_api.server.calls == ["list_detail", "get server-1"]
+
+
+def test_wait_for_events_fallback(fake_api, standin):
+    fake_api.open_events = lambda: EventSource(standin.url, "cookie")
+    target = WaitTarget("server", "server1", "stopped")
+    messages = []
+
+    def log(msg, *args):
+        messages.append(msg % args)
+        fake_api.server.items[1]["status"] = "stopped"
+        standin.close()
+
+    assert wait_for(fake_api, [target], 10, interval=0.1, log=log, subscribe=True)
+    assert "falling back to polling" in messages[-1]
+    assert fake_api.server.calls == ["list_detail", "list_detail"]
+
+
+def test_wait_for_events_deleted(fake_api, standin):
+    fake_api.open_events = lambda: EventSource(standin.url, "cookie")
+    target = WaitTarget("server", "server1", "deleted")
+
+    def log(msg, *args):
+        # destroyed while being waited on
+        del fake_api.server.items[1]
+        standin.send(dict(resource_uri="/api/2.0/servers/server-1/"))
+
+    assert wait_for(fake_api, [target], 10, interval=30, log=log, subscribe=True)
+    assert fake_api.server.calls == ["list_detail", "get server-1"]
+    assert target.report()["status"] == "deleted"
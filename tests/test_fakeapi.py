@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""Tests running the client against the in-memory CloudSigma stand-in"""
+
+import json
+import time
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from cscli import cli
+from cscli.api_client import CloudSigmaClient
+from cscli.cli import Environment
+from tests.fakeapi import FakeCloudSigma
+
+
+@pytest.fixture
+def fake():
+    fake = FakeCloudSigma()
+    fake.seed(250)
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def api(fake):
+    api = CloudSigmaClient(endpoint=fake.endpoint)
+    yield api
+    api.close()
+
+
+def _cli(fake, *args):
+    ret = CliRunner().invoke(
+        cli.cli, ["--endpoint", fake.endpoint, "--no-cache", *args], obj=Environment()
+    )
+    assert ret.exit_code == 0, ret.output
+    return ret.output
+
+
+def test_endpoint_override(fake, api):
+    assert api.server.c.api_endpoint == fake.endpoint
+    assert api.direct_endpoint == fake.endpoint
+    assert api.config["ws_endpoint"].startswith("ws://127.0.0.1:")
+    assert api.site == fake.endpoint
+
+
+def test_listings_page(fake, api):
+    assert len(list(api.iter_servers())) == 250
+    # three pages, and one requested ahead if the short page was still coming
+    assert fake.requests.count("GET /api/2.0/servers/detail/") in [3, 4]
+    ret = api.list_all("brief")
+    assert [len(ret[name]) for name in ["servers", "drives", "vlans", "ips"]] == [
+        250
+    ] * 4
+
+
+def test_filters_are_answered_by_the_fake(fake, api):
+    stopped = api.list_servers("detail", ["status=stopped"])["servers"]
+    assert len(stopped) == len([i for i in range(250) if i % 7 == 0])
+    ret = api.list_drives("detail", ["name__icontains=00012"])["drives"]
+    assert {drive["name"] for drive in ret} == {
+        f"app-{i:06d}-disk" for i in [12, *range(120, 130)]
+    }
+
+
+def test_cli_server_lifecycle(fake):
+    out = json.loads(
+        _cli(fake, "server", "app-000002", "create", "--create-drive", "10G")
+    )
+    uuid = out["result"]["uuid"]
+    assert fake.collections["servers"][uuid]["status"] == "stopped"
+    _cli(fake, "server", uuid, "start")
+    assert fake.collections["servers"][uuid]["status"] == "running"
+    drive = fake.collections["servers"][uuid]["drives"][0]["drive"]
+    assert fake.collections["drives"][drive]["status"] == "mounted"
+
+
+def test_upload_and_download(fake, api, tmp_path):
+    image = bytes(range(256)) * 1000
+    source = tmp_path / "image.raw"
+    source.write_bytes(image)
+    with open(source, "rb") as input_file:
+        uuid = api.upload_drive_chunked(input_file, "uploaded", chunk_size=64 * 1024)
+    assert fake.image(uuid) == image
+    with open(tmp_path / "copy.raw", "wb") as output:
+        api.download_drive_image(uuid, output, range_size=100 * 1024)
+    assert (tmp_path / "copy.raw").read_bytes() == image
+
+
+def test_libdrive_listing_not_modified(fake, api):
+    items, etag, modified = api._fetch_libdrives()
+    assert len(items) == 25
+    assert api._fetch_libdrives(etag, modified)[0] is None
+    fake.add("libdrives", dict(name="new", os="linux"))
+    assert len(api._fetch_libdrives(etag, modified)[0]) == 26
+
+
+def test_injected_errors(fake):
+    api = CloudSigmaClient(endpoint=fake.endpoint, retries=1)
+    fake.fail(503, count=2)
+    with pytest.raises(api.errors.ServerError):
+        api.server.list()
+    assert fake.requests.count("GET /api/2.0/servers/") == 2
+    fake.fail(429)
+    response = requests.get(f"{fake.endpoint}servers/", auth=("user", "pass"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert api.server.list(dict(limit=1))
+    api.close()
+
+
+def test_error_rate():
+    fake = FakeCloudSigma(errors={500: 1.0})
+    response = requests.get(f"{fake.endpoint}servers/", auth=("user", "pass"))
+    assert response.status_code == 500
+    fake.close()
+
+
+def test_latency_and_bandwidth():
+    fake = FakeCloudSigma(latency=0.2, bandwidth=200000)
+    fake.seed(100)
+    start = time.monotonic()
+    response = requests.get(
+        f"{fake.endpoint}servers/detail/",
+        params=dict(limit=0),
+        auth=("user", "pass"),
+        headers={"Accept-Encoding": "identity"},
+    )
+    elapsed = time.monotonic() - start
+    assert len(response.json()["objects"]) == 100
+    assert elapsed >= 0.2 + 0.9 * len(response.content) / 200000
+    fake.close()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""Tests for list filters pushed down to the API or checked locally"""
+
+import pytest
+
+from cscli.error import ParameterError
+from cscli.filters import Filter, parse_filters, predicate, pushdown
+from tests.conftest import FakeResource, fake_inventory
+
+
+def test_filter_operators():
+    server = fake_inventory()["server"][1]
+    assert Filter("name=server1").matches(server)
+    assert not Filter("name=Server1").matches(server)
+    assert Filter("name__iexact=SERVER1").matches(server)
+    assert Filter("name__startswith=serv").matches(server)
+    assert Filter("name__regex=^s.*1$").matches(server)
+    assert Filter("status__in=stopped,running").matches(server)
+    assert Filter("smp__gte=2").matches(server)
+    assert not Filter("mem__lt=1024").matches(server)
+    assert Filter("cpus_instead_of_cores=false").matches(server)
+    # nested fields and lists of values
+    assert Filter("drives.drive=drive-1").matches(server)
+    assert not Filter("drives.drive=drive-0").matches(server)
+    assert not Filter("missing=x").matches(server)
+    assert Filter("search=serv").matches(server)
+    assert not Filter("search=erver").matches(server)
+
+
+def test_filter_errors():
+    with pytest.raises(ParameterError):
+        Filter("name")
+    with pytest.raises(ParameterError):
+        Filter("name__like=x")
+    with pytest.raises(ParameterError):
+        Filter("name__regex=(")
+
+
+def test_filter_pushdown():
+    filters = parse_filters(["name=a", "status=running", "name=b", "smp__gt=1"])
+    params, remaining = pushdown("server", filters)
+    assert params == dict(name="a", status="running")
+    assert [str(f) for f in remaining] == ["name=b", "smp__gt=1"]
+    assert pushdown("vlan", filters)[0] == {}
+    assert predicate([])(dict())
+
+
+def test_filter_servers(fake_api):
+    messages = []
+    fake_api.log = lambda msg, *args: messages.append(msg % args)
+    ret = fake_api.list_servers("detail", ["status=running", "name__regex=[12]$"])
+    assert [s["uuid"] for s in ret["servers"]] == ["server-1", "server-2"]
+    assert fake_api.server.calls == ["list_detail?status=running&limit=100&offset=0"]
+    assert messages == [
+        "server filters pushed down: status=running; checked locally: name__regex=[12]$"
+    ]
+
+
+def test_filter_indexed_is_local(fake_api):
+    fake_api.list_vlans("detail")
+    ret = fake_api.list_vlans("uuid", ["meta.name=vlan2"])
+    assert ret == dict(vlans=[{"vlan-2": None}])
+    assert fake_api.vlan.calls == ["list_detail"]
+
+
+def test_filter_brief(fake_api):
+    ret = fake_api.list_drives("brief", ["mounted_on=server-0"])
+    assert [list(d) for d in ret["drives"]] == [["drive-0"]]
+
+
+def test_filter_libdrive_name_contains(fake_api):
+    fake_api.libdrive = FakeResource(
+        [dict(uuid="lib-0", name="Ubuntu 22.04"), dict(uuid="lib-1", name="Debian")]
+    )
+    ret = fake_api.list_libdrives("detail", ["name_contains=ubuntu"])
+    assert [d["uuid"] for d in ret["libdrives"]] == ["lib-0"]
+    assert fake_api.libdrive.calls == ["list?name__icontains=ubuntu&limit=0"]
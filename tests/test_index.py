@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+"""Tests for the per-invocation resource index"""
+
+import pytest
+
+from cscli.error import ResourceNotFound
+from tests.conftest import FakeResource
+
+
+def test_index_brief_fetches_each_type_once(fake_api):
+    ret = fake_api.list_all("brief")
+    assert len(ret["servers"]) == 3
+    for _type in ["server", "drive", "vlan", "ip"]:
+        assert getattr(fake_api, _type).calls == ["list_detail"]
+
+
+def test_index_text_resolves_names(fake_api):
+    ret = fake_api.list_servers("text")
+    lines = ret["servers"][0]["server-0"]
+    assert "name=server0" in lines[0]
+    assert lines[1].strip() == "drives=['drive0']"
+    assert fake_api.drive.calls == ["list_detail"]
+
+
+def test_index_find_by_uuid_and_name(fake_api):
+    fake_api.list_all("detail")
+    assert fake_api.find_server("server1")["uuid"] == "server-1"
+    assert fake_api.find_server("server-2")["name"] == "server2"
+    assert fake_api.find_drive("drive0")["uuid"] == "drive-0"
+    assert fake_api.server.calls == ["list_detail"]
+    with pytest.raises(ResourceNotFound):
+        fake_api.find_server("nonexistent")
+
+
+def test_index_invalidate(fake_api):
+    fake_api.list_servers("detail")
+    fake_api.index.invalidate("server")
+    fake_api.list_servers("detail")
+    assert fake_api.server.calls == ["list_detail", "list_detail"]
+
+
+def test_index_list_all_order(fake_api):
+    ret = fake_api.list_all("detail")
+    assert list(ret.keys()) == ["servers", "drives", "vlans", "ips"]
+    assert [s["uuid"] for s in ret["servers"]] == ["server-0", "server-1", "server-2"]
+
+
+def test_index_list_all_none_fan_out(fake_api):
+    ret = fake_api.list_all(None)
+    assert list(ret.keys()) == ["servers", "drives", "vlans", "ips"]
+    for _type in ["server", "drive", "vlan", "ip"]:
+        assert getattr(fake_api, _type).calls == ["list"]
+
+
+def test_index_prefetch_single_worker(fake_api):
+    fake_api.workers = 1
+    fake_api.list_drives("brief")
+    assert fake_api.server.calls == ["list_detail"]
+    assert fake_api.drive.calls == ["list_detail"]
+    assert fake_api.ip.calls == []
+
+
+def test_find_uuid_fast_path(fake_api):
+    uuid = "5f7b4ad2-1d2c-4c0e-9c7e-0123456789ab"
+    fake_api.server = FakeResource([dict(uuid=uuid, name="fast")])
+    assert fake_api.find_server(uuid)["name"] == "fast"
+    assert fake_api.server.calls == [f"get {uuid}"]
+    with pytest.raises(ResourceNotFound):
+        fake_api.find_server("00000000-0000-4000-8000-000000000000")
+
+
+def test_find_ip_address_fast_path(fake_api):
+    assert fake_api.find_ip("10.0.0.1")["meta"]["name"] == "ip1"
+    assert fake_api.ip.calls == ["get 10.0.0.1"]
+
+
+def test_find_name_filter(fake_api):
+    assert fake_api.find_drive("drive2")["uuid"] == "drive-2"
+    assert fake_api.drive.calls == ["list_detail?name=drive2&limit=100&offset=0"]
+
+
+def test_find_name_filter_fallback(fake_api):
+    # vlan names are not filterable on the server
+    assert fake_api.find_vlan("vlan-1")["uuid"] == "vlan-1"
+    assert fake_api.vlan.calls == ["list_detail"]
+    with pytest.raises(ResourceNotFound):
+        fake_api.find_server("missing")
+    assert fake_api.server.calls == [
+        "list_detail?name=missing&limit=100&offset=0",
+        "list_detail",
+    ]
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""Tests for JSON serializer selection and output"""
+
+import contextlib
+import io
+import json
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from cscli import cli
+from cscli.cli import Environment
+from cscli.output import JSONWriter, YAMLDocuments, write
+
+from .conftest import fake_inventory
+
+SAMPLES = [
+    fake_inventory(),
+    dict(name="café", note="snowman ☃", tag="\U0001f600"),
+    dict(small=1e-07, large=1e20, third=1 / 3, whole=2.0, negative=-0.5),
+    dict(big=2**70, nested=[None, True, False, [], {}], text='tab\tquote"/'),
+    {1: "integer key", "b": [1.5, "x"]},
+]
+
+
+def test_writer_fallback():
+    writer = JSONWriter("unknown")
+    assert writer.name == "json"
+    assert (
+        writer.dumps(SAMPLES[0], compact=True)
+        == json.dumps(SAMPLES[0], separators=(",", ":")).encode()
+    )
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+@pytest.mark.parametrize("backend", ["orjson", "msgspec"])
+def test_compact_output_matches_json(backend, sample):
+    pytest.importorskip(backend)
+    writer = JSONWriter(backend)
+    assert writer.name == backend
+    expected = json.dumps(sample, separators=(",", ":")).encode()
+    assert writer.dumps(sample, compact=True) == expected
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+@pytest.mark.parametrize("backend", ["orjson", "msgspec"])
+def test_indented_output_loads_equal(backend, sample):
+    pytest.importorskip(backend)
+    out = JSONWriter(backend).dumps(sample)
+    assert json.loads(out) == json.loads(json.dumps(sample))
+    assert out.startswith(b"{\n  ")
+
+
+def test_write_uses_binary_buffer():
+    stream = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    stream.write("text ")
+    write(b'{"a":1}', stream)
+    assert stream.buffer.getvalue() == b'text {"a":1}\n'
+    text = io.StringIO()
+    write(b'{"a":1}', text)
+    assert text.getvalue() == '{"a":1}\n'
+
+
+def test_environment_compact_output(fake_api):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, ["--compact", "list", "vlans"], obj=env)
+    assert ret.exit_code == 0, ret.output
+    expected = dict(status=True, result=fake_api.list_vlans("detail", []))
+    assert ret.output == json.dumps(expected, separators=(",", ":")) + "\n"
+
+
+def _invoke(fake_api, *args):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, list(args), obj=env)
+    assert ret.exit_code == 0, ret.output
+    return ret.output
+
+
+def test_yaml_output(fake_api):
+    out = _invoke(fake_api, "--yaml", "list", "servers")
+    assert yaml.safe_load(out) == fake_api.list_servers("detail", [])
+    assert out == yaml.dump(fake_api.list_servers("detail", []))
+
+
+def test_yaml_documents_per_resource(fake_api):
+    out = _invoke(fake_api, "--yaml-documents", "list", "servers", "--brief")
+    documents = list(yaml.safe_load_all(out))
+    assert documents == fake_api.list_servers("brief", [])["servers"]
+    out = _invoke(fake_api, "-Y", "list", "--uuid")
+    assert list(yaml.safe_load_all(out)) == [
+        {name: uuid}
+        for name, prefix in [("servers", "server"), ("drives", "drive")]
+        for uuid in [f"{prefix}-{i}" for i in range(3)]
+    ] + [{"vlans": f"vlan-{i}"} for i in range(3)] + [
+        {"ips": f"10.0.0.{i}"} for i in range(3)
+    ]
+
+
+def test_json_overrides_yaml_documents(fake_api):
+    out = _invoke(fake_api, "-Y", "-j", "list", "servers", "--brief")
+    assert json.loads(out)["result"] == fake_api.list_servers("brief", [])
+
+
+def test_yaml_documents_written_as_given():
+    stream = io.StringIO()
+    with YAMLDocuments(stream) as documents:
+        documents.write(dict(uuid="a"))
+        assert stream.getvalue() == "---\nuuid: a\n"
+        documents.write(dict(uuid="b"))
+    assert list(yaml.safe_load_all(stream.getvalue())) == [
+        dict(uuid="a"),
+        dict(uuid="b"),
+    ]
+
+
+def test_yaml_documents_result_list(fake_api):
+    env = Environment()
+    env.fmt = "yaml"
+    env.documents = True
+    stream = io.StringIO()
+    with contextlib.redirect_stdout(stream):
+        env.output([1, dict(a=2)])
+        env.output(dict(a=3))
+    assert list(yaml.safe_load_all(stream.getvalue())) == [1, dict(a=2), dict(a=3)]
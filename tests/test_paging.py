@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Tests for paged listings read ahead in the background"""
+
+import threading
+import time
+
+from cscli.paging import iter_items, iter_pages
+
+
+class Pages:
+    """fetch function serving items by limit and offset, recording offsets"""
+
+    def __init__(self, count):
+        self.items = list(range(count))
+        self.offsets = []
+        self.lock = threading.Lock()
+
+    def __call__(self, limit, offset):
+        with self.lock:
+            self.offsets.append(offset)
+        return self.items[offset : offset + limit]
+
+
+def test_paging_reads_all_pages():
+    pages = Pages(250)
+    assert [len(page) for page in iter_pages(pages, 100)] == [100, 100, 50]
+    assert sorted(pages.offsets) == [0, 100, 200]
+    assert list(iter_items(Pages(250), 100)) == list(range(250))
+
+
+def test_paging_exact_multiple():
+    pages = Pages(200)
+    assert [len(page) for page in iter_pages(pages, 100, prefetch=1)] == [100, 100, 0]
+
+
+def test_paging_prefetches_while_consuming():
+    pages = Pages(1000)
+    stream = iter_pages(pages, 100, prefetch=3)
+    next(stream)
+    # the next pages are requested while the first is consumed
+    for _ in range(100):
+        if len(pages.offsets) == 4:
+            break
+        time.sleep(0.01)
+    assert sorted(pages.offsets) == [0, 100, 200, 300]
+    stream.close()
+
+
+def test_paging_early_stop():
+    pages = Pages(10000)
+    for item in iter_items(pages, 100, prefetch=2):
+        if item == 5:
+            break
+    # only the pages requested ahead of the first were read
+    assert len(pages.offsets) <= 3
+
+
+def test_client_iterators(fake_api):
+    fake_api.page_size = 2
+    assert [s["uuid"] for s in fake_api.iter_servers()] == [
+        "server-0",
+        "server-1",
+        "server-2",
+    ]
+    assert sorted(fake_api.server.calls) == [
+        "list_detail?limit=2&offset=0",
+        "list_detail?limit=2&offset=2",
+        "list_detail?limit=2&offset=4",
+    ]
+
+
+def test_client_find_stops_at_match(fake_api):
+    fake_api.page_size = 1
+    fake_api.prefetch = 1
+    fake_api.server.items.append(dict(uuid="server-x", name="server0"))
+    assert fake_api.find_server("server0")["uuid"] == "server-0"
+    assert len(fake_api.server.calls) <= 2
+
+
+def test_stream_detail_paged(fake_api):
+    fake_api.page_size = 2
+    stream = fake_api.stream_resources("drives", "detail")
+    assert [item["uuid"] for _, item in stream] == ["drive-0", "drive-1", "drive-2"]
+    assert "list_detail" not in fake_api.drive.calls
+    assert "drive" not in fake_api.index.snapshots
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Startup tests driven by python -X importtime"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# modules that only API requests should need
+HEAVY_MODULES = ["cloudsigma", "requests", "urllib3", "websocket", "yaml"]
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _importtime(*args):
+    """run python -X importtime, returning cumulative microseconds per module"""
+    ret = subprocess.run(
+        [sys.executable, "-X", "importtime"] + list(args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        cwd=REPO_DIR,
+    )
+    assert ret.returncode == 0, ret.stderr
+    modules = {}
+    for line in ret.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_startup_imports():
+    modules = _importtime("-c", "import cscli.cli")
+    assert "cscli.cli" in modules
+    assert not set(HEAVY_MODULES) & set(modules)
+
+
+# run the command line, then report the modules it imported
+RUN_CLI = """
+import sys
+from cscli.cli import cli
+try:
+    cli(sys.argv[1:])
+except SystemExit:
+    pass
+sys.stderr.write(" ".join(sys.modules))
+"""
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["server", "web1", "--help"], ["list", "--help"]]
+)
+def test_startup_help_is_local(args):
+    ret = subprocess.run(
+        [sys.executable, "-c", RUN_CLI] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        cwd=REPO_DIR,
+    )
+    modules = set(ret.stderr.split())
+    assert not set(HEAVY_MODULES) & modules
+    # only the command being run is imported
+    commands = [name for name in modules if name.startswith("cscli.commands.cmd_")]
+    assert len(commands) == (0 if args == ["--help"] else 1)
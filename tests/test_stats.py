@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Tests for the --stats report and --trace-file"""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from cscli import cli
+from cscli.api_client import CloudSigmaClient
+from cscli.cli import Environment
+from cscli.stats import Recorder, endpoint, percentile
+from tests.fakeapi import FakeCloudSigma
+
+
+@pytest.fixture
+def fake():
+    fake = FakeCloudSigma()
+    fake.seed(50)
+    yield fake
+    fake.close()
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_endpoint_and_percentile():
+    assert endpoint("GET", "/api/2.0/servers/detail/") == "GET /api/2.0/servers/detail/"
+    assert (
+        endpoint(
+            "POST", "/api/2.0/servers/0a1b2c3d-0000-4000-8000-00000000000f/action/"
+        )
+        == "POST /api/2.0/servers/{id}/action/"
+    )
+    assert endpoint("GET", "/api/2.0/ips/10.0.0.1/") == "GET /api/2.0/ips/{id}/"
+    values = list(range(1, 101))
+    assert [percentile(values, p) for p in [50, 90, 99, 100]] == [50, 90, 99, 100]
+    assert percentile([], 50) == 0
+
+
+def test_nested_spans_split_time():
+    clock = Clock()
+    stats = Recorder(clock)
+    with stats.span("serialization", "output"):
+        clock.now += 1
+        with stats.span("network", "request", endpoint="GET /a/") as span:
+            clock.now += 2
+            span["status"] = 200
+        with stats.span("formatting", "format"):
+            clock.now += 3
+    clock.now += 4
+    times = stats.times()
+    assert times == dict(wall=10, network=2, formatting=3, serialization=1, other=4)
+    assert stats.requests()[0].args == dict(endpoint="GET /a/", status=200)
+
+
+def test_cli_stats_and_trace(fake, tmp_path):
+    trace = tmp_path / "trace.json"
+    ret = CliRunner(mix_stderr=False).invoke(
+        cli.cli,
+        [
+            "--endpoint",
+            fake.endpoint,
+            "--cache-ttl",
+            "60",
+            "--refresh",
+            "--stats",
+            "--trace-file",
+            str(trace),
+            "list",
+            "servers",
+            "--brief",
+        ],
+        obj=Environment(),
+    )
+    assert ret.exit_code == 0, ret.output
+    assert len(json.loads(ret.stdout)["result"]["servers"]) == 50
+    report = ret.stderr.splitlines()
+    header = report[0].split()
+    assert header[:4] == ["ENDPOINT", "CALLS", "RETRIES", "P50_MS"]
+    rows = {line.split()[1]: line.split() for line in report[1:-2]}
+    assert rows["/api/2.0/servers/detail/"][2] == "1"
+    assert int(rows["/api/2.0/drives/detail/"][-1]) > 0
+    assert report[-2].startswith("cache: index ")
+    assert "inventory 0 hit 2 miss" in report[-2]
+    assert report[-1].startswith("time: wall ")
+    events = json.loads(trace.read_text())["traceEvents"]
+    categories = {e["cat"] for e in events if e["ph"] == "X"}
+    assert categories == {"network", "formatting", "serialization"}
+    requests = [e for e in events if e["name"] == "request"]
+    assert len(requests) == len(fake.requests)
+    assert all(e["args"]["status"] == 200 for e in requests)
+
+
+def test_upload_requests_are_recorded(fake, tmp_path):
+    stats = Recorder()
+    api = CloudSigmaClient(endpoint=fake.endpoint, stats=stats)
+    image = tmp_path / "image.raw"
+    image.write_bytes(b"\0" * 100000)
+    with open(image, "rb") as input_file:
+        api.upload_drive_chunked(input_file, "uploaded", chunk_size=64 * 1024)
+    api.close()
+    sent = sum(span.args["sent"] for span in stats.requests())
+    assert sent >= 100000
+    assert len(stats.requests()) == len(fake.requests)
+
+
+def test_no_stats_by_default(fake):
+    ret = CliRunner(mix_stderr=False).invoke(
+        cli.cli,
+        ["--endpoint", fake.endpoint, "--no-cache", "list", "servers", "--uuid"],
+        obj=Environment(),
+    )
+    assert ret.exit_code == 0, ret.output
+    assert ret.stderr == ""
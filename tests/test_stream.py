@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Tests for streaming list output one resource per line"""
+
+import json
+
+from click.testing import CliRunner
+
+from cscli import cli
+from cscli.cli import Environment
+
+
+def _ndjson(fake_api, *args):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, ["list", "--ndjson", *args], obj=env)
+    assert ret.exit_code == 0, ret.output
+    return [json.loads(line) for line in ret.output.splitlines()]
+
+
+def test_stream_formats_lazily(fake_api, monkeypatch):
+    formatted = []
+    format_resource = fake_api._format_resource
+
+    def counting(resource, item, list_format):
+        formatted.append(item["uuid"])
+        return format_resource(resource, item, list_format)
+
+    monkeypatch.setattr(fake_api, "_format_resource", counting)
+    stream = fake_api.stream_resources("servers", "brief")
+    name, item = next(stream)
+    assert name == "servers"
+    assert list(item) == ["server-0"]
+    assert formatted == ["server-0"]
+
+
+def test_stream_detail(fake_api):
+    lines = _ndjson(fake_api, "servers")
+    assert [line["uuid"] for line in lines] == ["server-0", "server-1", "server-2"]
+    assert lines == _ndjson(fake_api, "servers", "--detail")
+
+
+def test_stream_uuid(fake_api):
+    assert _ndjson(fake_api, "drives", "--uuid") == ["drive-0", "drive-1", "drive-2"]
+
+
+def test_stream_brief_all(fake_api):
+    lines = _ndjson(fake_api, "--brief")
+    assert [next(iter(line)) for line in lines] == ["servers"] * 3 + ["drives"] * 3 + [
+        "vlans"
+    ] * 3 + ["ips"] * 3
+    assert lines[0]["servers"]["server-0"][0] == dict(name="server0")
+    for _type in ["server", "drive", "vlan", "ip"]:
+        assert getattr(fake_api, _type).calls == ["list_detail"]
+
+
+def test_stream_text_rejected(fake_api):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, ["list", "--ndjson", "--text"], obj=env)
+    assert ret.exit_code != 0
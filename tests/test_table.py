@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Tests for the list --text table renderer"""
+
+import io
+
+import pytest
+from click.testing import CliRunner
+
+from cscli import cli, table
+from cscli.cli import Environment
+from cscli.error import ParameterError
+from cscli.table import cell, row, write_table
+
+
+def _list(fake_api, *args):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, ["list", *args], obj=env)
+    assert ret.exit_code == 0, ret.output
+    return ret.output.splitlines()
+
+
+def test_cells():
+    assert cell(None) == ""
+    assert cell(["a", "b"]) == "a,b"
+    assert cell([{"mac": dict(config="dhcp", ip="x")}]) == "mac(config=dhcp,ip=x)"
+    item = {"u": [dict(name="n"), dict(drives=["d0", "d1"]), dict(size="1G")]}
+    assert row(item) == dict(uuid="u", name="n", drives="d0,d1", size="1G")
+
+
+def test_table_columns_sized_to_sample():
+    rows = [dict(a="x", b="1"), dict(a="longer", b="2"), dict(a="longest", b="3")]
+    stream = io.StringIO()
+    write_table(rows, stream=stream, sample=2)
+    assert stream.getvalue().splitlines() == [
+        "A       B",
+        "x       1",
+        "longer  2",
+        "longest  3",
+    ]
+
+
+def test_table_writes_in_chunks(monkeypatch):
+    monkeypatch.setattr(table, "WRITE_ROWS", 100)
+    writes = []
+
+    class Stream(io.StringIO):
+        def write(self, text):
+            writes.append(text)
+            return super().write(text)
+
+    stream = Stream()
+    write_table((dict(n=str(i)) for i in range(10000)), stream=stream)
+    assert len(writes) == 101
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == "N" and lines[-1] == "9999" and len(lines) == 10001
+
+
+def test_table_unknown_column():
+    with pytest.raises(ParameterError, match="unknown column c"):
+        write_table([dict(a="1", b="2")], ["a", "c"], io.StringIO())
+    stream = io.StringIO()
+    write_table([dict(a="1", b="2")], ["c"], stream, strict=False)
+    assert stream.getvalue() == ""
+
+
+def test_list_text_table(fake_api):
+    lines = _list(fake_api, "--text", "servers")
+    assert lines[0].split() == [
+        "UUID",
+        "NAME",
+        "STATUS",
+        "CPU",
+        "CLOCK",
+        "SMP",
+        "MEMORY",
+        "DRIVES",
+        "NICS",
+    ]
+    assert lines[1].split()[:3] == ["server-0", "server0", "running"]
+    assert lines[1].endswith("00:00:00:00:00:00(config=static,ip=10.0.0.0)")
+    assert len(lines) == 4
+
+
+def test_list_columns(fake_api):
+    assert _list(fake_api, "drives", "--columns", "name,mounted") == [
+        "NAME    MOUNTED",
+        "drive0  server0",
+        "drive1  server1",
+        "drive2  server2",
+    ]
+    lines = _list(fake_api, "--columns", "name,status")
+    assert lines[:2] == ["servers", "NAME     STATUS"]
+    assert lines[5:8] == ["", "drives", "NAME"]
+    assert "vlans" in lines and "NAME" in lines
+
+
+def test_list_columns_errors(fake_api):
+    env = Environment()
+    env.api = fake_api
+    ret = CliRunner().invoke(cli.cli, ["list", "--uuid", "--columns", "name"], obj=env)
+    assert isinstance(ret.exception, ParameterError)
+    ret = CliRunner().invoke(cli.cli, ["list", "servers", "--columns", "x"], obj=env)
+    assert isinstance(ret.exception, ParameterError)
+    for resource in ["subscriptions", "capabilities"]:
+        ret = CliRunner().invoke(
+            cli.cli, ["list", resource, "--columns", "name"], obj=env
+        )
+        assert isinstance(ret.exception, ParameterError)
+        assert ret.exception.message == f"{resource} cannot be formatted as text"
+
+
+def test_text_format_keeps_every_line(fake_api):
+    server = fake_api.server.items[0]
+    server["nics"] = [
+        dict(server["nics"][0], mac=f"00:00:00:00:01:{i:02x}") for i in range(100)
+    ]
+    lines = fake_api.list_servers("text")["servers"][0]["server-0"]
+    assert len(lines) == 104
+    assert len(set(len(line) for line in lines)) == 1
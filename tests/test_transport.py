@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+"""Tests for the pooled keep-alive API transport"""
+
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from cscli.error import ParameterError
+from cscli.transport import (
+    ConditionalStore,
+    RetryPolicy,
+    TokenBucket,
+    Transport,
+    last_modified,
+    region_setting,
+    token_bucket,
+    unreachable,
+)
+from tests.fakeapi import FakeCloudSigma
+from tests.standins import ApiStandin
+
+PAYLOAD = dict(objects=[dict(uuid=f"server-{i}", name=f"server{i}") for i in range(50)])
+
+
+@pytest.fixture
+def standin():
+    standin = ApiStandin(PAYLOAD)
+    yield standin
+    standin.close()
+
+
+def test_transport_reuses_connection(standin):
+    transport = Transport(2)
+    for _ in range(5):
+        assert transport.session.get(standin.endpoint).json() == PAYLOAD
+    assert transport.stats() == dict(requests=5, connections=1, reused=4)
+    assert len(standin.peers) == 1
+    transport.close()
+
+
+def test_transport_gzip(standin):
+    transport = Transport(1)
+    response = transport.session.get(standin.endpoint)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == PAYLOAD
+    assert all("gzip" in accept for accept in standin.encodings)
+    transport.close()
+
+
+def test_transport_pool_size(standin):
+    transport = Transport(3)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: transport.session.get(standin.endpoint), range(30)))
+    stats = transport.stats()
+    assert stats["requests"] == 30
+    assert stats["connections"] <= 3
+    transport.close()
+
+
+def test_transport_shared_by_client():
+    from cscli.api_client import CloudSigmaClient
+
+    api = CloudSigmaClient(pool_size=2)
+    session = api.transport.session
+    assert api.server.c.http is session
+    assert api.libdrive.c.http is session
+    assert api.transport.adapter._pool_maxsize == 2
+
+
+def test_transport_response_per_thread():
+    from cscli.api_client import CloudSigmaClient
+
+    fake = FakeCloudSigma()
+    fake.seed(20)
+    api = CloudSigmaClient(endpoint=fake.endpoint, workers=8)
+    uuids = list(fake.collections["servers"]) * 5
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        servers = list(pool.map(api.server.get, uuids))
+    assert [server["uuid"] for server in servers] == uuids
+    api.server.c.resp = "main"
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(lambda: api.server.c.resp).result() is None
+    assert api.server.c.resp == "main"
+    api.close()
+    fake.close()
+
+
+class Clock(object):
+    """a clock advanced only by sleeping"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_rate():
+    clock = Clock()
+    bucket = TokenBucket(10, clock, clock.sleep)
+    for _ in range(30):
+        bucket.acquire()
+    # a burst of 10, then one every tenth of a second
+    assert clock.now == pytest.approx(2.0)
+    bucket.defer(5)
+    bucket.acquire()
+    assert clock.now == pytest.approx(7.0)
+
+
+def test_token_bucket_unlimited():
+    clock = Clock()
+    bucket = TokenBucket(0, clock, clock.sleep)
+    for _ in range(1000):
+        bucket.acquire()
+    assert clock.now == 0
+
+
+def test_token_bucket_shared_by_site():
+    assert token_bucket("zrh", 5) is token_bucket("zrh", 5)
+    assert token_bucket("zrh", 5) is not token_bucket("sjc", 5)
+
+
+def test_region_setting():
+    assert region_setting(None, "zrh", 4, int) == 4
+    assert region_setting(["2", "zrh=0"], "zrh", 4, int) == 0
+    assert region_setting(["2", "ZRH=0"], "sjc", 4, int) == 2
+    assert region_setting(["zrh=1.5"], None, 20) == 20
+    assert region_setting(7, "zrh", 20) == 7
+    for spec in ["zrh=fast", "-1"]:
+        with pytest.raises(ParameterError):
+            region_setting([spec], "zrh", 20)
+
+
+def _request(method, body=None):
+    return requests.Request(method, "http://api/servers/", data=body).prepare()
+
+
+def _response(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+def test_retry_policy():
+    policy = RetryPolicy(2, backoff=1)
+    get, post = _request("GET"), _request("POST", b"{}")
+    assert 0 <= policy.delay(get, _response(503), 0) <= 1
+    assert 0 <= policy.delay(get, _response(503), 1) <= 2
+    assert policy.delay(get, _response(503), 2) is None
+    assert policy.delay(get, None, 0) is not None
+    assert policy.delay(get, _response(404), 0) is None
+    # a create is only resent when it was refused unprocessed
+    assert policy.delay(post, _response(503), 0) is None
+    assert policy.delay(post, None, 0) is None
+    assert policy.delay(post, _response(429, "3"), 0) == 3
+    assert policy.delay(_request("DELETE"), _response(502), 0) is None
+    assert policy.delay(get, _response(429, "600"), 0) is None
+    assert policy.delay(get, _response(429, "Wed, 21 Oct 2015 07:28:00 GMT"), 0) == 0
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_retry_policy_unreachable():
+    policy = RetryPolicy(2, backoff=1)
+    get = _request("GET")
+    try:
+        requests.get(f"http://127.0.0.1:{_closed_port()}/")
+    except requests.ConnectionError as exc:
+        refused = exc
+    assert unreachable(refused)
+    assert policy.delay(get, None, 0, refused) is None
+    resolve = requests.ConnectionError(socket.gaierror(-2, "Name not known"))
+    assert policy.delay(get, None, 0, resolve) is None
+    timeout = requests.ReadTimeout("read timed out")
+    assert 0 <= policy.delay(get, None, 0, timeout) <= 1
+    assert not unreachable(requests.ConnectionError("connection reset"))
+
+
+def test_transport_fails_fast_when_unreachable():
+    transport = Transport(2, ("user", "pass"), retry=RetryPolicy(4, backoff=1))
+    start = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        transport.session.get(f"http://127.0.0.1:{_closed_port()}/api/2.0/servers/")
+    assert time.monotonic() - start < 1
+    assert transport.stats()["requests"] == 1
+    transport.close()
+
+
+def test_transport_retries_transient_failures():
+    fake = FakeCloudSigma(retry_after=0)
+    bucket = TokenBucket(0)
+    logged = []
+    transport = Transport(
+        2,
+        ("user", "pass"),
+        retry=RetryPolicy(3, backoff=0.01),
+        bucket=bucket,
+        log=lambda msg, *args: logged.append(msg % args),
+    )
+    fake.fail(503, count=2)
+    response = transport.session.get(f"{fake.endpoint}servers/")
+    assert response.status_code == 200
+    assert fake.requests.count("GET /api/2.0/servers/") == 3
+    assert len(logged) == 2 and "status 503; retry 1 in" in logged[0]
+    fake.fail(503)
+    response = transport.session.post(f"{fake.endpoint}servers/", json=dict())
+    assert response.status_code == 503
+    fake.fail(429)
+    response = transport.session.post(
+        f"{fake.endpoint}servers/", json=dict(objects=[dict(name="new")])
+    )
+    assert response.status_code == 201
+    assert fake.requests.count("POST /api/2.0/servers/") == 3
+    assert transport.stats()["requests"] == 6
+    transport.close()
+    fake.close()
+
+
+def test_last_modified():
+    modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert last_modified({"Last-Modified": modified}) is None
+    same = {"Last-Modified": modified, "Date": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    # a change later in the same second would not be seen
+    assert last_modified(same) is None
+    later = {"Last-Modified": modified, "Date": "Wed, 21 Oct 2015 07:28:01 GMT"}
+    assert last_modified(later) == modified
+    assert last_modified({"Last-Modified": "bogus", "Date": "bogus"}) is None
+
+
+def test_conditional_store_same_second():
+    fake = FakeCloudSigma()
+    fake.seed(3)
+    url = f"{fake.endpoint}servers/detail/"
+    transport = Transport(1, ("user", "pass"), conditional=ConditionalStore())
+    fake._touch("servers")
+    transport.session.get(url)
+    # the listing changed in the second it was sent; only its etag is kept
+    (kept,) = transport.adapter.conditional._kept.values()
+    assert list(kept["validators"]) == ["If-None-Match"]
+    fake.modified["servers"] -= 10
+    transport.session.get(f"{url}?limit=0")
+    kept = transport.adapter.conditional._kept[f"{url}?limit=0"]
+    assert "If-Modified-Since" in kept["validators"]
+    transport.close()
+    fake.close()
+
+
+def test_conditional_store():
+    fake = FakeCloudSigma()
+    fake.seed(3)
+    uuid = next(iter(fake.collections["servers"]))
+    url = f"{fake.endpoint}servers/{uuid}/"
+    transport = Transport(1, ("user", "pass"), conditional=ConditionalStore())
+    first = transport.session.get(url).json()
+    second = transport.session.get(url)
+    assert second.status_code == 200
+    assert second.json() == first
+    assert transport.adapter.conditional.saved == len(second.content)
+    fake.collections["servers"][uuid]["name"] = "renamed"
+    assert transport.session.get(url).json()["name"] == "renamed"
+    # conditions and streams made by the caller are left alone
+    response = transport.session.get(url, headers={"If-None-Match": "other"})
+    assert response.status_code == 200
+    assert transport.session.get(url, stream=True).json()["name"] == "renamed"
+    assert transport.stats()["connections"] == 1
+    transport.close()
+    fake.close()
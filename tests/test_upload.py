@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""Tests for chunked, resumable drive image upload"""
+
+import os
+
+import pytest
+import requests
+
+from cscli.error import UploadError
+from cscli.upload import ChunkedUpload, file_chunks
+from tests.standins import UploadStandin
+
+
+@pytest.fixture
+def standin():
+    standin = UploadStandin()
+    yield standin
+    standin.close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "image.raw"
+    path.write_bytes(os.urandom(10 * 1024 + 300))
+    with open(path, "rb") as ifp:
+        yield ifp
+
+
+def _upload(standin, image, tmp_path, **kwargs):
+    return ChunkedUpload(
+        requests.Session(),
+        standin.endpoint,
+        image,
+        chunk_size=1024,
+        workers=4,
+        retry_delay=0,
+        journal_root=str(tmp_path),
+        **kwargs,
+    )
+
+
+def test_file_chunks():
+    assert list(file_chunks(10, 4)) == [(1, 0, 4), (2, 4, 6)]
+    assert list(file_chunks(3, 4)) == [(1, 0, 3)]
+    assert list(file_chunks(8, 4)) == [(1, 0, 4), (2, 4, 4)]
+
+
+def test_upload_parallel_chunks(standin, image, tmp_path):
+    progress = []
+    upload = _upload(standin, image, tmp_path, progress=lambda *a: progress.append(a))
+    standin.failures[3] = 2
+    assert upload.run(lambda size: "drive-1") == "drive-1"
+    image.seek(0)
+    assert standin.image("drive-1") == image.read()
+    assert sorted(set(standin.posts)) == list(range(1, 11))
+    assert standin.posts.count(3) == 3
+    assert progress[-1] == (upload.size, upload.size)
+    assert not os.path.exists(upload.journal.path)
+
+
+def test_upload_resume(standin, image, tmp_path):
+    standin.failures[5] = 100
+    created = []
+
+    def create(size):
+        created.append(size)
+        return "drive-2"
+
+    with pytest.raises(UploadError):
+        _upload(standin, image, tmp_path, retries=1).run(create)
+
+    standin.failures.clear()
+    standin.posts.clear()
+    upload = _upload(standin, image, tmp_path)
+    assert upload.journal.uuid == "drive-2"
+    done = set(upload.journal.done)
+    assert done and 5 not in done
+    assert upload.run(create) == "drive-2"
+    assert created == [upload.size]
+    # only chunks missing from the journal are sent again
+    assert 5 in standin.posts
+    assert not set(standin.posts) & done
+    image.seek(0)
+    assert standin.image("drive-2") == image.read()
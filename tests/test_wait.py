@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""Tests for the multi-target wait engine"""
+
+import pytest
+
+from cscli.error import ParameterError
+from cscli.wait import WaitTarget, wait_for
+from tests.conftest import FakeResource
+
+
+class ChangingResource(FakeResource):
+    """fake resource whose items change status after a number of listings"""
+
+    def __init__(self, items, changes):
+        super().__init__(items)
+        self.changes = changes
+
+    def list_detail(self, query_params=None):
+        ret = super().list_detail(query_params)
+        for uuid, (after, status) in self.changes.items():
+            if len(self.calls) >= after:
+                for item in self.items:
+                    if item["uuid"] == uuid:
+                        item["status"] = status
+        return ret
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_wait_target_parse():
+    target = WaitTarget.parse("web1")
+    assert (target._type, target.name, target.status) == ("server", "web1", "running")
+    target = WaitTarget.parse("drive:disk1=mounted")
+    assert (target._type, target.name, target.status) == ("drive", "disk1", "mounted")
+    target = WaitTarget.parse("server:web1", "stopped")
+    assert target.status == "stopped"
+    with pytest.raises(ParameterError):
+        WaitTarget("vlan", "vlan0")
+
+
+def test_wait_for_many_targets(fake_api):
+    fake_api.server = ChangingResource(
+        fake_api.server.items,
+        {"server-0": (2, "stopped"), "server-1": (3, "stopped")},
+    )
+    fake_api.drive = ChangingResource(
+        fake_api.drive.items, {"drive-2": (1, "unmounted")}
+    )
+    targets = [
+        WaitTarget("server", "server0", "stopped"),
+        WaitTarget("server", "server-1", "stopped"),
+        WaitTarget("drive", "drive2"),
+    ]
+    clock = Clock()
+    assert wait_for(fake_api, targets, 60, sleep=clock.sleep, clock=clock)
+    # one listing per resource type per poll
+    assert fake_api.server.calls == ["list_detail"] * 3
+    assert fake_api.drive.calls == ["list_detail"]
+    assert [t.report()["done"] for t in targets] == [True, True, True]
+    assert len(clock.sleeps) == 2
+    assert clock.sleeps[1] <= 1.5
+
+
+def test_wait_for_timeout(fake_api):
+    targets = [WaitTarget("server", "server0", "stopped")]
+    clock = Clock()
+    assert not wait_for(fake_api, targets, 5, sleep=clock.sleep, clock=clock)
+    report = targets[0].report()
+    assert report["done"] is False
+    assert report["status"] == "running"
+    assert report["elapsed"] == 5
+
+
+def test_wait_for_unknown_target(fake_api):
+    targets = [WaitTarget("server", "nothere"), WaitTarget("server", "server0")]
+    clock = Clock()
+    assert not wait_for(fake_api, targets, 60, sleep=clock.sleep, clock=clock)
+    missing, found = [target.report() for target in targets]
+    assert missing["done"] is False
+    assert missing["uuid"] is None
+    assert "nothere" in missing["error"]
+    assert found["done"] is True
+    assert found["error"] is None
+    assert clock.sleeps == []